@@ -1,10 +1,21 @@
 from __future__ import annotations
 
+import heapq
+import mmap
+import os
+import pickle
+import struct
 import sys
+import threading
+from itertools import count
 from numbers import Number
 from timeit import default_timer
 
+from dask._task_spec import DataNode, Task
+from dask.base import tokenize
 from dask.callbacks import Callback
+from dask.sizeof import sizeof
+from dask.utils import parse_bytes
 
 overhead = sys.getsizeof(1.23) * 4 + sys.getsizeof(()) * 4
 
@@ -66,3 +77,343 @@ class Cache(Callback):
     def _finish(self, dsk, state, errored):
         self.starttimes.clear()
         self.durations.clear()
+
+
+def _tokenize_graph(dsk):
+    """Deterministic token for every task in ``dsk``
+
+    The token of a task covers the task itself and the tokens of its
+    dependencies, so equal tokens mean equal results across runs and
+    processes as long as the inputs tokenize deterministically.
+    """
+    tokens = {}
+    seen = set()
+    for root in dsk:
+        if root in seen:
+            continue
+        seen.add(root)
+        stack = [root]
+        while stack:
+            key = stack[-1]
+            deps = [d for d in dsk[key].dependencies if d in dsk and d not in seen]
+            if deps:
+                seen.update(deps)
+                stack.extend(deps)
+                continue
+            stack.pop()
+            node = dsk[key]
+            tokens[key] = tokenize(
+                node, {d: tokens[d] for d in node.dependencies if d in tokens}
+            )
+    return tokens
+
+
+class _Entry:
+    __slots__ = ("value", "nbytes", "cost", "priority")
+
+    def __init__(self, value, nbytes, cost, priority):
+        self.value = value
+        self.nbytes = nbytes
+        self.cost = cost
+        self.priority = priority
+
+
+_MAGIC = b"DASKRC02"
+_HEADER = struct.Struct("<8sQd")  # magic, length of metadata, cost
+_ALIGN = 64
+
+
+def _align(n):
+    return -(-n // _ALIGN) * _ALIGN
+
+
+def _read_header(f, path):
+    magic, meta_len, cost = _HEADER.unpack(f.read(_HEADER.size))
+    if magic != _MAGIC:
+        raise ValueError(f"Not a cache file: {path}")
+    return meta_len, cost
+
+
+def _load_file(path):
+    """The value stored in the file at ``path`` and its cost"""
+    with open(path, "rb") as f:
+        meta_len, cost = _read_header(f, path)
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    frame, extents = pickle.loads(mm[_HEADER.size : _HEADER.size + meta_len])
+    start = _align(_HEADER.size + meta_len)
+    view = memoryview(mm)
+    buffers = [view[start + off : start + off + n] for off, n in extents]
+    del view
+    return pickle.loads(frame, buffers=buffers), cost
+
+
+def _load_stored(path):
+    """Task loading a result of ``PersistentCache`` from disk
+
+    Only reads the file, so that it is cheap to send to other processes and
+    safe to run in any thread.  The cache itself is updated by the callbacks.
+    """
+    return _load_file(path)[0]
+
+
+class PersistentCache(Callback):
+    """Size-bounded result cache that persists across processes
+
+    Results are keyed by a deterministic token of the task and the tokens of
+    its inputs, so rerunning the same graph -- in the same session or after a
+    restart -- replaces every task that was computed before with its stored
+    result.  Stored results are only loaded from disk when they are needed;
+    the local schedulers drop the tasks that only feed other stored results.
+    Unlike :class:`Cache` this does not depend on ``cachey``.
+
+    Two tiers are used:
+
+    - A hot in-memory tier bounded by ``memory_limit``.  Eviction follows
+      GreedyDual-Size: each entry is ranked by the time it took to compute
+      (including its most expensive input) per byte, plus an inflation value
+      that ages entries which haven't been used recently.  Cheap, large and
+      stale results are evicted first.
+    - An on-disk tier in ``directory`` bounded by ``disk_limit``, evicted in
+      least-recently-used order.  Every result that can be pickled is written
+      through, buffers of out-of-band pickleable objects (e.g. NumPy arrays)
+      are page aligned and loaded back through a copy-on-write memory map,
+      so large arrays are only paged in as they are used.
+
+    Parameters
+    ----------
+    directory: str
+        Directory for the on-disk tier; created if missing.
+    memory_limit: int or str
+        Maximum number of bytes held in memory.
+    disk_limit: int or str
+        Maximum number of bytes stored in ``directory``.
+
+    Examples
+    --------
+
+    >>> cache = PersistentCache("/tmp/dask-cache")  # doctest: +SKIP
+    >>> with cache:  # doctest: +SKIP
+    ...     result = x.compute()
+    """
+
+    def __init__(self, directory, memory_limit="512 MiB", disk_limit="10 GiB"):
+        self.directory = os.fspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self.memory_limit = parse_bytes(memory_limit)
+        self.disk_limit = parse_bytes(disk_limit)
+
+        self.data = dict()
+        self.memory_bytes = 0
+        self._heap = []
+        self._inflation = 0.0
+        self._counter = count()
+
+        self.disk = dict()  # token -> nbytes, least recently used first
+        self.disk_bytes = 0
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".dask") and not name.startswith("."):
+                try:
+                    st = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, name[:-5], st.st_size))
+        for _, token, nbytes in sorted(entries):
+            self.disk[token] = nbytes
+            self.disk_bytes += nbytes
+
+        self.tokens = dict()
+        self.starttimes = dict()
+        self.durations = dict()
+        self._hits = set()  # keys replaced by stored results in this run
+        self._pinned = dict()  # token -> cost of results loaded from disk
+        self._lock = threading.RLock()
+
+    def __contains__(self, token):
+        return token in self.data or token in self.disk
+
+    def _path(self, token):
+        return os.path.join(self.directory, token + ".dask")
+
+    def get(self, token, default=None):
+        """Stored result for ``token``, or ``default``"""
+        with self._lock:
+            entry = self.data.get(token)
+            if entry is not None:
+                self._touch(token, entry)
+                return entry.value
+            if token not in self.disk:
+                return default
+            try:
+                value, cost = self._load(token)
+            except Exception:
+                self._discard_disk(token)
+                return default
+            self._loaded(token, value, cost)
+            return value
+
+    def put(self, token, value, cost=0.0):
+        """Store ``value`` under ``token``
+
+        ``cost`` is the time in seconds it took to produce ``value``.
+        """
+        with self._lock:
+            self._put_memory(token, value, cost)
+            if token not in self.disk:
+                self._store(token, value, cost)
+
+    def clear(self):
+        """Remove all stored results from memory and disk"""
+        with self._lock:
+            self.data.clear()
+            self._heap.clear()
+            self.memory_bytes = 0
+            for token in list(self.disk):
+                self._discard_disk(token)
+
+    # In-memory tier
+
+    def _touch(self, token, entry):
+        entry.priority = self._inflation + entry.cost / entry.nbytes
+        heapq.heappush(self._heap, (entry.priority, next(self._counter), token))
+
+    def _put_memory(self, token, value, cost):
+        nbytes = sizeof(value) + overhead + sys.getsizeof(token)
+        if nbytes > self.memory_limit:
+            return
+        old = self.data.pop(token, None)
+        if old is not None:
+            self.memory_bytes -= old.nbytes
+        entry = _Entry(value, nbytes, cost, 0.0)
+        self.data[token] = entry
+        self.memory_bytes += nbytes
+        self._touch(token, entry)
+        while self.memory_bytes > self.memory_limit:
+            priority, _, victim = heapq.heappop(self._heap)
+            entry = self.data.get(victim)
+            if entry is None or entry.priority != priority:
+                continue  # stale heap item
+            del self.data[victim]
+            self.memory_bytes -= entry.nbytes
+            self._inflation = priority
+        if len(self._heap) > 2 * len(self.data) + 64:
+            self._heap = [
+                (e.priority, next(self._counter), t) for t, e in self.data.items()
+            ]
+            heapq.heapify(self._heap)
+
+    # On-disk tier
+
+    def _store(self, token, value, cost):
+        buffers = []
+        try:
+            frame = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+            buffers = [b.raw() for b in buffers]
+        except Exception:
+            return
+        extents = []
+        size = 0
+        for buf in buffers:
+            extents.append((size, buf.nbytes))
+            size = _align(size + buf.nbytes)
+        meta = pickle.dumps((frame, extents), protocol=5)
+        start = _align(_HEADER.size + len(meta))
+        nbytes = start + size
+        if nbytes > self.disk_limit:
+            return
+
+        path = self._path(token)
+        tmp = os.path.join(self.directory, f".{token}.{os.getpid()}.tmp")
+        try:
+            with open(tmp, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, len(meta), cost))
+                f.write(meta)
+                for (off, _), buf in zip(extents, buffers):
+                    f.seek(start + off)
+                    f.write(buf)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        self.disk[token] = nbytes
+        self.disk_bytes += nbytes
+        while self.disk_bytes > self.disk_limit:
+            victim = next((t for t in self.disk if t not in self._pinned), None)
+            if victim is None:
+                break
+            self._discard_disk(victim)
+
+    def _load(self, token):
+        return _load_file(self._path(token))
+
+    def _loaded(self, token, value, cost):
+        """Account for ``value`` having been loaded from disk"""
+        if token in self.disk:
+            self.disk[token] = self.disk.pop(token)
+            try:
+                os.utime(self._path(token))
+            except OSError:
+                pass
+        self._put_memory(token, value, cost)
+
+    def _discard_disk(self, token):
+        self.disk_bytes -= self.disk.pop(token, 0)
+        try:
+            os.remove(self._path(token))
+        except OSError:
+            pass
+
+    # Callback hooks
+
+    def _start(self, dsk):
+        self.durations.clear()
+        self.tokens = _tokenize_graph(dsk)
+        with self._lock:
+            for key, token in self.tokens.items():
+                entry = self.data.get(token)
+                if entry is not None:
+                    self._touch(token, entry)
+                    dsk[key] = DataNode(key, entry.value)
+                elif token in self.disk:
+                    path = self._path(token)
+                    try:
+                        with open(path, "rb") as f:
+                            _, cost = _read_header(f, path)
+                    except (OSError, ValueError, struct.error):
+                        self._discard_disk(token)
+                        continue
+                    # Loaded only if the scheduler still needs it after culling,
+                    # kept on disk until then
+                    self._pinned[token] = cost
+                    dsk[key] = Task(key, _load_stored, path)
+                else:
+                    continue
+                self._hits.add(key)
+
+    def _pretask(self, key, dsk, state):
+        self.starttimes[key] = default_timer()
+
+    def _posttask(self, key, value, dsk, state, id):
+        duration = default_timer() - self.starttimes.pop(key)
+        deps = state["dependencies"][key]
+        if deps:
+            duration += max(self.durations.get(k, 0) for k in deps)
+        self.durations[key] = duration
+        token = self.tokens.get(key)
+        if token is None:
+            return
+        with self._lock:
+            if key not in self._hits:
+                self.put(token, value, cost=duration)
+            elif token in self._pinned:
+                self._loaded(token, value, self._pinned[token])
+
+    def _finish(self, dsk, state, errored):
+        self.tokens = dict()
+        self._hits.clear()
+        self._pinned.clear()
+        self.starttimes.clear()
+        self.durations.clear()
@@ -1,16 +1,23 @@
 from __future__ import annotations
 
+import pickle
 from operator import add
 from time import sleep
 
 import pytest
 
-from dask.cache import Cache
+from dask._task_spec import convert_legacy_graph
+from dask.cache import Cache, PersistentCache, _tokenize_graph
 from dask.callbacks import Callback
 from dask.local import get_sync
 from dask.threaded import get
 
-cachey = pytest.importorskip("cachey")
+try:
+    import cachey
+except ImportError:
+    cachey = None
+
+requires_cachey = pytest.mark.skipif(cachey is None, reason="requires cachey")
 
 
 flag = []
@@ -21,6 +28,7 @@ def inc(x):
     return x + 1
 
 
+@requires_cachey
 def test_cache():
     c = cachey.Cache(10000)
     cc = Cache(c)
@@ -45,6 +53,7 @@ def test_cache():
     assert not Callback.active
 
 
+@requires_cachey
 def test_cache_with_number():
     c = Cache(10000, limit=1)
     assert isinstance(c.cache, cachey.Cache)
@@ -52,6 +61,7 @@ def test_cache_with_number():
     assert c.cache.limit == 1
 
 
+@requires_cachey
 def test_cache_correctness():
     # https://github.com/dask/dask/issues/3631
     c = Cache(10000)
@@ -71,6 +81,7 @@ def f(duration, size, *args):
     return [0] * size
 
 
+@requires_cachey
 def test_prefer_cheap_dependent():
     dsk = {"x": (f, 0.01, 10), "y": (f, 0.000001, 1, "x")}
     c = Cache(10000)
@@ -78,3 +89,126 @@ def test_prefer_cheap_dependent():
         get_sync(dsk, "y")
 
     assert c.cache.scorer.cost["x"] < c.cache.scorer.cost["y"]
+
+
+def test_persistent_cache(tmp_path):
+    dsk = {"x": (inc, 1), "y": (inc, 2), "z": (add, "x", "y")}
+    del flag[:]
+    with PersistentCache(tmp_path):
+        assert get(dsk, "z") == 5
+    assert sorted(flag) == [1, 2]
+    assert not Callback.active
+
+    # Survives a restart, and keys don't matter, only the computation
+    del flag[:]
+    dsk2 = {"x": (inc, 1), "y": (inc, 3), "z": (add, "x", "y")}
+    with PersistentCache(tmp_path) as cc:
+        assert get(dsk2, "z") == 6
+        assert len(cc.disk) == 5
+    assert flag == [3]
+
+
+@pytest.fixture
+def loaded(monkeypatch):
+    """Paths of the stored results loaded by tasks"""
+    import dask.cache
+
+    paths = []
+
+    def load(path):
+        paths.append(path)
+        return dask.cache._load_file(path)[0]
+
+    monkeypatch.setattr(dask.cache, "_load_stored", load)
+    return paths
+
+
+def test_persistent_cache_loads_only_needed(tmp_path, loaded):
+    dsk = {"w": (inc, 0), "x": (inc, "w"), "y": (inc, "x"), "z": (inc, "y")}
+    with PersistentCache(tmp_path, memory_limit=0):
+        assert get(dsk, "z") == 4
+
+    # Only the requested result is read back, its inputs are culled
+    del flag[:]
+    with PersistentCache(tmp_path, memory_limit=0):
+        assert get(dsk, "z") == 4
+    assert len(loaded) == 1
+    assert not flag
+
+    # Requested inputs of other requested results are loaded too
+    del loaded[:]
+    with PersistentCache(tmp_path, memory_limit=0):
+        assert get(dsk, ["x", "z"]) == (2, 4)
+    assert len(loaded) == 2
+
+    # Inputs of a stored result aren't rerun, even if they weren't kept
+    del loaded[:]
+    tokens = _tokenize_graph(convert_legacy_graph(dsk))
+    with PersistentCache(tmp_path, memory_limit=0) as cc:
+        cc._discard_disk(tokens["w"])
+        cc._discard_disk(tokens["x"])
+        assert get({**dsk, "v": (add, "z", "y")}, "v") == 7
+    assert len(loaded) == 2
+    assert not flag
+
+
+def test_persistent_cache_disk_hits(tmp_path):
+    dsk = {"x": (inc, 1), "y": (inc, "x")}
+    with PersistentCache(tmp_path, memory_limit=0):
+        assert get(dsk, "y") == 3
+
+    cc = PersistentCache(tmp_path)
+    cc.put("other", list(range(100_000)))
+    graph = convert_legacy_graph(dsk)
+    token = _tokenize_graph(graph)["y"]
+    cc._start(graph)
+    # Tasks loading from disk don't carry the cache along to other processes
+    assert len(pickle.dumps(graph["y"])) < 1000
+    cc._finish(graph, None, False)
+
+    # A loaded result moves to the memory tier and the end of the LRU order
+    del flag[:]
+    with cc:
+        assert get(dsk, "y") == 3
+    assert not flag
+    assert token in cc.data
+    assert list(cc.disk)[-1] == token
+
+
+def arange(n):
+    np = pytest.importorskip("numpy")
+    flag.append(n)
+    return np.arange(n)
+
+
+def test_persistent_cache_numpy(tmp_path):
+    np = pytest.importorskip("numpy")
+    dsk = {"x": (arange, 1000), "y": (np.sum, "x")}
+    del flag[:]
+    with PersistentCache(tmp_path, memory_limit=0):
+        assert get_sync(dsk, "y") == 499500
+
+    # Loaded from the memory-mapped file; copy-on-write keeps it writeable
+    with PersistentCache(tmp_path, memory_limit=0):
+        x = get_sync(dsk, "x")
+    assert flag == [1000]
+    np.testing.assert_array_equal(x, np.arange(1000))
+    x[0] = 1
+    with PersistentCache(tmp_path, memory_limit=0):
+        assert get_sync(dsk, "x")[0] == 0
+
+
+def test_persistent_cache_limits(tmp_path):
+    cc = PersistentCache(tmp_path, memory_limit="40 kiB", disk_limit="2 kiB")
+    cc.put("expensive", [0] * 500, cost=10)
+    cc.put("cheap", [0] * 500, cost=0.01)
+    cc.put("new", [0] * 500, cost=1)
+    assert "expensive" in cc.data and "cheap" not in cc.data
+    assert cc.memory_bytes <= cc.memory_limit
+    assert "expensive" not in cc.disk and "new" in cc.disk
+    assert cc.disk_bytes <= cc.disk_limit
+    assert cc.get("cheap") is None
+
+    cc.clear()
+    assert not cc.data and not cc.disk
+    assert not list(tmp_path.iterdir())
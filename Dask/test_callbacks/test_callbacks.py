@@ -110,3 +110,38 @@ def test_add_remove_mutates_not_replaces():
         assert Callback.active
 
     assert not Callback.active
+
+
+def test_callback_tuple_is_cached():
+    cb = Callback(pretask=lambda key, dsk, state: None)
+    assert cb._callback is cb._callback
+    assert len(cb._callback) == 5
+    assert len(Callback(posttask_batch=lambda events, dsk, state: None)._callback) == 6
+
+
+@pytest.mark.parametrize("get", [get_sync, get_threaded])
+def test_posttask_batch(get):
+    batches = []
+    keys = []
+
+    class MyCallback(Callback):
+        def _posttask_batch(self, events, dsk, state):
+            assert all(key in state["finished"] for key, _, _ in events)
+            batches.append(events)
+
+    dsk = {("x", i): (add, i, 1) for i in range(20)}
+    dsk["y"] = (sum, list(dsk))
+    with MyCallback(), Callback(posttask=lambda key, *args: keys.append(key)):
+        assert get(dsk, "y") == 210
+
+    events = [event for batch in batches for event in batch]
+    assert sorted(map(str, keys)) == sorted(str(key) for key, _, _ in events)
+    assert ("y", 210) in [(key, result) for key, result, _ in events]
+    assert all(batches)
+
+
+def test_posttask_batch_tuple():
+    events = []
+    callbacks = (None, None, None, None, None, lambda e, dsk, state: events.extend(e))
+    get_threaded({"x": 1, "y": (add, "x", 1)}, "y", callbacks=[callbacks])
+    assert [(key, result) for key, result, _ in events] == [("y", 2)]
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+from array import array
 from collections import defaultdict
 from collections.abc import Collection, Iterable, Mapping, MutableMapping
+from functools import cached_property
 from typing import Any, Literal, TypeVar, cast, overload
 
 import toolz
@@ -262,6 +264,8 @@ def get_deps(dsk: Graph) -> tuple[dict[Key, set[Key]], dict[Key, set[Key]]]:
     >>> dependents  # doctest: +SKIP
     {'a': {'b'}, 'b': {'c'}, 'c': set()}
     """
+    if isinstance(dsk, CompactGraph):
+        return dsk.get_deps()
     dependencies = {k: get_dependencies(dsk, task=v) for k, v in dsk.items()}
     dependents = reverse_dict(dependencies)
     return dependencies, dependents
@@ -449,6 +453,8 @@ def _toposort(dsk, keys=None, returncycle=False, dependencies=None):
 
 def toposort(dsk, dependencies=None):
     """Return a list of keys of dask sorted in topological order."""
+    if isinstance(dsk, CompactGraph):
+        return dsk.toposort()
     return _toposort(dsk, dependencies=dependencies)
 
 
@@ -471,6 +477,8 @@ def getcycle(d, keys):
     --------
     isdag
     """
+    if isinstance(d, CompactGraph):
+        return d.getcycle(keys)
     return _toposort(d, keys=keys, returncycle=True)
 
 
@@ -496,6 +504,238 @@ def isdag(d, keys):
     return not getcycle(d, keys)
 
 
+class CompactGraph:
+    """Graph structure with keys interned to integers
+
+    Built once from a graph, this stores the dependencies of every key as
+    integer ids in CSR layout (``dep_ptr``, ``dep_idx``): the dependencies of
+    the key with id ``i`` are ``dep_idx[dep_ptr[i]:dep_ptr[i + 1]]``.  Keys
+    that are only referenced as dependencies are interned after the keys of
+    the graph and have no dependencies themselves.
+
+    Traversals run in O(V + E) over the arrays, and derived structures such
+    as the dependents, the topological order and dictionary versions of the
+    dependencies are computed once and cached.  ``toposort``, ``getcycle``,
+    ``isdag`` and ``get_deps`` accept a ``CompactGraph`` in place of a graph,
+    so one instance can be passed around instead of recomputing
+    dependencies from the graph in each step.
+
+    The graph is a snapshot: changes to ``dsk`` after construction are not
+    reflected.
+
+    Examples
+    --------
+    >>> inc = lambda x: x + 1
+    >>> dsk = {'a': 1, 'b': (inc, 'a'), 'c': (inc, 'b'), 'd': (inc, 'a')}
+    >>> graph = CompactGraph(dsk)
+    >>> graph.toposort()
+    ['a', 'b', 'c', 'd']
+    >>> graph.dependents_of('a')
+    ['b', 'd']
+    >>> sorted(graph.cull(['c']))
+    ['a', 'b', 'c']
+    """
+
+    def __init__(self, dsk: Graph, dependencies: Mapping | None = None):
+        keys = list(dsk)
+        ntasks = len(keys)
+        index = {k: i for i, k in enumerate(keys)}
+        dep_ptr = array("q", [0])
+        dep_idx = array("q")
+        for i in range(ntasks):
+            if dependencies is not None:
+                deps = dependencies[keys[i]]
+            else:
+                task = dsk[keys[i]]
+                try:
+                    deps = task.dependencies
+                except AttributeError:
+                    deps = get_dependencies(dsk, task=task)
+            for d in deps:
+                j = index.get(d)
+                if j is None:
+                    j = index[d] = len(keys)
+                    keys.append(d)
+                dep_idx.append(j)
+            dep_ptr.append(len(dep_idx))
+        dep_ptr.extend([len(dep_idx)] * (len(keys) - ntasks))
+
+        self.keys = keys
+        self.index = index
+        self.ntasks = ntasks
+        self.dep_ptr = dep_ptr
+        self.dep_idx = dep_idx
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.index
+
+    def __repr__(self) -> str:
+        return f"<CompactGraph: {len(self.keys)} keys, {len(self.dep_idx)} edges>"
+
+    def dependencies_of(self, key: Key) -> list[Key]:
+        """Direct dependencies of ``key``"""
+        i = self.index[key]
+        keys, idx = self.keys, self.dep_idx
+        return [keys[idx[p]] for p in range(self.dep_ptr[i], self.dep_ptr[i + 1])]
+
+    def dependents_of(self, key: Key) -> list[Key]:
+        """Keys that directly depend on ``key``"""
+        i = self.index[key]
+        ptr, idx = self.dependents_csr
+        keys = self.keys
+        return [keys[idx[p]] for p in range(ptr[i], ptr[i + 1])]
+
+    @cached_property
+    def dependents_csr(self) -> tuple[array, array]:
+        """Dependents in CSR layout as ``(dpt_ptr, dpt_idx)``"""
+        n = len(self.keys)
+        dep_ptr, dep_idx = self.dep_ptr, self.dep_idx
+        # Counting sort over dep_idx
+        dpt_ptr = array("q", bytes(8 * (n + 1)))
+        for j in dep_idx:
+            dpt_ptr[j + 1] += 1
+        for i in range(n):
+            dpt_ptr[i + 1] += dpt_ptr[i]
+        dpt_idx = array("q", bytes(8 * len(dep_idx)))
+        fill = dpt_ptr[:-1]
+        for i in range(self.ntasks):
+            for p in range(dep_ptr[i], dep_ptr[i + 1]):
+                j = dep_idx[p]
+                dpt_idx[fill[j]] = i
+                fill[j] += 1
+        return dpt_ptr, dpt_idx
+
+    @cached_property
+    def _reversed(self) -> CompactGraph:
+        graph = object.__new__(CompactGraph)
+        graph.keys = self.keys
+        graph.index = self.index
+        graph.ntasks = len(self.keys)
+        graph.dep_ptr, graph.dep_idx = self.dependents_csr
+        graph.dependents_csr = (self.dep_ptr, self.dep_idx)
+        graph._reversed = self
+        return graph
+
+    def reverse(self) -> CompactGraph:
+        """Graph with all edges reversed, i.e. mapping keys to dependents"""
+        return self._reversed
+
+    @cached_property
+    def _deps(self) -> tuple[dict[Key, set[Key]], dict[Key, set[Key]]]:
+        keys = self.keys
+        dep_ptr, dep_idx = self.dep_ptr, self.dep_idx
+        dpt_ptr, dpt_idx = self.dependents_csr
+        dependencies = {
+            keys[i]: {keys[dep_idx[p]] for p in range(dep_ptr[i], dep_ptr[i + 1])}
+            for i in range(self.ntasks)
+        }
+        dependents = {
+            keys[i]: {keys[dpt_idx[p]] for p in range(dpt_ptr[i], dpt_ptr[i + 1])}
+            for i in range(len(keys))
+        }
+        return dependencies, dependents
+
+    def get_deps(self) -> tuple[dict[Key, set[Key]], dict[Key, set[Key]]]:
+        """Dependencies and dependents as dictionaries, like ``get_deps``
+
+        The dictionaries are cached and shared between calls; don't mutate
+        them.
+        """
+        return self._deps
+
+    def _roots(self, keys) -> list[int]:
+        if keys is None:
+            return list(range(len(self.keys)))
+        if not isinstance(keys, list):
+            keys = [keys]
+        return [self.index[k] for k in keys]
+
+    def _toposort(self, roots: list[int], returncycle: bool) -> list[Key]:
+        # Iterative depth-first search like ``_toposort``; ``status`` is 1
+        # for nodes on the current path and 2 for completed nodes
+        dep_ptr, dep_idx = self.dep_ptr, self.dep_idx
+        status = bytearray(len(self.keys))
+        ordered = []
+        for root in roots:
+            if status[root] == 2:
+                continue
+            stack = [root]
+            while stack:
+                cur = stack[-1]
+                if status[cur] == 2:
+                    stack.pop()
+                    continue
+                status[cur] = 1
+                pushed = False
+                for p in range(dep_ptr[cur], dep_ptr[cur + 1]):
+                    nxt = dep_idx[p]
+                    s = status[nxt]
+                    if not s:
+                        stack.append(nxt)
+                        pushed = True
+                    elif s == 1:
+                        # Let the dictionary implementation report the cycle
+                        return _toposort(
+                            None,
+                            keys=[self.keys[root]],
+                            returncycle=returncycle,
+                            dependencies=defaultdict(set, self._deps[0]),
+                        )
+                if not pushed:
+                    ordered.append(cur)
+                    status[cur] = 2
+                    stack.pop()
+        if returncycle:
+            return []
+        keys = self.keys
+        return [keys[i] for i in ordered]
+
+    @cached_property
+    def _toposorted(self) -> list[Key]:
+        return self._toposort(self._roots(None), returncycle=False)
+
+    def toposort(self) -> list[Key]:
+        """Keys sorted in topological order, dependencies first"""
+        return list(self._toposorted)
+
+    def getcycle(self, keys=None) -> list[Key]:
+        """A cycle reachable from ``keys``, or an empty list
+
+        See Also
+        --------
+        getcycle
+        """
+        if "_toposorted" in self.__dict__:
+            return []
+        return self._toposort(self._roots(keys), returncycle=True)
+
+    def isdag(self, keys=None) -> bool:
+        """Whether the graph reachable from ``keys`` is acyclic"""
+        return not self.getcycle(keys)
+
+    def cull(self, keys) -> set[Key]:
+        """Keys needed to compute ``keys``, including ``keys`` themselves"""
+        dep_ptr, dep_idx = self.dep_ptr, self.dep_idx
+        seen = bytearray(len(self.keys))
+        stack = self._roots(keys)
+        for i in stack:
+            seen[i] = 1
+        needed = []
+        while stack:
+            i = stack.pop()
+            needed.append(i)
+            for p in range(dep_ptr[i], dep_ptr[i + 1]):
+                j = dep_idx[p]
+                if not seen[j]:
+                    seen[j] = 1
+                    stack.append(j)
+        keys = self.keys
+        return {keys[i] for i in needed}
+
+
 class literal:
     """A small serializable object to wrap literal values without copying"""
 
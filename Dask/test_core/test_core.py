@@ -6,11 +6,13 @@ from collections import namedtuple
 import pytest
 
 from dask.core import (
+    CompactGraph,
     flatten,
     get,
     get_dependencies,
     get_deps,
     getcycle,
+    isdag,
     ishashable,
     iskey,
     istask,
@@ -18,6 +20,7 @@ from dask.core import (
     preorder_traversal,
     quote,
     subs,
+    toposort,
     validate_key,
 )
 from dask.utils_test import GetFunctionTestMixin, add, inc
@@ -304,3 +307,53 @@ def test_getcycle():
         9: [38, 32, 38, 7, 31, 34, 39, 20, 30, 18],
     }
     assert len(getcycle(dsk, list(dsk))) <= 4  # 0->1->2->0
+
+
+def test_compact_graph():
+    dsk = {
+        "a": 1,
+        "b": (inc, "a"),
+        "c": (add, "a", "b"),
+        "d": (inc, "c"),
+        "e": (inc, "missing"),
+    }
+    dependencies = dict(get_deps(dsk)[0], e={"missing"})
+    graph = CompactGraph(dsk, dependencies=dependencies)
+    assert len(graph) == 6 and graph.ntasks == 5
+    assert "missing" in graph
+    assert sorted(graph.dependencies_of("c")) == ["a", "b"]
+    assert sorted(graph.dependents_of("a")) == ["b", "c"]
+    assert graph.dependents_of("missing") == ["e"]
+    assert graph.reverse().dependencies_of("b") == ["c"]
+    assert graph.reverse().reverse() is graph
+
+    assert get_deps(graph)[0] == dependencies
+    assert get_deps(graph)[1]["missing"] == {"e"}
+
+    assert graph.cull(["d"]) == {"a", "b", "c", "d"}
+    assert graph.cull("e") == {"e", "missing"}
+    assert isdag(graph, "d")
+
+
+def test_compact_graph_toposort():
+    dsk = {("x", i): (inc, ("x", i - 1)) for i in range(1, 100)}
+    dsk[("x", 0)] = 0
+    dsk.update({("y", i): (add, ("x", i), ("x", 99 - i)) for i in range(100)})
+    graph = CompactGraph(dsk)
+    assert toposort(graph) == toposort(dsk)
+    assert graph.toposort() is not graph.toposort()  # callers may mutate
+
+    order = {key: i for i, key in enumerate(graph.toposort())}
+    assert all(
+        order[dep] < order[key] for key in dsk for dep in graph.dependencies_of(key)
+    )
+
+
+def test_compact_graph_cycle():
+    dsk = {"x": (inc, "z"), "y": (inc, "x"), "z": (inc, "y"), "w": (inc, "x")}
+    graph = CompactGraph(dsk)
+    assert getcycle(graph, "w") == getcycle(dsk, "w") == ["x", "z", "y", "x"]
+    assert not isdag(graph, ["w"])
+    with pytest.raises(RuntimeError, match="Cycle detected"):
+        toposort(graph)
+    assert isdag(CompactGraph({"x": 1, "y": (inc, "x")}), "y")
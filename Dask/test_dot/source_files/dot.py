@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import json
 import os
 import re
+import tempfile
+from contextlib import contextmanager
 from functools import partial
 
 from dask.core import get_dependencies, ishashable, istask
@@ -128,6 +131,7 @@ def to_graphviz(
     edge_attr=None,
     collapse_outputs=False,
     verbose=False,
+    collapse_prefixes=False,
     **kwargs,
 ):
     graphviz = import_required(
@@ -139,8 +143,6 @@ def to_graphviz(
         "  python -m pip install graphviz    # or pip install and follow installation instructions",
     )
 
-    data_attributes = data_attributes or {}
-    function_attributes = function_attributes or {}
     graph_attr = graph_attr or {}
     node_attr = node_attr or {}
     edge_attr = edge_attr or {}
@@ -153,6 +155,50 @@ def to_graphviz(
         graph_attr=graph_attr, node_attr=node_attr, edge_attr=edge_attr
     )
 
+    for element in _graph_elements(
+        dsk,
+        data_attributes,
+        function_attributes,
+        collapse_outputs,
+        verbose,
+        collapse_prefixes,
+    ):
+        if element[0] == "edge":
+            g.edge(element[1], element[2])
+        else:
+            _, node_name, is_function, label, attrs = element
+            attrs.setdefault("label", label)
+            attrs.setdefault("shape", "circle" if is_function else "box")
+            g.node(node_name, **attrs)
+    return g
+
+
+def _graph_elements(
+    dsk,
+    data_attributes=None,
+    function_attributes=None,
+    collapse_outputs=False,
+    verbose=False,
+    collapse_prefixes=False,
+):
+    """Yield the nodes and edges to draw for a dask graph
+
+    Nodes are yielded as ``("node", name, is_function, label, attrs)``
+    before the first edge that refers to them, edges as
+    ``("edge", source, target)``.  ``attrs`` is a fresh dictionary of user
+    provided attributes that the caller may modify.
+
+    See Also
+    --------
+    to_graphviz
+    """
+    if _should_collapse(dsk, collapse_prefixes):
+        yield from _collapsed_elements(dsk, verbose)
+        return
+
+    data_attributes = data_attributes or {}
+    function_attributes = function_attributes or {}
+
     seen = set()
     connected = set()
 
@@ -163,11 +209,9 @@ def to_graphviz(
             if collapse_outputs or func_name not in seen:
                 seen.add(func_name)
                 attrs = function_attributes.get(k, {}).copy()
-                attrs.setdefault("label", key_split(k))
-                attrs.setdefault("shape", "circle")
-                g.node(func_name, **attrs)
+                yield "node", func_name, True, key_split(k), attrs
             if not collapse_outputs:
-                g.edge(func_name, k_name)
+                yield "edge", func_name, k_name
                 connected.add(func_name)
                 connected.add(k_name)
 
@@ -176,26 +220,245 @@ def to_graphviz(
                 if dep_name not in seen:
                     seen.add(dep_name)
                     attrs = data_attributes.get(dep, {}).copy()
-                    attrs.setdefault("label", box_label(dep, verbose))
-                    attrs.setdefault("shape", "box")
-                    g.node(dep_name, **attrs)
-                g.edge(dep_name, func_name)
+                    yield "node", dep_name, False, box_label(dep, verbose), attrs
+                yield "edge", dep_name, func_name
                 connected.add(dep_name)
                 connected.add(func_name)
 
         elif ishashable(v) and v in dsk:
             v_name = name(v)
-            g.edge(v_name, k_name)
+            yield "edge", v_name, k_name
             connected.add(v_name)
             connected.add(k_name)
 
         if (not collapse_outputs or k_name in connected) and k_name not in seen:
             seen.add(k_name)
             attrs = data_attributes.get(k, {}).copy()
-            attrs.setdefault("label", box_label(k, verbose))
-            attrs.setdefault("shape", "box")
-            g.node(k_name, **attrs)
-    return g
+            yield "node", k_name, False, box_label(k, verbose), attrs
+
+
+# Graphs with more keys are drawn with ``collapse_prefixes="auto"`` as one
+# node per key prefix
+AUTO_COLLAPSE_THRESHOLD = 10_000
+
+
+def _should_collapse(dsk, collapse_prefixes):
+    if collapse_prefixes == "auto":
+        return len(dsk) > AUTO_COLLAPSE_THRESHOLD
+    return bool(collapse_prefixes)
+
+
+def key_prefix(key):
+    """The name shared by related keys, e.g. all chunks of an array
+
+    >>> key_prefix(('x', 1, 2))
+    'x'
+    >>> key_prefix('y')
+    'y'
+    """
+    if isinstance(key, tuple) and key:
+        return key[0]
+    return key
+
+
+def _collapsed_elements(dsk, verbose=False):
+    """Nodes and edges of a graph with keys grouped by ``key_prefix``
+
+    Each group is drawn as one function node (if any of its keys is a task)
+    and one data node labeled with the number of keys.  Edges between groups
+    are deduplicated.
+    """
+    counts = {}
+    tasks = set()
+    # (source prefix, target prefix, whether target is a function node),
+    # in a dict as an ordered set
+    edges = {}
+    for k, v in dsk.items():
+        prefix = key_prefix(k)
+        counts[prefix] = counts.get(prefix, 0) + 1
+        if istask(v):
+            tasks.add(prefix)
+            for dep in get_dependencies(dsk, k):
+                dep_prefix = key_prefix(dep)
+                if dep_prefix != prefix:
+                    edges[dep_prefix, prefix, True] = None
+        elif ishashable(v) and v in dsk:
+            v_prefix = key_prefix(v)
+            if v_prefix != prefix:
+                edges[v_prefix, prefix, False] = None
+
+    for prefix, count in counts.items():
+        data_name = name((prefix, "prefix"))
+        label = f"{count} keys" if count > 1 else box_label(prefix, verbose)
+        if prefix in tasks:
+            func_name = name((prefix, "prefix", "function"))
+            yield "node", func_name, True, key_split(prefix), {}
+            yield "node", data_name, False, label, {}
+            yield "edge", func_name, data_name
+        else:
+            yield "node", data_name, False, label, {}
+    for source, target, to_function in edges:
+        if to_function:
+            yield "edge", name((source, "prefix")), name((target, "prefix", "function"))
+        else:
+            yield "edge", name((source, "prefix")), name((target, "prefix"))
+
+
+# Quoting as in ``graphviz.quoting``, so that ``write_dot`` writes the same
+# source as ``to_graphviz``
+_DOT_ID = re.compile(r"([a-zA-Z_][a-zA-Z0-9_]*|-?(\.[0-9]+|[0-9]+(\.[0-9]*)?))$")
+_DOT_HTML = re.compile(r"<.*>$", re.DOTALL)
+_DOT_QUOTE = re.compile(r'(?P<backslashes>(?:\\{2})*)\\?(?P<quote>")')
+_DOT_KEYWORDS = frozenset({"node", "edge", "graph", "digraph", "subgraph", "strict"})
+
+
+def _dot_quote(s):
+    """Quote ``s`` unless it's an ID or an HTML-like ``<...>`` string.  Escapes
+    like ``\\n`` are kept, only quotes that aren't escaped yet are escaped.
+    """
+    s = str(s)
+    if _DOT_HTML.match(s):
+        return s
+    if _DOT_ID.match(s) and s.lower() not in _DOT_KEYWORDS:
+        return s
+    return '"' + _DOT_QUOTE.sub(r"\g<backslashes>\\\g<quote>", s) + '"'
+
+
+def _dot_attrs(attrs, label=None):
+    """Attributes sorted by name, after the ``label`` if given"""
+    items = [] if label is None else [("label", label)]
+    items += sorted((k, v) for k, v in attrs.items() if v is not None)
+    return " ".join(f"{_dot_quote(k)}={_dot_quote(v)}" for k, v in items)
+
+
+@contextmanager
+def _open_text(file):
+    if hasattr(file, "write"):
+        yield file
+    else:
+        with open(file, "w") as f:
+            yield f
+
+
+def write_dot(
+    dsk,
+    file,
+    data_attributes=None,
+    function_attributes=None,
+    rankdir="BT",
+    graph_attr=None,
+    node_attr=None,
+    edge_attr=None,
+    collapse_outputs=False,
+    verbose=False,
+    collapse_prefixes="auto",
+    **kwargs,
+):
+    """Write a dask graph in DOT format
+
+    Produces the same graph as ``to_graphviz``, but writes it to ``file``
+    while walking the graph, without building a ``graphviz.Digraph`` in
+    memory or requiring the ``graphviz`` library.  The result can be
+    rendered with the ``dot`` command line tool.
+
+    Parameters
+    ----------
+    dsk : dict
+        The graph to write.
+    file : str, path-like or file-like
+        Path or text file object to write to.
+    collapse_prefixes : bool or "auto", optional
+        Draw one node per key prefix (e.g. all ``('x', i)`` chunks) labeled
+        with the number of keys, instead of one node per key.  With "auto",
+        the default, graphs with more than ``AUTO_COLLAPSE_THRESHOLD`` keys
+        are collapsed.
+    **kwargs
+        Other arguments as for ``to_graphviz``.
+
+    See Also
+    --------
+    to_graphviz
+    write_cytoscape_json
+    """
+    graph_attr = dict(graph_attr or {}, rankdir=rankdir, **kwargs)
+    node_attr = dict(node_attr or {}, fontname="helvetica")
+    with _open_text(file) as f:
+        f.write("digraph {\n")
+        f.write(f"\tgraph [{_dot_attrs(graph_attr)}]\n")
+        f.write(f"\tnode [{_dot_attrs(node_attr)}]\n")
+        if edge_attr:
+            f.write(f"\tedge [{_dot_attrs(edge_attr)}]\n")
+        for element in _graph_elements(
+            dsk,
+            data_attributes,
+            function_attributes,
+            collapse_outputs,
+            verbose,
+            collapse_prefixes,
+        ):
+            if element[0] == "edge":
+                f.write(f"\t{_dot_quote(element[1])} -> {_dot_quote(element[2])}\n")
+            else:
+                _, node_name, is_function, label, attrs = element
+                label = attrs.pop("label", label)
+                attrs.setdefault("shape", "circle" if is_function else "box")
+                f.write(f"\t{_dot_quote(node_name)} [{_dot_attrs(attrs, label)}]\n")
+        f.write("}\n")
+
+
+def write_cytoscape_json(
+    dsk,
+    file,
+    data_attributes=None,
+    function_attributes=None,
+    collapse_outputs=False,
+    verbose=False,
+    collapse_prefixes="auto",
+):
+    """Write a dask graph as Cytoscape JSON
+
+    Produces the same ``{"nodes": [...], "edges": [...]}`` document as
+    ``_to_cytoscape_json`` but writes it to ``file`` while walking the
+    graph.  Edges are buffered in a temporary file until all nodes have
+    been written, so memory use doesn't grow with the size of the graph.
+
+    Parameters
+    ----------
+    dsk : dict
+        The graph to write.
+    file : str, path-like or file-like
+        Path or text file object to write to.
+    collapse_prefixes : bool or "auto", optional
+        See ``write_dot``.
+
+    See Also
+    --------
+    cytoscape_graph
+    write_dot
+    """
+    with _open_text(file) as f, tempfile.TemporaryFile("w+") as edges:
+        f.write('{"nodes": [')
+        sep = ""
+        edge_sep = ""
+        for element in _graph_elements(
+            dsk,
+            data_attributes,
+            function_attributes,
+            collapse_outputs,
+            verbose,
+            collapse_prefixes,
+        ):
+            if element[0] == "edge":
+                edges.write(edge_sep + json.dumps(_cytoscape_edge(element)))
+                edge_sep = ", "
+            else:
+                f.write(sep + json.dumps(_cytoscape_node(element)))
+                sep = ", "
+        f.write('], "edges": [')
+        edges.seek(0)
+        while chunk := edges.read(1 << 20):
+            f.write(chunk)
+        f.write("]}\n")
 
 
 IPYTHON_IMAGE_FORMATS = frozenset(["jpeg", "png"])
@@ -316,6 +579,7 @@ def _to_cytoscape_json(
     function_attributes=None,
     collapse_outputs=False,
     verbose=False,
+    collapse_prefixes=False,
     **kwargs,
 ):
     """
@@ -326,91 +590,36 @@ def _to_cytoscape_json(
     edges = []
     data = {"nodes": nodes, "edges": edges}
 
-    data_attributes = data_attributes or {}
-    function_attributes = function_attributes or {}
-
-    seen = set()
-    connected = set()
+    for element in _graph_elements(
+        dsk,
+        data_attributes,
+        function_attributes,
+        collapse_outputs,
+        verbose,
+        collapse_prefixes,
+    ):
+        if element[0] == "edge":
+            edges.append(_cytoscape_edge(element))
+        else:
+            nodes.append(_cytoscape_node(element))
+    return data
 
-    for k, v in dsk.items():
-        k_name = name(k)
-        if istask(v):
-            func_name = name((k, "function")) if not collapse_outputs else k_name
-            if collapse_outputs or func_name not in seen:
-                seen.add(func_name)
-                attrs = function_attributes.get(k, {}).copy()
-                nodes.append(
-                    {
-                        "data": {
-                            "id": func_name,
-                            "label": key_split(k),
-                            "shape": "ellipse",
-                            "color": "gray",
-                            **attrs,
-                        }
-                    }
-                )
-            if not collapse_outputs:
-                edges.append({"data": {"source": func_name, "target": k_name}})
 
-                connected.add(func_name)
-                connected.add(k_name)
+def _cytoscape_node(element):
+    _, node_name, is_function, label, attrs = element
+    return {
+        "data": {
+            "id": node_name,
+            "label": label,
+            "shape": "ellipse" if is_function else "rectangle",
+            "color": "gray",
+            **attrs,
+        }
+    }
 
-            for dep in get_dependencies(dsk, k):
-                dep_name = name(dep)
-                if dep_name not in seen:
-                    seen.add(dep_name)
-                    attrs = data_attributes.get(dep, {}).copy()
-                    nodes.append(
-                        {
-                            "data": {
-                                "id": dep_name,
-                                "label": box_label(dep, verbose),
-                                "shape": "rectangle",
-                                "color": "gray",
-                                **attrs,
-                            }
-                        }
-                    )
-                edges.append(
-                    {
-                        "data": {
-                            "source": dep_name,
-                            "target": func_name,
-                        }
-                    }
-                )
-                connected.add(dep_name)
-                connected.add(func_name)
 
-        elif ishashable(v) and v in dsk:
-            v_name = name(v)
-            edges.append(
-                {
-                    "data": {
-                        "source": v_name,
-                        "target": k_name,
-                    }
-                }
-            )
-            connected.add(v_name)
-            connected.add(k_name)
-
-        if (not collapse_outputs or k_name in connected) and k_name not in seen:
-            seen.add(k_name)
-            attrs = data_attributes.get(k, {}).copy()
-            nodes.append(
-                {
-                    "data": {
-                        "id": k_name,
-                        "label": box_label(k, verbose),
-                        "shape": "rectangle",
-                        "color": "gray",
-                        **attrs,
-                    }
-                }
-            )
-    return data
+def _cytoscape_edge(element):
+    return {"data": {"source": element[1], "target": element[2]}}
 
 
 def cytoscape_graph(
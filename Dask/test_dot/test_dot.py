@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import copy
+import io
+import json
 import os
 import re
 import sys
@@ -393,3 +395,64 @@ def test_immutable_attributes(viz_func):
 
     assert attrs_func_test == attrs_func
     assert attrs_data_test == attrs_data
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"verbose": True}, {"collapse_outputs": True}])
+def test_write_dot(tmp_path, kwargs):
+    from dask.dot import write_dot
+
+    path = tmp_path / "mydask.dot"
+    write_dot(dsk, path, collapse_prefixes=False, **kwargs)
+    assert path.read_text() == to_graphviz(dsk, **kwargs).source
+
+    buf = io.StringIO()
+    write_dot(dsk, buf, rankdir="LR", edge_attr={"color": "red"})
+    assert (
+        buf.getvalue()
+        == to_graphviz(dsk, rankdir="LR", edge_attr={"color": "red"}).source
+    )
+
+    # DOT escapes, quotes and HTML-like labels are written as graphviz does
+    attrs = {
+        "data_attributes": {
+            "a": {"label": "line\\nbreak", "color": "blue"},
+            "b": {"label": "<<b>b</b>>", "tooltip": 'say "hi" \\"there\\"'},
+        },
+        "function_attributes": {"c": {"style": "filled", "label": "neg\\l"}},
+    }
+    buf = io.StringIO()
+    write_dot(dsk, buf, **attrs)
+    assert buf.getvalue() == to_graphviz(dsk, **attrs).source
+    assert '[label="line\\nbreak" color=blue shape=box]' in buf.getvalue()
+
+
+def test_write_cytoscape_json(tmp_path):
+    from dask.dot import write_cytoscape_json
+
+    path = tmp_path / "mydask.json"
+    write_cytoscape_json(dsk, path)
+    assert json.loads(path.read_text()) == _to_cytoscape_json(dsk)
+
+    buf = io.StringIO()
+    write_cytoscape_json({}, buf)
+    assert json.loads(buf.getvalue()) == {"nodes": [], "edges": []}
+
+
+def test_collapse_prefixes():
+    big = {("x", i): i for i in range(100)}
+    big.update({("y", i): (add, ("x", i), ("x", i + 1)) for i in range(99)})
+    big["z"] = (sum, [("y", i) for i in range(99)])
+    big["w"] = "z"
+
+    data = _to_cytoscape_json(big, collapse_prefixes=True)
+    labels = sorted(n["data"]["label"] for n in data["nodes"])
+    assert labels == ["", "", "100 keys", "99 keys", "y", "z"]
+    assert len(data["edges"]) == 5
+
+    g = to_graphviz(big, collapse_prefixes=True)
+    labels = list(filter(None, map(get_label, g.body)))
+    assert len(labels) == 6
+
+    # "auto" only collapses large graphs
+    data = _to_cytoscape_json(big, collapse_prefixes="auto")
+    assert len(data["nodes"]) == len(_to_cytoscape_json(big)["nodes"])
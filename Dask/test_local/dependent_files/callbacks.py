@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from collections.abc import Callable
 from contextlib import contextmanager
+from functools import cached_property
 from typing import ClassVar
 
 __all__ = ["Callback", "add_callbacks"]
@@ -22,8 +23,14 @@ class Callback:
     ...     pass
     >>> def finish(dsk, state, failed):
     ...     pass
+    >>> def posttask_batch(events, dsk, state):
+    ...     pass
 
-    You may then construct a callback object with any number of them
+    You may then construct a callback object with any number of them.
+    ``posttask_batch`` is an alternative to ``posttask`` for callbacks whose
+    per-task overhead matters: the local schedulers call it once per
+    scheduler iteration with a list of ``(key, result, worker_id)`` events
+    for all tasks that finished in that iteration.
 
     >>> cb = Callback(pretask=pretask, finish=finish)
 
@@ -50,7 +57,13 @@ class Callback:
     active: ClassVar[set[tuple[Callable | None, ...]]] = set()
 
     def __init__(
-        self, start=None, start_state=None, pretask=None, posttask=None, finish=None
+        self,
+        start=None,
+        start_state=None,
+        pretask=None,
+        posttask=None,
+        finish=None,
+        posttask_batch=None,
     ):
         if start:
             self._start = start
@@ -62,11 +75,17 @@ class Callback:
             self._posttask = posttask
         if finish:
             self._finish = finish
+        if posttask_batch:
+            self._posttask_batch = posttask_batch
 
-    @property
+    @cached_property
     def _callback(self) -> tuple[Callable | None, ...]:
         fields = ["_start", "_start_state", "_pretask", "_posttask", "_finish"]
-        return tuple(getattr(self, i, None) for i in fields)
+        callback = tuple(getattr(self, i, None) for i in fields)
+        posttask_batch = getattr(self, "_posttask_batch", None)
+        if posttask_batch:
+            callback += (posttask_batch,)
+        return callback
 
     def __enter__(self):
         self._cm = add_callbacks(self)
@@ -83,12 +102,15 @@ class Callback:
         Callback.active.remove(self._callback)
 
 
-def unpack_callbacks(cbs):
-    """Take an iterable of callbacks, return a list of each callback."""
-    if cbs:
-        return [[i for i in f if i] for f in zip(*cbs)]
-    else:
-        return [(), (), (), (), ()]
+def unpack_callbacks(cbs, batched=False):
+    """Take an iterable of callbacks, return a list of each callback.
+
+    Callback tuples have five entries, optionally followed by a
+    ``posttask_batch`` callback.  Those are only returned, as a sixth list,
+    if ``batched=True``.
+    """
+    n = 6 if batched else 5
+    return [[cb[i] for cb in cbs if len(cb) > i and cb[i]] for i in range(n)]
 
 
 @contextmanager
@@ -122,7 +144,7 @@ class add_callbacks:
 
     Takes several callbacks and applies them only in the enclosed context.
     Callbacks can either be represented as a ``Callback`` object, or as a tuple
-    of length 4.
+    of length 5, or 6 to include a ``posttask_batch`` callback.
 
     Examples
     --------
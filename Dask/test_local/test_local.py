@@ -1,9 +1,24 @@
 from __future__ import annotations
 
+import io
+import json
+import os
+import threading
+import time
+
 import pytest
 
 import dask
-from dask.local import finish_task, get_sync, sortkey, start_state_from_dask
+from dask.local import (
+    CompactState,
+    SchedulerTrace,
+    SpillCache,
+    _pop_releasing,
+    finish_task,
+    get_sync,
+    sortkey,
+    start_state_from_dask,
+)
 from dask.order import order
 from dask.utils_test import GetFunctionTestMixin, add, inc
 
@@ -91,6 +106,81 @@ def test_finish_task():
     }
 
 
+@pytest.mark.parametrize(
+    "dsk",
+    [
+        {"x": 1, "y": 2, "z": (inc, "x"), "w": (add, "z", "y")},
+        {"a": [1, (inc, 2)], "b": [1, 2, 3, 4], "c": (inc, 3)},
+        {"x": 1, "y": "x", "z": (inc, "y")},
+        fib_dask,
+    ],
+)
+def test_compact_state_matches_start_state(dsk):
+    expected = start_state_from_dask(dsk)
+    state = CompactState(dsk)
+    assert set(state) == set(expected)
+    for name in ["dependencies", "dependents", "waiting", "waiting_data", "cache"]:
+        assert dict(state[name]) == expected[name]
+    assert sorted(state["ready"], key=sortkey) == sorted(expected["ready"], key=sortkey)
+    assert len(state["waiting"]) == len(expected["waiting"])
+
+
+def test_compact_state_looks_at_cache():
+    state = CompactState({"b": (inc, "a")}, {"a": 1})
+    assert state["dependencies"]["b"] == {"a"}
+    assert list(state["ready"]) == ["b"]
+
+
+def test_compact_state_ready_by_priority():
+    dsk = {("x", i): (inc, i) for i in range(10)}
+    dsk["y"] = (sum, sorted(dsk))
+    keyorder = order(dsk)
+    state = CompactState(dsk, sortkey=keyorder.get)
+    popped = [state["ready"].pop() for _ in range(10)]
+    assert popped == sorted(popped, key=keyorder.get)
+    with pytest.raises(IndexError):
+        state["ready"].pop()
+
+
+def test_compact_state_finish_task():
+    dsk = {"x": 1, "y": 2, "z": (inc, "x"), "w": (add, "z", "y")}
+    state = CompactState(dsk)
+    assert state["ready"].pop() == "z"
+    state["running"].update({"z", "other-task"})
+
+    state["cache"]["z"] = 2
+    finish_task(dsk, "z", state, set(), order(dsk).get)
+
+    assert state["cache"] == {"y": 2, "z": 2}
+    assert state["finished"] == {"z"}
+    assert state["released"] == {"x"}
+    assert state["running"] == {"other-task"}
+    assert list(state["ready"]) == ["w"]
+    assert dict(state["waiting"]) == {}
+    assert dict(state["waiting_data"]) == {"y": {"w"}, "z": {"w"}}
+
+
+class TestGetAsyncCompactState(GetFunctionTestMixin):
+    @staticmethod
+    def get(dsk, keys, **kwargs):
+        return get_sync(dsk, keys, compact_state=True, **kwargs)
+
+
+def test_compact_state_callbacks():
+    from dask.callbacks import Callback
+
+    dependencies = {}
+
+    def posttask(key, result, dsk, state, worker_id):
+        dependencies[key] = state["dependencies"][key]
+
+    dsk = {"x": 1, "y": (inc, "x"), "z": (add, "x", "y")}
+    with dask.config.set({"local.compact-state": True}):
+        with Callback(posttask=posttask):
+            assert get_sync(dsk, "z") == 3
+    assert dependencies == {"y": {"x"}, "z": {"x", "y"}}
+
+
 class TestGetAsync(GetFunctionTestMixin):
     get = staticmethod(get_sync)
 
@@ -190,3 +280,255 @@ def test_complex_ordering():
     with Callback(pretask=track_order):
         get_sync(dsk, exp_order[-1])
     assert actual_order == exp_order
+
+
+def test_scheduler_trace():
+    dsk = {"x": 1, "y": (inc, "x"), "z": (add, "y", "x"), "w": (inc, "z")}
+    with SchedulerTrace() as trace:
+        assert get_sync(dsk, "w") == 4
+    assert not SchedulerTrace.active
+
+    assert [t.key for t in trace.tasks] == ["y", "z", "w"]
+    for t in trace.tasks:
+        assert (
+            t.ready
+            <= t.submitted
+            <= t.start
+            <= t.exec_start
+            <= t.exec_end
+            <= t.end
+            <= t.received
+        )
+    # Tasks become ready when their last dependency is done
+    y, z, w = trace.tasks
+    assert y.received <= z.ready <= w.ready
+
+    phases = trace.phases()
+    assert len(phases["execution"]) == 3
+    assert len(phases["scheduler busy"]) == 1
+    summary = trace.summary()
+    assert "queue wait" in summary
+    assert "scheduler busy" in summary
+
+    f = io.StringIO()
+    trace.write_chrome_trace(f)
+    events = json.loads(f.getvalue())["traceEvents"]
+    tasks = [e for e in events if e.get("cat") == "task"]
+    assert sorted(e["args"]["key"] for e in tasks) == ["w", "y", "z"]
+    assert all(e["ph"] == "X" and e["ts"] >= 0 for e in tasks)
+
+
+def test_scheduler_trace_keyword():
+    trace = SchedulerTrace()
+    dsk = {"x": 1, "y": (inc, "x")}
+    assert get_sync(dsk, "y", trace=trace) == 2
+    assert get_sync(dsk, "y", trace=trace) == 2
+    assert len(trace.tasks) == len(trace.runs) == 2
+
+    # Not recorded without a trace
+    assert get_sync(dsk, "y") == 2
+    assert len(trace.tasks) == 2
+
+
+def test_scheduler_trace_error():
+    def bad(x):
+        raise ValueError("12345")
+
+    with SchedulerTrace() as trace:
+        with pytest.raises(ValueError, match="12345"):
+            get_sync({"x": 1, "y": (inc, "x"), "z": (bad, "y")}, "z")
+    assert [t.key for t in trace.tasks] == ["y"]
+    assert len(trace.runs) == 1
+
+
+def test_scheduler_trace_work_stealing():
+    from dask.threaded import get
+
+    dsk = {("x", i): (inc, i) for i in range(10)}
+    dsk["y"] = (sum, list(dsk))
+    with SchedulerTrace() as trace:
+        assert get(dsk, "y", scheduler="work-stealing", num_workers=2) == 55
+    assert len(trace.tasks) == 11
+    assert trace.tasks[-1].key == "y"
+    assert all(t.ready <= t.exec_start <= t.exec_end for t in trace.tasks)
+
+
+def slow_inc(x):
+    time.sleep(0.001)
+    return x + 1
+
+
+@pytest.mark.parametrize("hook", ["pretask", "posttask", "posttask_batch"])
+def test_work_stealing_callback_exception(hook):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from dask.callbacks import Callback
+    from dask.local import get_async_work_stealing
+
+    threads = {}
+
+    def submit(worker, i):
+        def run():
+            threads[i] = threading.get_ident()
+            return worker(i)
+
+        return pool.submit(run)
+
+    def raises(*args):
+        # Worker 0, which the caller waits on first, keeps going
+        if threading.get_ident() == threads.get(1):
+            raise ValueError("callback failed")
+
+    dsk = {("x", i): (slow_inc, i) for i in range(100)}
+    dsk["z"] = (sum, list(dsk))
+    with ThreadPoolExecutor(2) as pool, Callback(**{hook: raises}):
+        with pytest.raises(ValueError, match="callback failed"):
+            get_async_work_stealing(submit, 2, dsk, "z")
+
+
+def test_spill_cache(tmp_path):
+    from dask.sizeof import sizeof
+
+    cache = SpillCache(int(1.5 * sizeof(list(range(100)))), directory=str(tmp_path))
+    cache["x"] = list(range(100))
+    assert cache.spills == 0
+    cache["y"] = list(range(100))
+    # "x" is the least recently used
+    assert cache.spills == 1
+    assert set(cache.disk) == {"x"}
+    assert set(cache) == {"x", "y"}
+    assert cache.spilled_bytes == cache.sizes["x"]
+    assert len(os.listdir(tmp_path)) == 1
+
+    assert cache["x"] == list(range(100))
+    assert cache.loads == 1
+    # "x" keeps its file, "y" is spilled
+    assert set(cache.disk) == {"x", "y"}
+    assert set(cache.memory) == {"x"}
+    assert cache["x"] == list(range(100))
+    assert cache.loads == 1
+
+    del cache["y"]
+    assert "y" not in cache
+    assert len(os.listdir(tmp_path)) == 1
+    assert cache.total_bytes == cache.sizes["x"]
+
+    # Values that can't be pickled stay in memory
+    cache["lock"] = threading.Lock()
+    cache["z"] = list(range(100))
+    assert "lock" in cache.memory
+    assert "lock" not in cache.disk
+
+    cache.close()
+    assert not len(cache)
+    assert not os.listdir(tmp_path)
+
+
+def test_spill_cache_temporary_directory(tmp_path):
+    with dask.config.set(temporary_directory=str(tmp_path)):
+        cache = SpillCache("1 kiB")
+        cache["x"] = list(range(1000))
+        assert cache.spilled_bytes
+        (directory,) = os.listdir(tmp_path)
+        assert os.listdir(tmp_path / directory)
+        cache.close()
+    assert not os.listdir(tmp_path)
+
+
+def test_pop_releasing():
+    dsk = {
+        "a": 1,
+        "b": 2,
+        "x": (inc, "a"),
+        "y": (inc, "b"),
+        "z": (add, "a", "y"),
+    }
+    state = start_state_from_dask(dsk)
+    assert sorted(state["ready"]) == ["x", "y"]
+    state["ready"] = ["y", "x"]
+    # Running "x" doesn't release "a", still needed by "z", but "y" releases "b"
+    assert _pop_releasing(state, {"x", "z"}, {"a": 100, "b": 10}) == "y"
+    assert state["ready"] == ["x"]
+    # Without anything to release the usual order is kept
+    state["ready"].insert(0, "y")
+    assert _pop_releasing(state, {"b", "x", "z"}, {"a": 100, "b": 10}) == "x"
+    assert state["ready"] == ["y"]
+
+
+@pytest.mark.parametrize("compact_state", [False, True])
+def test_get_memory_limit(compact_state, tmp_path):
+    from dask.callbacks import Callback
+
+    caches = []
+
+    def finish(dsk, state, errored):
+        caches.append(state["cache"])
+
+    dsk = {("x", i): (list, (range, i, 1000 + i)) for i in range(10)}
+    dsk.update({("y", i): (sum, ("x", i)) for i in range(10)})
+    dsk["z"] = (sum, [("y", i) for i in range(10)])
+    with Callback(finish=finish):
+        result = get_sync(
+            dsk,
+            ["z", ("x", 3)],
+            memory_limit="20 kiB",
+            spill_directory=str(tmp_path),
+            compact_state=compact_state,
+        )
+    assert result == (sum(range(1000)) * 10 + 45 * 1000, list(range(3, 1003)))
+    (cache,) = caches
+    assert isinstance(cache, SpillCache)
+    assert cache.spills
+    # Spilled files are removed afterwards
+    assert not os.listdir(tmp_path)
+
+    caches.clear()
+    with dask.config.set({"local.memory-limit": "20 kiB"}):
+        with Callback(finish=finish):
+            assert get_sync(dsk, "z") == sum(range(1000)) * 10 + 45 * 1000
+    assert isinstance(caches[0], SpillCache)
+
+
+def test_get_spill_cache():
+    cache = SpillCache("1 kiB")
+    dsk = {"a": (list, (range, 1000)), "b": (len, "a"), "c": (inc, "b")}
+    assert get_sync(dsk, "c", cache=cache) == 1001
+    assert cache.spills
+    # Intermediate results are released, the cache is left to the caller
+    assert set(cache) == {"c"}
+    assert not cache.disk
+    cache.close()
+
+
+def test_get_memory_limit_user_cache(tmp_path):
+    cache = {"e": 5}
+    dsk = {
+        "a": (list, (range, 1000)),
+        "b": (len, "a"),
+        "c": (inc, "b"),
+        "d": (list, (range, 1000)),
+    }
+    result = get_sync(
+        dsk, ["c", "d"], cache=cache, memory_limit="1 kiB", spill_directory=tmp_path
+    )
+    assert result == (1001, list(range(1000)))
+    # The cache ends up as without a memory limit
+    assert cache == {"e": 5, "c": 1001, "d": list(range(1000))}
+    assert not os.listdir(tmp_path)
+
+
+def test_work_stealing_memory_limit():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from dask.local import get_async_work_stealing
+
+    dsk = {"x": 1, "y": (inc, "x")}
+    with ThreadPoolExecutor(2) as pool:
+        with pytest.raises(ValueError, match="memory_limit"):
+            get_async_work_stealing(pool.submit, 2, dsk, "y", memory_limit="1 GiB")
+        with pytest.raises(ValueError, match="memory_limit"):
+            get_async_work_stealing(pool.submit, 2, dsk, "y", cache=SpillCache("1 GiB"))
+        with dask.config.set({"local.memory-limit": "1 GiB"}):
+            with pytest.raises(ValueError, match="memory_limit"):
+                get_async_work_stealing(pool.submit, 2, dsk, "y")
+        assert get_async_work_stealing(pool.submit, 2, dsk, "y") == 2
@@ -57,6 +57,9 @@ Changing state
 5.  waiting_data: available data to yet-to-be-run-tasks :: {key: {keys}}
     Real-time equivalent of dependents
 
+For large graphs ``CompactState`` holds the same information in integer
+arrays and a heap of ready tasks while exposing the same keys.
+
 
 Examples
 --------
@@ -109,18 +112,34 @@ See the function ``inline_functions`` for more information.
 
 from __future__ import annotations
 
+import contextlib
+import heapq
+import json
 import os
-from collections.abc import Mapping, Sequence
+import pickle
+import shutil
+import tempfile
+import threading
+import weakref
+from array import array
+from collections import OrderedDict, deque
+from collections.abc import Mapping, MutableMapping, Sequence
 from concurrent.futures import Executor, Future
 from functools import partial
+from itertools import count
 from queue import Empty, Queue
+from time import time
+from typing import ClassVar, NamedTuple
 
 from dask import config
 from dask._task_spec import DataNode, DependenciesMapping, convert_legacy_graph
 from dask.callbacks import local_callbacks, unpack_callbacks
-from dask.core import flatten, get_dependencies, reverse_dict
+from dask.core import CompactGraph, flatten, get_dependencies, reverse_dict
 from dask.order import order
+from dask.sizeof import sizeof
+from dask.system import resources
 from dask.typing import Key
+from dask.utils import format_time, key_split, parse_bytes
 
 if os.name == "nt":
     # Python 3 windows Queue.get doesn't handle interrupts properly. To
@@ -205,6 +224,449 @@ def start_state_from_dask(dsk, cache=None, sortkey=None):
     return state
 
 
+class _StateView(Mapping):
+    """Read-only ``{key: set}`` mapping computed from a ``CompactState``
+
+    Entries are built on access so that callbacks can look up single keys
+    without materializing the whole mapping.
+    """
+
+    def __init__(self, state, getter, include, length=None):
+        self._state = state
+        self._getter = getter
+        self._include = include
+        self._length = length
+
+    def __getitem__(self, key):
+        i = self._state._index.get(key)
+        if i is None or not self._include(i):
+            raise KeyError(key)
+        return self._getter(i)
+
+    def __iter__(self):
+        keys = self._state._keys
+        return (keys[i] for i in range(len(keys)) if self._include(i))
+
+    def __len__(self):
+        if self._length is not None:
+            return self._length()
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class _ReadyHeap:
+    """Ready tasks kept in a heap, ``pop`` returns the smallest ``sortkey``
+
+    Iteration yields keys in the order of the ``ready`` list built by
+    ``start_state_from_dask``, i.e. the next task to run comes last.
+    """
+
+    __slots__ = ("_heap", "_sortkey", "_count")
+
+    def __init__(self, keys, sortkey):
+        self._sortkey = sortkey
+        self._count = count()
+        self._heap = [(sortkey(k), next(self._count), k) for k in keys]
+        heapq.heapify(self._heap)
+
+    def append(self, key):
+        heapq.heappush(self._heap, (self._sortkey(key), next(self._count), key))
+
+    def pop(self):
+        try:
+            return heapq.heappop(self._heap)[2]
+        except IndexError:
+            raise IndexError("pop from empty ready heap") from None
+
+    def clear(self):
+        self._heap.clear()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __iter__(self):
+        return (k for _, _, k in sorted(self._heap, reverse=True))
+
+    def __reversed__(self):
+        return (k for _, _, k in sorted(self._heap))
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class CompactState(Mapping):
+    """Array-backed equivalent of ``start_state_from_dask``
+
+    Keys are interned to integer ids, dependencies and dependents are stored
+    as CSR arrays in a ``dask.core.CompactGraph`` (available as ``graph``)
+    and the ``waiting`` and ``waiting_data`` sets are replaced by per-key
+    counters.  Ready tasks are kept in a heap keyed by ``sortkey``
+    so nothing is sorted when tasks finish.
+
+    The object behaves like the ``state`` dictionary for callbacks.
+    ``cache``, ``ready``, ``running``, ``finished`` and ``released`` are the
+    live containers, ``dependencies``, ``dependents``, ``waiting`` and
+    ``waiting_data`` are read-only views computed on access.
+
+    Examples
+    --------
+    >>> inc = lambda x: x + 1
+    >>> add = lambda x, y: x + y
+    >>> dsk = {'x': 1, 'y': 2, 'z': (inc, 'x'), 'w': (add, 'z', 'y')}
+    >>> state = CompactState(dsk)
+    >>> state['cache']
+    {'x': 1, 'y': 2}
+    >>> dict(state['waiting'])
+    {'w': {'z'}}
+    >>> state['ready'].pop()
+    'z'
+
+    See Also
+    --------
+    start_state_from_dask
+    """
+
+    def __init__(self, dsk, cache=None, sortkey=None):
+        if sortkey is None:
+            sortkey = order(dsk).get
+        if cache is None:
+            cache = config.get("cache", None)
+        if cache is None:
+            cache = dict()
+
+        dsk = convert_legacy_graph(dsk, all_keys=set(dsk) | set(cache))
+        graph = CompactGraph(dsk)
+        keys = graph.keys
+        index = graph.index
+        ntasks = graph.ntasks
+        n = len(keys)
+        dep_ptr, dep_idx = graph.dep_ptr, graph.dep_idx
+        dpt_ptr, dpt_idx = graph.dependents_csr
+
+        is_task = bytearray(b"\x01" * ntasks + bytes(n - ntasks))
+        for i in range(ntasks):
+            node = dsk[keys[i]]
+            if isinstance(node, DataNode):
+                cache[keys[i]] = node()
+                is_task[i] = 0
+
+        available = bytearray(n)
+        for k in cache:
+            i = index.get(k)
+            if i is not None:
+                available[i] = 1
+
+        nwaiting = array("q", bytes(8 * n))
+        nwaiting_data = array("q", bytes(8 * n))
+        ready = []
+        for i in range(n):
+            nwaiting_data[i] = dpt_ptr[i + 1] - dpt_ptr[i]
+            if not is_task[i]:
+                continue
+            w = 0
+            for p in range(dep_ptr[i], dep_ptr[i + 1]):
+                if not available[dep_idx[p]]:
+                    w += 1
+            nwaiting[i] = w
+            if not w:
+                ready.append(keys[i])
+
+        self.graph = graph
+        self._keys = keys
+        self._index = index
+        self._dep_ptr = dep_ptr
+        self._dep_idx = dep_idx
+        self._dpt_ptr = dpt_ptr
+        self._dpt_idx = dpt_idx
+        self._available = available
+        self._nwaiting = nwaiting
+        self._nwaiting_data = nwaiting_data
+        self._ntasks_waiting = sum(1 for w in nwaiting if w)
+
+        self.cache = cache
+        self.ready = _ReadyHeap(ready, sortkey)
+        self.running = set()
+        self.finished = set()
+        self.released = set()
+        self._state = {
+            "dependencies": _StateView(
+                self, self._dependencies, lambda i: i < ntasks, lambda: ntasks
+            ),
+            "dependents": _StateView(
+                self, self._dependents, lambda i: True, lambda: len(self._keys)
+            ),
+            "waiting": _StateView(
+                self,
+                self._waiting,
+                lambda i: self._nwaiting[i] > 0,
+                lambda: self._ntasks_waiting,
+            ),
+            "waiting_data": _StateView(
+                self,
+                self._waiting_data,
+                lambda i: (
+                    self._nwaiting_data[i] > 0 and self._keys[i] not in self.released
+                ),
+            ),
+            "cache": self.cache,
+            "ready": self.ready,
+            "running": self.running,
+            "finished": self.finished,
+            "released": self.released,
+        }
+
+    def _dependencies(self, i):
+        keys, idx = self._keys, self._dep_idx
+        return {keys[idx[p]] for p in range(self._dep_ptr[i], self._dep_ptr[i + 1])}
+
+    def _dependents(self, i):
+        keys, idx = self._keys, self._dpt_idx
+        return {keys[idx[p]] for p in range(self._dpt_ptr[i], self._dpt_ptr[i + 1])}
+
+    def _waiting(self, i):
+        keys, idx, available = self._keys, self._dep_idx, self._available
+        return {
+            keys[idx[p]]
+            for p in range(self._dep_ptr[i], self._dep_ptr[i + 1])
+            if not available[idx[p]]
+        }
+
+    def _waiting_data(self, i):
+        keys, idx, available = self._keys, self._dpt_idx, self._available
+        return {
+            keys[idx[p]]
+            for p in range(self._dpt_ptr[i], self._dpt_ptr[i + 1])
+            if not available[idx[p]]
+        }
+
+    def __getitem__(self, name):
+        return self._state[name]
+
+    def __iter__(self):
+        return iter(self._state)
+
+    def __len__(self):
+        return len(self._state)
+
+    def finish_task(self, key, results, delete=True):
+        """Update execution state after a task finishes
+
+        Mutates.  This should run atomically (with a lock).
+
+        See Also
+        --------
+        finish_task
+        """
+        keys = self._keys
+        i = self._index[key]
+        self._available[i] = 1
+
+        nwaiting, idx = self._nwaiting, self._dpt_idx
+        for p in range(self._dpt_ptr[i], self._dpt_ptr[i + 1]):
+            j = idx[p]
+            nwaiting[j] -= 1
+            if not nwaiting[j]:
+                self._ntasks_waiting -= 1
+                self.ready.append(keys[j])
+
+        nwaiting_data, idx = self._nwaiting_data, self._dep_idx
+        for p in range(self._dep_ptr[i], self._dep_ptr[i + 1]):
+            j = idx[p]
+            nwaiting_data[j] -= 1
+            if not nwaiting_data[j] and keys[j] not in results:
+                self.released.add(keys[j])
+                if delete:
+                    del self.cache[keys[j]]
+
+        self.finished.add(key)
+        self.running.remove(key)
+
+        return self
+
+
+class SpillCache(MutableMapping):
+    """A cache keeping at most ``memory_limit`` bytes of values in memory
+
+    Value sizes are measured with ``dask.sizeof``.  Once the values in memory
+    exceed ``memory_limit`` the least recently used ones are pickled to files
+    in ``directory`` and transparently loaded again when accessed.  Values
+    that can't be pickled stay in memory.
+
+    ``get_async`` uses one as ``state["cache"]`` when given a
+    ``memory_limit``, and prefers running tasks that release data while the
+    total size of cached values, in memory or spilled, exceeds that limit.
+
+    Parameters
+    ----------
+    memory_limit : int or str
+        Number of bytes (or a string like ``"4 GiB"``) to keep in memory
+    directory : str, optional
+        Where to write spilled values.  Defaults to a new temporary
+        directory in the ``temporary_directory`` config value, which is
+        removed by ``close``.
+
+    Examples
+    --------
+    >>> cache = SpillCache("1 kiB")
+    >>> cache["x"] = list(range(1000))
+    >>> cache.spilled_bytes > 0
+    True
+    >>> len(cache["x"])
+    1000
+    >>> cache.close()
+    >>> len(cache)
+    0
+    """
+
+    def __init__(self, memory_limit, directory=None):
+        self.memory_limit = parse_bytes(memory_limit)
+        # Values in memory, least recently used first
+        self.memory = OrderedDict()
+        # Files of spilled values.  Values loaded again keep their file so
+        # that spilling them another time is free.
+        self.disk = {}
+        self.sizes = {}
+        self.memory_bytes = 0
+        self.total_bytes = 0
+        self.spills = 0
+        self.loads = 0
+        self._directory = directory
+        self._counter = count()
+        self._cleanup = None
+
+    @property
+    def spilled_bytes(self):
+        """Size of the values that are only on disk"""
+        return self.total_bytes - self.memory_bytes
+
+    def _path(self):
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(
+                prefix="dask-spill-", dir=config.get("temporary_directory", None)
+            )
+            self._cleanup = weakref.finalize(
+                self, shutil.rmtree, self._directory, ignore_errors=True
+            )
+        else:
+            os.makedirs(self._directory, exist_ok=True)
+        return os.path.join(self._directory, f"{next(self._counter)}.pkl")
+
+    def _evict(self):
+        skipped = []
+        while self.memory_bytes > self.memory_limit and self.memory:
+            key, value = self.memory.popitem(last=False)
+            if key not in self.disk:
+                path = self._path()
+                try:
+                    with open(path, "wb") as f:
+                        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                except Exception:
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(path)
+                    skipped.append((key, value))
+                    continue
+                self.disk[key] = path
+                self.spills += 1
+            self.memory_bytes -= self.sizes[key]
+        # Unpicklable values keep their place in line
+        for key, value in reversed(skipped):
+            self.memory[key] = value
+            self.memory.move_to_end(key, last=False)
+
+    def __getitem__(self, key):
+        try:
+            value = self.memory[key]
+        except KeyError:
+            with open(self.disk[key], "rb") as f:
+                value = pickle.load(f)
+            self.loads += 1
+            self.memory[key] = value
+            self.memory_bytes += self.sizes[key]
+            self._evict()
+        else:
+            self.memory.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in self.sizes:
+            del self[key]
+        size = sizeof(value)
+        self.sizes[key] = size
+        self.memory[key] = value
+        self.memory_bytes += size
+        self.total_bytes += size
+        self._evict()
+
+    def __delitem__(self, key):
+        size = self.sizes.pop(key)
+        self.total_bytes -= size
+        if self.memory.pop(key, self) is not self:
+            self.memory_bytes -= size
+        path = self.disk.pop(key, None)
+        if path is not None:
+            os.remove(path)
+
+    def __contains__(self, key):
+        return key in self.sizes
+
+    def __iter__(self):
+        return iter(self.sizes)
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def close(self):
+        """Drop all values and remove the spilled files
+
+        Also removes the directory if it was created by the cache.
+        """
+        for path in self.disk.values():
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+        self.memory.clear()
+        self.disk.clear()
+        self.sizes.clear()
+        self.memory_bytes = self.total_bytes = 0
+        if self._cleanup is not None:
+            self._cleanup()
+            self._directory = self._cleanup = None
+
+
+def _memory_limit(memory_limit):
+    if memory_limit == "auto":
+        # Leave room for the data held by running tasks and for copies
+        limit = resources().memory_limit
+        return None if limit is None else int(limit * 0.6)
+    return parse_bytes(memory_limit)
+
+
+def _pop_releasing(state, results, sizes, candidates=16):
+    """Pop the ready task that releases the most data once it's done
+
+    Only the next ``candidates`` ready tasks are considered, the others keep
+    their order.  Ties go to the task that would have run first.
+    """
+    ready = state["ready"]
+    dependencies = state["dependencies"]
+    waiting_data = state["waiting_data"]
+    popped = [ready.pop() for _ in range(min(candidates, len(ready)))]
+
+    def released(key):
+        return sum(
+            sizes.get(dep, 0)
+            for dep in dependencies[key]
+            if dep not in results and len(waiting_data[dep]) == 1
+        )
+
+    best = max(range(len(popped)), key=lambda i: (released(popped[i]), -i))
+    key = popped.pop(best)
+    for k in reversed(popped):
+        ready.append(k)
+    return key
+
+
 """
 Running tasks
 -------------
@@ -216,6 +678,32 @@ When we execute tasks we both
 """
 
 
+def cull_replaced(dsk, before, results):
+    """Drop the tasks of ``dsk`` that ``start`` callbacks left unneeded
+
+    Callbacks like ``PersistentCache`` replace tasks, e.g. by loading a stored
+    result, which can leave their former inputs without any use for computing
+    ``results``.  ``before`` is a copy of ``dsk`` from before the callbacks
+    ran; nothing is dropped if they didn't change the graph.
+    """
+    if len(dsk) == len(before) and all(
+        dsk.get(key) is task for key, task in before.items()
+    ):
+        return
+    needed = set()
+    stack = [key for key in results if key in dsk]
+    while stack:
+        key = stack.pop()
+        if key in needed:
+            continue
+        needed.add(key)
+        # Callbacks may also put plain values into the graph
+        deps = getattr(dsk[key], "dependencies", ())
+        stack.extend(dep for dep in deps if dep in dsk)
+    for key in dsk.keys() - needed:
+        del dsk[key]
+
+
 def execute_task(key, task_info, dumps, loads, get_id, pack_exception):
     """
     Compute task and handle all administration
@@ -243,6 +731,37 @@ def batch_execute_tasks(it):
     return [execute_task(*a) for a in it]
 
 
+def execute_task_traced(key, task_info, dumps, loads, get_id, pack_exception):
+    """Like ``execute_task`` but also returns the times at which the task
+    started, was deserialized, finished computing and was serialized
+
+    See Also
+    --------
+    SchedulerTrace
+    """
+    start = time()
+    try:
+        task, data = loads(task_info)
+        exec_start = time()
+        result = task(data)
+        exec_end = time()
+        id = get_id()
+        result = dumps((result, id))
+        failed = False
+    except BaseException as e:  # noqa: B036
+        exec_start = exec_end = time()
+        result = pack_exception(e, dumps)
+        failed = True
+    return key, result, failed, (start, exec_start, exec_end, time())
+
+
+def batch_execute_tasks_traced(it):
+    """
+    Batch computing of multiple tasks with `execute_task_traced`
+    """
+    return [execute_task_traced(*a) for a in it]
+
+
 def release_data(key, state, delete=True):
     """Remove data from temporary storage
 
@@ -268,6 +787,9 @@ def finish_task(
 
     Mutates.  This should run atomically (with a lock).
     """
+    if isinstance(state, CompactState):
+        return state.finish_task(key, results, delete=delete)
+
     for dep in sorted(state["dependents"][key], key=sortkey, reverse=True):
         s = state["waiting"][dep]
         s.remove(key)
@@ -344,6 +866,296 @@ We currently select tasks that have recently been made ready.  We hope that
 this first-in-first-out policy reduces memory footprint
 """
 
+"""
+Tracing
+-------
+
+``SchedulerTrace`` records when each task became ready, was sent to a worker,
+ran and came back, and when the scheduler loop was busy rather than waiting
+for results.  Timestamps come from ``time.time`` so that they can be compared
+between processes.
+"""
+
+
+class TaskTiming(NamedTuple):
+    """Timestamps of a single task recorded by ``SchedulerTrace``"""
+
+    key: Key
+    #: Worker id as returned by ``get_id``
+    worker: object
+    #: All dependencies were in memory
+    ready: float
+    #: Handed to ``submit``
+    submitted: float
+    #: Picked up by a worker
+    start: float
+    #: Deserialized on the worker, computation starts
+    exec_start: float
+    #: Computation done
+    exec_end: float
+    #: Result serialized on the worker
+    end: float
+    #: Result seen by the scheduler loop
+    received: float
+    #: Time spent in ``dumps`` by the scheduler to send the task
+    scheduler_dumps: float
+    #: Time spent in ``loads`` by the scheduler to read the result
+    scheduler_loads: float
+
+
+class SchedulerTrace:
+    """Record where time is spent by the local schedulers
+
+    Records per task how long it waited to be sent to a worker, how long it
+    took to be picked up, to (de)serialize and to run, as well as how long
+    the scheduler loop itself was busy.  Works with ``get_async`` based
+    schedulers (synchronous, threaded and multiprocessing) and, without the
+    dispatch and serialization phases, with ``get_async_work_stealing``.
+
+    Use as a context manager to trace all computations within the block, or
+    pass as the ``trace=`` keyword to a ``get`` function.  Tracing adds a few
+    ``time.time`` calls per task; nothing is recorded when no trace is active.
+
+    Examples
+    --------
+    >>> from dask.threaded import get
+    >>> inc = lambda x: x + 1
+    >>> with SchedulerTrace() as trace:
+    ...     get({'x': 1, 'y': (inc, 'x')}, 'y')
+    2
+    >>> [t.key for t in trace.tasks]
+    ['y']
+    >>> print(trace.summary())  # doctest: +SKIP
+    phase                  count       total        mean         max
+    queue wait                 1    15.26 us    15.26 us    15.26 us
+    ...
+    >>> trace.write_chrome_trace("trace.json")  # doctest: +SKIP
+
+    See Also
+    --------
+    TaskTiming
+    """
+
+    active: ClassVar[list[SchedulerTrace]] = []
+
+    def __init__(self):
+        self.tasks: list[TaskTiming] = []
+        #: ``(start, stop, waits)`` of each scheduler run, where ``waits`` are
+        #: the ``(start, stop)`` intervals the scheduler loop was idle
+        self.runs: list[tuple[float, float, list[tuple[float, float]]]] = []
+
+    def __enter__(self):
+        SchedulerTrace.active.append(self)
+        return self
+
+    def __exit__(self, *args):
+        SchedulerTrace.active.remove(self)
+
+    def phases(self):
+        """Durations of each phase in seconds
+
+        Returns
+        -------
+        dict mapping the phase name to a list of durations, one per task for
+        the per-task phases and one per run for ``scheduler busy``
+        """
+        tasks = self.tasks
+        phases = {
+            "queue wait": [t.submitted - t.ready for t in tasks],
+            "dispatch latency": [t.start - t.submitted for t in tasks],
+            "worker loads": [t.exec_start - t.start for t in tasks],
+            "execution": [t.exec_end - t.exec_start for t in tasks],
+            "worker dumps": [t.end - t.exec_end for t in tasks],
+            "result latency": [t.received - t.end for t in tasks],
+            "scheduler dumps": [t.scheduler_dumps for t in tasks],
+            "scheduler loads": [t.scheduler_loads for t in tasks],
+            "scheduler busy": [
+                stop - start - sum(b - a for a, b in waits)
+                for start, stop, waits in self.runs
+            ],
+        }
+        return {k: [max(d, 0.0) for d in v] for k, v in phases.items()}
+
+    def summary(self):
+        """A table of count, total, mean and maximum duration of each phase"""
+        lines = [f"{'phase':<18}{'count':>9}{'total':>12}{'mean':>12}{'max':>12}"]
+        for name, durations in self.phases().items():
+            if not durations:
+                continue
+            total = sum(durations)
+            lines.append(
+                f"{name:<18}{len(durations):>9}{format_time(total):>12}"
+                f"{format_time(total / len(durations)):>12}"
+                f"{format_time(max(durations)):>12}"
+            )
+        wall = sum(stop - start for start, stop, _ in self.runs)
+        lines.append(f"{'wall time':<18}{len(self.runs):>9}{format_time(wall):>12}")
+        return "\n".join(lines)
+
+    def to_chrome_trace(self):
+        """The trace in the Chrome trace event format
+
+        Load the JSON dump of the result in ``chrome://tracing`` or Perfetto.
+        The scheduler loop is shown as process 0, workers as threads of
+        process 1.
+        """
+        starts = [start for start, _, _ in self.runs] + [t.ready for t in self.tasks]
+        origin = min(starts, default=0.0)
+
+        def us(t):
+            return round((t - origin) * 1e6, 3)
+
+        def span(name, cat, start, stop, pid, tid, args=None):
+            event = {
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": us(start),
+                "dur": round(max(stop - start, 0.0) * 1e6, 3),
+                "pid": pid,
+                "tid": tid,
+            }
+            if args:
+                event["args"] = args
+            return event
+
+        events = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": 0,
+                "args": {"name": "scheduler"},
+            },
+            {"name": "process_name", "ph": "M", "pid": 1, "args": {"name": "workers"}},
+        ]
+        for start, stop, waits in self.runs:
+            busy_start = start
+            for wait_start, wait_stop in waits:
+                events.append(span("busy", "scheduler", busy_start, wait_start, 0, 0))
+                busy_start = wait_stop
+            events.append(span("busy", "scheduler", busy_start, stop, 0, 0))
+
+        tids = {}
+        for t in self.tasks:
+            tid = tids.get(t.worker)
+            if tid is None:
+                tid = tids[t.worker] = len(tids)
+                events.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": 1,
+                        "tid": tid,
+                        "args": {"name": f"worker {t.worker}"},
+                    }
+                )
+            args = {
+                "key": str(t.key),
+                "queue wait": t.submitted - t.ready,
+                "dispatch latency": t.start - t.submitted,
+            }
+            if t.exec_start > t.start:
+                events.append(span("loads", "serialize", t.start, t.exec_start, 1, tid))
+            events.append(
+                span(key_split(t.key), "task", t.exec_start, t.exec_end, 1, tid, args)
+            )
+            if t.end > t.exec_end:
+                events.append(span("dumps", "serialize", t.exec_end, t.end, 1, tid))
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, file):
+        """Write ``to_chrome_trace`` as JSON to a path or text file object"""
+        trace = self.to_chrome_trace()
+        if isinstance(file, (str, os.PathLike)):
+            with open(file, "w") as f:
+                json.dump(trace, f)
+        else:
+            json.dump(trace, file)
+
+
+def _trace_recorder(trace):
+    if trace is None:
+        if not SchedulerTrace.active:
+            return None
+        trace = SchedulerTrace.active[-1]
+    return _TraceRecorder(trace)
+
+
+class _TraceRecorder:
+    """Bookkeeping of a single scheduler run for a ``SchedulerTrace``"""
+
+    def __init__(self, trace):
+        self.trace = trace
+        self.start = self.received_at = time()
+        self.waits = []
+        # When each task finished, and the ready time, submission time and
+        # scheduler ``dumps`` time of the tasks in flight
+        self.done_at = {}
+        self.in_flight = {}
+        self.timings = {}
+
+    def ready_time(self, deps):
+        done_at, start = self.done_at, self.start
+        return max((done_at.get(dep, start) for dep in deps), default=start)
+
+    def dispatched(self, key, deps, dumps_time):
+        self.in_flight[key] = [self.ready_time(deps), None, dumps_time]
+
+    def submitted(self, args):
+        now = time()
+        for a in args:
+            self.in_flight[a[0]][1] = now
+
+    def wait(self, queue):
+        start = time()
+        try:
+            return queue_get(queue)
+        finally:
+            self.received_at = time()
+            self.waits.append((start, self.received_at))
+
+    def received(self, batch):
+        # Strip the timings added by ``execute_task_traced``
+        timings = self.timings
+        out = []
+        for key, res_info, failed, times in batch:
+            timings[key] = times
+            out.append((key, res_info, failed))
+        return out
+
+    def finished(self, key, worker, loads_time):
+        self.done_at[key] = time()
+        ready, submitted, dumps_time = self.in_flight.pop(key)
+        start, exec_start, exec_end, end = self.timings.pop(key)
+        self.trace.tasks.append(
+            TaskTiming(
+                key,
+                worker,
+                ready,
+                submitted,
+                start,
+                exec_start,
+                exec_end,
+                end,
+                self.received_at,
+                dumps_time,
+                loads_time,
+            )
+        )
+
+    def ran(self, key, deps, worker, start, end):
+        # A task run by a worker of ``get_async_work_stealing``, which is
+        # neither dispatched nor serialized
+        ready = self.ready_time(deps)
+        self.done_at[key] = end
+        self.trace.tasks.append(
+            TaskTiming(key, worker, ready, start, start, start, end, end, end, 0.0, 0.0)
+        )
+
+    def close(self):
+        self.trace.runs.append((self.start, time(), self.waits))
+
+
 """
 `get`
 -----
@@ -366,6 +1178,10 @@ def get_async(
     dumps=identity,
     loads=identity,
     chunksize=None,
+    compact_state=None,
+    trace=None,
+    memory_limit=None,
+    spill_directory=None,
     **kwargs,
 ):
     """Asynchronous get function
@@ -400,9 +1216,10 @@ def get_async(
     raise_exception : callable, optional
         Function that takes an exception and a traceback, and raises an error.
     callbacks : tuple or list of tuples, optional
-        Callbacks are passed in as tuples of length 5. Multiple sets of
-        callbacks may be passed in as a list of tuples. For more information,
-        see the dask.diagnostics documentation.
+        Callbacks are passed in as tuples of length 5, or 6 to include a
+        ``posttask_batch`` callback that is called once per scheduler
+        iteration. Multiple sets of callbacks may be passed in as a list of
+        tuples. For more information, see the dask.diagnostics documentation.
     dumps: callable, optional
         Function to serialize task data and results to communicate between
         worker and parent.  Defaults to identity.
@@ -411,6 +1228,27 @@ def get_async(
     chunksize: int, optional
         Size of chunks to use when dispatching work. Defaults to 1.
         If -1, will be computed to evenly divide ready work across workers.
+    compact_state: bool, optional
+        Whether to track execution state with the array-backed
+        ``CompactState`` instead of the dictionaries built by
+        ``start_state_from_dask``.  Saves memory and start-up time on large
+        graphs.  Defaults to the ``local.compact-state`` config value.
+    trace: SchedulerTrace, optional
+        Record timings of the scheduler and of each task.  Defaults to the
+        innermost active ``SchedulerTrace`` context, if any.
+    memory_limit: int or str, optional
+        Keep at most this many bytes (or e.g. ``"4 GiB"``) of intermediate
+        results in memory, spilling the least recently used ones to disk,
+        see ``SpillCache``.  While more than this is held in total, ready
+        tasks that allow to release data are run first.  ``"auto"`` uses
+        60% of ``dask.system.resources().memory_limit``.  Defaults to the
+        ``local.memory-limit`` config value, which is unset.  Any other
+        ``cache`` is copied into the ``SpillCache`` and receives its
+        contents, i.e. the results, once the computation succeeded.  Passing
+        a ``SpillCache`` as ``cache`` has the same effect.
+    spill_directory: str, optional
+        Where to spill results to, defaults to the ``local.spill-directory``
+        config value or a temporary directory.
 
     See Also
     --------
@@ -418,6 +1256,19 @@ def get_async(
     """
     chunksize = chunksize or config.get("chunksize", 1)
 
+    if memory_limit is None:
+        memory_limit = config.get("local.memory-limit", None)
+    if isinstance(cache, SpillCache):
+        spill, own_spill = cache, False
+    elif memory_limit is not None and (limit := _memory_limit(memory_limit)):
+        if spill_directory is None:
+            spill_directory = config.get("local.spill-directory", None)
+        spill, own_spill = SpillCache(limit, spill_directory), True
+        spill.update(cache or ())
+        cache, user_cache = spill, cache
+    else:
+        spill, own_spill = None, False
+
     queue = Queue()
 
     if isinstance(result, list):
@@ -428,25 +1279,39 @@ def get_async(
 
     dsk = dict(convert_legacy_graph(dsk))
     with local_callbacks(callbacks) as callbacks:
-        _, _, pretask_cbs, posttask_cbs, _ = unpack_callbacks(callbacks)
+        _, _, pretask_cbs, posttask_cbs, _, batch_cbs = unpack_callbacks(
+            callbacks, batched=True
+        )
         started_cbs = []
         succeeded = False
         # if start_state_from_dask fails, we will have something
         # to pass to the final block.
         state = {}
+        recorder = _trace_recorder(trace)
+        execute = (
+            batch_execute_tasks if recorder is None else batch_execute_tasks_traced
+        )
         try:
+            before = dict(dsk) if any(cb[0] for cb in callbacks) else None
             for cb in callbacks:
                 if cb[0]:
                     cb[0](dsk)
                 started_cbs.append(cb)
+            if before is not None:
+                cull_replaced(dsk, before, results)
 
             keyorder = order(dsk)
 
-            state = start_state_from_dask(dsk, cache=cache, sortkey=keyorder.get)
+            if compact_state is None:
+                compact_state = config.get("local.compact-state", False)
+            if compact_state:
+                state = CompactState(dsk, cache=cache, sortkey=keyorder.get)
+            else:
+                state = start_state_from_dask(dsk, cache=cache, sortkey=keyorder.get)
 
-            for _, start_state, _, _, _ in callbacks:
-                if start_state:
-                    start_state(dsk, state)
+            for cb in callbacks:
+                if cb[1]:
+                    cb[1](dsk, state)
 
             if rerun_exceptions_locally is None:
                 rerun_exceptions_locally = config.get("rerun_exceptions_locally", False)
@@ -469,8 +1334,12 @@ def get_async(
                 # Prep all ready tasks for submission
                 args = []
                 for _ in range(ntasks):
-                    # Get the next task to compute (most recently added)
-                    key = state["ready"].pop()
+                    # Get the next task to compute (most recently added),
+                    # unless we're short on memory
+                    if spill is None or spill.total_bytes <= spill.memory_limit:
+                        key = state["ready"].pop()
+                    else:
+                        key = _pop_releasing(state, results, spill.sizes)
                     # Notify task is running
                     state["running"].add(key)
                     for f in pretask_cbs:
@@ -480,10 +1349,16 @@ def get_async(
                     data = {
                         dep: state["cache"][dep] for dep in get_dependencies(dsk, key)
                     }
+                    if recorder is None:
+                        task_info = dumps((dsk[key], data))
+                    else:
+                        start = time()
+                        task_info = dumps((dsk[key], data))
+                        recorder.dispatched(key, data, time() - start)
                     args.append(
                         (
                             key,
-                            dumps((dsk[key], data)),
+                            task_info,
                             dumps,
                             loads,
                             get_id,
@@ -496,36 +1371,347 @@ def get_async(
                     each_args = args[i * chunksize : (i + 1) * chunksize]
                     if not each_args:
                         break
-                    fut = submit(batch_execute_tasks, each_args)
+                    if recorder is not None:
+                        recorder.submitted(each_args)
+                    fut = submit(execute, each_args)
                     fut.add_done_callback(queue.put)
 
             # Main loop, wait on tasks to finish, insert new ones
             while state["waiting"] or state["ready"] or state["running"]:
                 fire_tasks(chunksize)
-                for key, res_info, failed in queue_get(queue).result():
-                    if failed:
-                        exc, tb = loads(res_info)
-                        if rerun_exceptions_locally:
-                            data = {
-                                dep: state["cache"][dep]
-                                for dep in get_dependencies(dsk, key)
-                            }
-                            task = dsk[key]
-                            task(data)  # Re-execute locally
+                # Handle everything that finished since the last iteration
+                # before firing new tasks
+                if recorder is None:
+                    done = [queue_get(queue)]
+                else:
+                    done = [recorder.wait(queue)]
+                while True:
+                    try:
+                        done.append(queue.get_nowait())
+                    except Empty:
+                        break
+                events = []
+                for fut in done:
+                    batch = fut.result()
+                    if recorder is not None:
+                        batch = recorder.received(batch)
+                    for key, res_info, failed in batch:
+                        if failed:
+                            exc, tb = loads(res_info)
+                            if rerun_exceptions_locally:
+                                data = {
+                                    dep: state["cache"][dep]
+                                    for dep in get_dependencies(dsk, key)
+                                }
+                                task = dsk[key]
+                                task(data)  # Re-execute locally
+                            else:
+                                raise_exception(exc, tb)
+                        if recorder is None:
+                            res, worker_id = loads(res_info)
+                        else:
+                            start = time()
+                            res, worker_id = loads(res_info)
+                            loads_time = time() - start
+                        state["cache"][key] = res
+                        finish_task(dsk, key, state, results, keyorder.get)
+                        if recorder is not None:
+                            recorder.finished(key, worker_id, loads_time)
+                        for f in posttask_cbs:
+                            f(key, res, dsk, state, worker_id)
+                        if batch_cbs:
+                            events.append((key, res, worker_id))
+                if events:
+                    for f in batch_cbs:
+                        f(events, dsk, state)
+
+            succeeded = True
+
+        finally:
+            if recorder is not None:
+                recorder.close()
+            if own_spill and not succeeded:
+                spill.close()
+            for cb in started_cbs:
+                if cb[4]:
+                    cb[4](dsk, state, not succeeded)
+
+    try:
+        if own_spill and user_cache is not None:
+            _write_back(spill, user_cache)
+        return nested_get(result, state["cache"])
+    finally:
+        if own_spill:
+            spill.close()
+
+
+def _write_back(spill, cache):
+    """Leave ``cache`` as it would be without spilling
+
+    Keys released during the computation are deleted, the others, i.e. the
+    results, are set to their value from ``spill``.
+    """
+    for key in list(cache):
+        if key not in spill:
+            del cache[key]
+    cache.update(spill)
+
+
+"""
+Work stealing
+-------------
+
+``get_async`` makes every scheduling decision on the calling thread: workers
+send results back through a queue and the scheduler decides what to run next.
+For graphs with very many small tasks this loop becomes the bottleneck.
+
+``get_async_work_stealing`` instead runs one long-lived loop per worker.  Each
+loop owns a deque of ready tasks.  When a worker finishes a task it pushes the
+dependents that became ready onto its own deque and runs them itself, without
+a round trip to the calling thread.  Idle workers steal the oldest task from
+the deques of other workers.  Because workers read inputs directly from
+``state["cache"]`` this mode only works with workers that share memory with
+the caller, i.e. threads.
+"""
+
+
+def get_async_work_stealing(
+    submit,
+    num_workers,
+    dsk,
+    result,
+    cache=None,
+    get_id=default_get_id,
+    rerun_exceptions_locally=None,
+    raise_exception=reraise,
+    callbacks=None,
+    compact_state=None,
+    trace=None,
+    memory_limit=None,
+    **kwargs,
+):
+    """Asynchronous get function with per-worker ready queues
+
+    Same interface as ``get_async`` but scheduling decisions are made by the
+    workers themselves.  ``submit`` is used to start ``num_workers``
+    long-running worker loops, so it must run them in threads sharing memory
+    with the caller.  Serialization options like ``dumps``, ``loads`` and
+    ``chunksize`` are ignored.  Spilling to disk isn't supported, workers
+    read their inputs without holding the scheduler lock.
+
+    Parameters
+    ----------
+    submit : function
+        A ``concurrent.futures.Executor.submit`` function running threads
+    num_workers : int
+        The number of worker loops to start
+    dsk : dict
+        A dask dictionary specifying a workflow
+    result : key or list of keys
+        Keys corresponding to desired data
+    cache : dict-like, optional
+        Temporary storage of results
+    get_id : callable, optional
+        Function to return the worker id, takes no arguments.
+    rerun_exceptions_locally : bool, optional
+        Whether to rerun failing tasks in local process to enable debugging
+        (False by default)
+    raise_exception : callable, optional
+        Function that takes an exception and a traceback, and raises an error.
+    callbacks : tuple or list of tuples, optional
+        Callbacks are passed in as tuples of length 5 or 6.  The ``pretask``,
+        ``posttask`` and ``posttask_batch`` callbacks are called from the
+        worker threads while holding the scheduler lock, the latter with a
+        single event per call.
+    compact_state: bool, optional
+        Whether to track execution state with ``CompactState``.  Defaults to
+        the ``local.compact-state`` config value.
+    trace: SchedulerTrace, optional
+        Record timings of each task.  Defaults to the innermost active
+        ``SchedulerTrace`` context, if any.
+    memory_limit: int or str, optional
+        Not supported, raises a ``ValueError`` unless ``None``, as does a
+        ``local.memory-limit`` config value or a ``SpillCache`` as ``cache``.
+
+    See Also
+    --------
+    get_async
+    threaded.get
+    """
+    if memory_limit is None:
+        memory_limit = config.get("local.memory-limit", None)
+    if memory_limit is not None or isinstance(cache, SpillCache):
+        raise ValueError(
+            "The work-stealing scheduler doesn't support memory_limit, "
+            "use the default scheduler instead"
+        )
+
+    if isinstance(result, list):
+        result_flat = set(flatten(result))
+    else:
+        result_flat = {result}
+    results = set(result_flat)
+
+    dsk = dict(convert_legacy_graph(dsk))
+    with local_callbacks(callbacks) as callbacks:
+        _, _, pretask_cbs, posttask_cbs, _, batch_cbs = unpack_callbacks(
+            callbacks, batched=True
+        )
+        started_cbs = []
+        succeeded = False
+        state = {}
+        lock = threading.Condition()
+        done = False
+        recorder = _trace_recorder(trace)
+        try:
+            before = dict(dsk) if any(cb[0] for cb in callbacks) else None
+            for cb in callbacks:
+                if cb[0]:
+                    cb[0](dsk)
+                started_cbs.append(cb)
+            if before is not None:
+                cull_replaced(dsk, before, results)
+
+            keyorder = order(dsk)
+
+            if compact_state is None:
+                compact_state = config.get("local.compact-state", False)
+            if compact_state:
+                state = CompactState(dsk, cache=cache, sortkey=keyorder.get)
+            else:
+                state = start_state_from_dask(dsk, cache=cache, sortkey=keyorder.get)
+
+            for cb in callbacks:
+                if cb[1]:
+                    cb[1](dsk, state)
+
+            if rerun_exceptions_locally is None:
+                rerun_exceptions_locally = config.get("rerun_exceptions_locally", False)
+
+            if state["waiting"] and not state["ready"]:
+                raise ValueError("Found no accessible jobs in dask")
+
+            # Spread the initial ready tasks over the workers, keeping the
+            # highest priority tasks at the right end of each deque
+            deques = [deque() for _ in range(num_workers)]
+            ready = state["ready"]
+            for i, key in enumerate(reversed(ready)):
+                deques[i % num_workers].appendleft(key)
+            ready.clear()
+
+            remaining = len(state["waiting"]) + sum(map(len, deques))
+            done = not remaining
+            errors = []
+
+            def steal(i):
+                for j in range(1, num_workers):
+                    try:
+                        return deques[(i + j) % num_workers].popleft()
+                    except IndexError:
+                        pass
+                return None
+
+            def worker(i):
+                nonlocal done
+                try:
+                    run_worker(i)
+                except BaseException as e:  # noqa: B036
+                    # A failing callback or scheduler bug, stop the other workers
+                    # and raise it in the caller
+                    with lock:
+                        errors.append((None, e, e.__traceback__))
+                        done = True
+                        lock.notify_all()
+
+            def run_worker(i):
+                nonlocal done, remaining
+                own = deques[i]
+                while True:
+                    try:
+                        key = own.pop()
+                    except IndexError:
+                        key = steal(i)
+                    if key is None:
+                        with lock:
+                            if done:
+                                return
+                            if not any(deques):
+                                lock.wait()
+                        continue
+
+                    with lock:
+                        if done:
+                            return
+                        state["running"].add(key)
+                        for f in pretask_cbs:
+                            f(key, dsk, state)
+
+                    try:
+                        data = {
+                            dep: state["cache"][dep]
+                            for dep in state["dependencies"][key]
+                        }
+                        if recorder is None:
+                            res = dsk[key](data)
                         else:
-                            raise_exception(exc, tb)
-                    res, worker_id = loads(res_info)
-                    state["cache"][key] = res
-                    finish_task(dsk, key, state, results, keyorder.get)
-                    for f in posttask_cbs:
-                        f(key, res, dsk, state, worker_id)
+                            start = time()
+                            res = dsk[key](data)
+                            end = time()
+                    except BaseException as e:  # noqa: B036
+                        with lock:
+                            errors.append((key, e, e.__traceback__))
+                            done = True
+                            lock.notify_all()
+                        return
+                    worker_id = get_id()
+
+                    with lock:
+                        state["cache"][key] = res
+                        finish_task(dsk, key, state, results, keyorder.get)
+                        if recorder is not None:
+                            recorder.ran(key, data, worker_id, start, end)
+                        for f in posttask_cbs:
+                            f(key, res, dsk, state, worker_id)
+                        for f in batch_cbs:
+                            f([(key, res, worker_id)], dsk, state)
+                        remaining -= 1
+                        if ready:
+                            own.extend(ready)
+                            ready.clear()
+                            lock.notify(len(own) - 1)
+                        if not remaining:
+                            done = True
+                            lock.notify_all()
+
+            futures = [submit(worker, i) for i in range(num_workers)]
+            wait_start = time()
+            for fut in futures:
+                fut.result()
+            if recorder is not None:
+                recorder.waits.append((wait_start, time()))
+
+            if errors:
+                key, exc, tb = errors[0]
+                if key is None:
+                    raise exc.with_traceback(tb)
+                if rerun_exceptions_locally:
+                    data = {
+                        dep: state["cache"][dep] for dep in get_dependencies(dsk, key)
+                    }
+                    dsk[key](data)  # Re-execute locally
+                raise_exception(exc, tb)
 
             succeeded = True
 
         finally:
-            for _, _, _, _, finish in started_cbs:
-                if finish:
-                    finish(dsk, state, not succeeded)
+            with lock:
+                done = True
+                lock.notify_all()
+            if recorder is not None:
+                recorder.close()
+            for cb in started_cbs:
+                if cb[4]:
+                    cb[4](dsk, state, not succeeded)
 
     return nested_get(result, state["cache"])
 
@@ -1,25 +1,49 @@
 from __future__ import annotations
 
+import atexit
+import bisect
 import copyreg
+import ctypes
+import itertools
 import multiprocessing
 import multiprocessing.pool
 import os
 import pickle
+import queue
+import secrets
 import sys
+import threading
 import traceback
+import weakref
 from collections.abc import Mapping, Sequence
 from concurrent.futures import ProcessPoolExecutor
 from functools import partial
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
 from warnings import warn
 
 import cloudpickle
 
 from dask import config
-from dask.local import MultiprocessingPoolExecutor, get_async, reraise
+from dask._task_spec import convert_legacy_graph
+from dask.callbacks import local_callbacks, unpack_callbacks
+from dask.core import flatten
+from dask.local import (
+    MultiprocessingPoolExecutor,
+    cull_replaced,
+    finish_task,
+    get_async,
+    nested_get,
+    release_data,
+    reraise,
+    start_state_from_dask,
+)
+from dask.order import order
+from dask.sizeof import sizeof
 from dask.optimization import cull, fuse
-from dask.system import CPU_COUNT
+from dask.system import resources
 from dask.typing import Key
-from dask.utils import ensure_dict
+from dask.utils import ensure_dict, parse_bytes
 
 
 def _reduce_method_descriptor(m):
@@ -124,12 +148,228 @@ def pack_exception(e, dumps):
     return result
 
 
+# -- Shared Memory Transport --
+# Results are pickled with protocol 5.  Out-of-band buffers above a size
+# threshold are copied by the producing worker into a shared memory block and
+# only the block name and offsets go through the pipe.  The parent maps the
+# block without copying and, when the result is an input of another task,
+# sends the same block reference on to that worker.
+#
+# Blocks are owned by the parent, which unlinks a block as soon as nothing in
+# the parent refers to its memory anymore.  Every buffer handed to the
+# unpickler is a ``ctypes`` array over the block, so we get a weakref
+# callback when the last object using that memory is gone.
+#
+# Results the parent never loads, because the computation failed while they
+# were in flight, would leak their blocks.  Block names therefore start with a
+# prefix unique to the transport, i.e. to a call to ``get``, so that ``get``
+# can unlink the leftovers when it's done.
+
+
+class _SharedBlocks:
+    """Shared memory blocks currently mapped into this process"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.pid = os.getpid()
+        self.blocks = {}  # name -> [SharedMemory, address, refcount, owner]
+        self.addresses = []  # sorted start addresses of blocks
+        self.names = {}  # address -> name
+        self.closing = []  # unused blocks whose mapping is still exported
+
+    def _check_pid(self):
+        # A forked child must not inherit (and later unlink) the parent's blocks
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.blocks = {}
+            self.addresses = []
+            self.names = {}
+            self.closing = []
+
+    def _close(self, shm):
+        try:
+            shm.close()
+        except BufferError:
+            # The ctypes views over the block die just before their own
+            # reference to the buffer, retry on a later call
+            self.closing.append(shm)
+
+    def view(self, name, offset, nbytes, owner):
+        """Map ``nbytes`` of block ``name`` starting at ``offset``"""
+        with self.lock:
+            self._check_pid()
+            entry = self.blocks.get(name)
+            if entry is None:
+                shm = shared_memory.SharedMemory(name)
+                address = ctypes.addressof(ctypes.c_char.from_buffer(shm.buf))
+                entry = self.blocks[name] = [shm, address, 0, owner]
+                bisect.insort(self.addresses, address)
+                self.names[address] = name
+            entry[2] += 1
+        view = (ctypes.c_char * nbytes).from_buffer(entry[0].buf, offset)
+        weakref.finalize(view, self._decref, name).atexit = False
+        return view
+
+    def _decref(self, name):
+        with self.lock:
+            entry = self.blocks[name]
+            entry[2] -= 1
+            if entry[2]:
+                return
+            del self.blocks[name]
+            self.addresses.remove(entry[1])
+            del self.names[entry[1]]
+            shm, owner = entry[0], entry[3]
+            if owner:
+                shm.unlink()
+            closing, self.closing = self.closing, []
+            for shm in [shm, *closing]:
+                self._close(shm)
+
+    def locate(self, buf):
+        """Find the block holding ``buf``, returns ``(name, offset)`` or None"""
+        try:
+            address = ctypes.addressof(ctypes.c_char.from_buffer(buf))
+        except (TypeError, ValueError):  # read-only or empty, not one of ours
+            return None
+        with self.lock:
+            self._check_pid()
+            i = bisect.bisect_right(self.addresses, address) - 1
+            if i < 0:
+                return None
+            start = self.addresses[i]
+            name = self.names[start]
+            if address + buf.nbytes > start + self.blocks[name][0].size:
+                return None
+            return name, address - start
+
+    def unlink_all(self):
+        with self.lock:
+            if self.pid != os.getpid():
+                return
+            for shm, _, _, owner in self.blocks.values():
+                if owner:
+                    shm.unlink()
+
+
+_shared_blocks = _SharedBlocks()
+atexit.register(_shared_blocks.unlink_all)
+_block_ids = itertools.count()
+
+
+class SharedMemoryTransport:
+    """Serialization passing large buffers through shared memory
+
+    Used as the ``dumps``/``loads`` pair of ``get_async``.  Objects are
+    pickled with protocol 5; out-of-band buffers of at least ``threshold``
+    bytes produced on a worker are written to a shared memory block and only
+    a small handle is sent back.  In the parent, buffers that already live
+    in a block are sent to workers by handle as well, so large intermediates
+    are copied once, by the worker that computes them.
+
+    The parent unlinks a block once no object refers to it anymore, i.e.
+    when ``release_data`` dropped the key from the cache or, for results of
+    the computation, when the caller drops them.  Tasks see writable views
+    on shared memory, so like with the threaded scheduler they must not
+    mutate their inputs in place.
+
+    Parameters
+    ----------
+    threshold : int
+        Size in bytes from which buffers go through shared memory
+    """
+
+    def __init__(self, threshold, worker=False, prefix=None):
+        self.threshold = threshold
+        self.worker = worker
+        # Short enough for the 31 characters macOS allows for block names
+        self.prefix = prefix or f"dsk{secrets.token_hex(4)}"
+
+    def __reduce__(self):
+        # Workers receive a fresh transport in worker mode
+        return SharedMemoryTransport, (self.threshold, True, self.prefix)
+
+    def cleanup(self):
+        """Unlink the blocks created by workers that were never loaded here
+
+        These are the results of tasks that were still running when the
+        computation failed.  Blocks are found by their name in ``/dev/shm``;
+        on platforms without it they are left to the resource tracker, which
+        unlinks them when the worker processes exit.
+        """
+        try:
+            names = os.listdir("/dev/shm")
+        except OSError:
+            return
+        for name in names:
+            if not name.startswith(self.prefix) or name in _shared_blocks.blocks:
+                continue
+            try:
+                shm = shared_memory.SharedMemory(name)
+            except FileNotFoundError:  # unlinked in the meantime
+                continue
+            shm.unlink()
+            shm.close()
+
+    def dumps(self, obj):
+        buffers = []
+        handles = []
+
+        def buffer_callback(buf):
+            try:
+                raw = buf.raw()
+            except BufferError:  # not contiguous
+                return True
+            if not raw.nbytes or raw.nbytes < self.threshold:
+                return True
+            if self.worker:
+                buffers.append(raw)
+                return False
+            handle = _shared_blocks.locate(raw)
+            if handle is None:
+                return True
+            handles.append((*handle, raw.nbytes))
+            return False
+
+        frame = _dumps(obj, buffer_callback=buffer_callback)
+        if buffers:
+            shm = shared_memory.SharedMemory(
+                f"{self.prefix}_{os.getpid()}_{next(_block_ids)}",
+                create=True,
+                size=sum(b.nbytes for b in buffers),
+            )
+            offset = 0
+            for raw in buffers:
+                shm.buf[offset : offset + raw.nbytes] = raw
+                handles.append((shm.name, offset, raw.nbytes))
+                offset += raw.nbytes
+            shm.close()
+        return pickle.dumps((frame, handles), protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data):
+        frame, handles = pickle.loads(data)
+        if not handles:
+            return _loads(frame)
+        owner = not self.worker
+        buffers = [
+            _shared_blocks.view(name, offset, nbytes, owner)
+            for name, offset, nbytes in handles
+        ]
+        return _loads(frame, buffers=buffers)
+
+
 _CONTEXT_UNSUPPORTED = """\
 The 'multiprocessing.context' configuration option will be ignored on Python 2
 and on Windows, because they each only support a single context.
 """
 
 
+_SHARED_MEMORY_UNSUPPORTED = """\
+The 'shared_memory_threshold' option will be ignored on Windows, where shared
+memory blocks do not outlive the process that created them.
+"""
+
+
 def get_context():
     """Return the current multiprocessing context."""
     # fork context does fork()-without-exec(), which can lead to deadlocks,
@@ -144,6 +384,330 @@ def get_context():
         return multiprocessing.get_context(context_name)
 
 
+# -- Locality Aware Scheduling --
+# ``LocalityPool`` workers keep the results of the tasks they run.  The parent
+# only records which worker holds which key and sends a task preferably to the
+# worker already holding most of its inputs.  Inputs held elsewhere are
+# fetched from the holding worker through the parent and stay on the receiving
+# worker as replicas until released.
+#
+# Workers send results and fetched data to the parent while it may be sending
+# them large inputs.  To not deadlock on full pipes in both directions, the
+# parent only ever blocks on reading and hands its messages to a writer thread
+# per worker.
+
+
+def _locality_worker(conn, initializer=None):
+    """Main loop of a ``LocalityPool`` worker process
+
+    Tasks run in a separate thread so that requests for data held by this
+    worker are answered while a task is running.
+    """
+    if initializer is not None:
+        initializer()
+
+    store = {}
+    send_lock = threading.Lock()
+    tasks = queue.Queue()
+
+    def send(payload):
+        with send_lock:
+            conn.send_bytes(payload)
+
+    def run_tasks():
+        while (item := tasks.get()) is not None:
+            key, task, send_back = item
+            try:
+                result = task({dep: store[dep] for dep in task.dependencies})
+                store[key] = result
+                payload = _dumps(
+                    (
+                        "done",
+                        key,
+                        result if send_back else None,
+                        sizeof(result),
+                        _process_get_id(),
+                    )
+                )
+            except BaseException as e:  # noqa: B036
+                payload = _dumps(("error", key, pack_exception(e, _dumps)))
+            send(payload)
+
+    thread = threading.Thread(target=run_tasks, daemon=True)
+    thread.start()
+    while True:
+        msg = _loads(conn.recv_bytes())
+        if msg is None:
+            tasks.put(None)
+            thread.join()
+            conn.close()
+            return
+        op = msg[0]
+        if op == "compute":
+            # Store shipped inputs right away, later fetches may ask for them
+            _, key, task, data, send_back = msg
+            store.update(data)
+            tasks.put((key, task, send_back))
+        elif op == "fetch":
+            _, key, deps = msg
+            send(_dumps(("data", key, {dep: store[dep] for dep in deps})))
+        elif op == "release":
+            for dep in msg[1]:
+                store.pop(dep, None)
+        elif op == "clear":
+            store.clear()
+
+
+class LocalityPool:
+    """Worker processes that keep the results they compute
+
+    Pass an instance as ``pool=`` to ``get`` to run with locality aware
+    task placement, see ``get_locality``.  The pool can be reused across
+    calls and is shut down on ``shutdown()`` or when used as a context
+    manager.
+
+    Parameters
+    ----------
+    num_workers : int
+        Number of worker processes
+    context : multiprocessing context, optional
+        Defaults to ``get_context()``
+    initializer : function, optional
+        Function to initialize a worker process before running any tasks in it.
+    """
+
+    def __init__(self, num_workers, context=None, initializer=None):
+        context = context or get_context()
+        self.conns = []
+        self.processes = []
+        self.outboxes = []
+        self.writers = []
+        for _ in range(num_workers):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_locality_worker, args=(child_conn, initializer), daemon=True
+            )
+            process.start()
+            child_conn.close()
+            outbox = queue.Queue()
+            writer = threading.Thread(
+                target=self._write, args=(parent_conn, outbox), daemon=True
+            )
+            writer.start()
+            self.conns.append(parent_conn)
+            self.processes.append(process)
+            self.outboxes.append(outbox)
+            self.writers.append(writer)
+
+    @staticmethod
+    def _write(conn, outbox):
+        while (payload := outbox.get()) is not None:
+            try:
+                conn.send_bytes(payload)
+            except OSError:
+                # The worker is gone, the parent notices on reading
+                return
+
+    def send(self, worker, msg):
+        self.outboxes[worker].put(_dumps(msg))
+
+    def shutdown(self):
+        for outbox in self.outboxes:
+            outbox.put(_dumps(None))
+            outbox.put(None)
+        for writer in self.writers:
+            writer.join()
+        for process in self.processes:
+            process.join()
+        for conn in self.conns:
+            conn.close()
+        self.conns = []
+        self.processes = []
+        self.outboxes = []
+        self.writers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+
+def get_locality(
+    pool,
+    dsk,
+    result,
+    callbacks=None,
+    raise_exception=reraise,
+    **kwargs,
+):
+    """Run a graph on a ``LocalityPool`` keeping results on the workers
+
+    Like ``get_async``, but results stay in the worker process that computed
+    them.  The parent tracks which workers hold each key and sends a ready
+    task to the idle worker already holding the most bytes of its inputs.
+    Inputs missing on that worker are fetched from a worker holding them.
+    Only the requested results are sent back to the parent, except when
+    ``posttask`` callbacks are registered, which need every result.
+
+    Parameters
+    ----------
+    pool : LocalityPool
+    dsk : dict
+        A dask dictionary specifying a workflow
+    result : key or list of keys
+        Keys corresponding to desired data
+    callbacks : tuple or list of tuples, optional
+        Callbacks are passed in as tuples of length 5 or 6.
+    raise_exception : callable, optional
+        Function that takes an exception and a traceback, and raises an error.
+
+    See Also
+    --------
+    dask.local.get_async
+    """
+    if isinstance(result, list):
+        results = set(flatten(result))
+    else:
+        results = {result}
+
+    dsk = dict(convert_legacy_graph(dsk))
+    nworkers = len(pool.conns)
+    busy = [None] * nworkers  # key running (or fetching inputs) per worker
+    who_has = {}  # key -> set of workers holding it
+    nbytes = {}
+    fetching = {}  # key -> [worker, data, number of outstanding fetches]
+    outstanding = 0  # messages we expect a reply to
+
+    def release(key, state, delete=True):
+        release_data(key, state, delete=delete)
+        for worker in who_has.pop(key, ()):
+            pool.send(worker, ("release", [key]))
+
+    with local_callbacks(callbacks) as callbacks:
+        _, _, pretask_cbs, posttask_cbs, _, batch_cbs = unpack_callbacks(
+            callbacks, batched=True
+        )
+        started_cbs = []
+        succeeded = False
+        state = {}
+        try:
+            before = dict(dsk) if any(cb[0] for cb in callbacks) else None
+            for cb in callbacks:
+                if cb[0]:
+                    cb[0](dsk)
+                started_cbs.append(cb)
+            if before is not None:
+                cull_replaced(dsk, before, results)
+
+            keyorder = order(dsk)
+
+            state = start_state_from_dask(dsk, sortkey=keyorder.get)
+
+            for cb in callbacks:
+                if cb[1]:
+                    cb[1](dsk, state)
+
+            if state["waiting"] and not state["ready"]:
+                raise ValueError("Found no accessible jobs in dask")
+
+            def compute(worker, key, data):
+                nonlocal outstanding
+                send_back = key in results or bool(posttask_cbs or batch_cbs)
+                pool.send(worker, ("compute", key, dsk[key], data, send_back))
+                outstanding += 1
+                for dep in data:
+                    who_has.setdefault(dep, set()).add(worker)
+
+            def fire_tasks():
+                nonlocal outstanding
+                while state["ready"] and None in busy:
+                    key = state["ready"].pop()
+                    deps = state["dependencies"][key]
+                    idle = [w for w in range(nworkers) if busy[w] is None]
+                    worker = max(
+                        idle,
+                        key=lambda w: sum(
+                            nbytes.get(dep, 0)
+                            for dep in deps
+                            if w in who_has.get(dep, ())
+                        ),
+                    )
+                    busy[worker] = key
+                    state["running"].add(key)
+                    for f in pretask_cbs:
+                        f(key, dsk, state)
+
+                    data = {}
+                    missing = {}
+                    for dep in deps:
+                        holders = who_has.get(dep)
+                        if not holders:
+                            data[dep] = state["cache"][dep]
+                        elif worker not in holders:
+                            holder = min(holders, key=lambda w: busy[w] is not None)
+                            missing.setdefault(holder, []).append(dep)
+                    if missing:
+                        fetching[key] = [worker, data, len(missing)]
+                        for holder, keys in missing.items():
+                            pool.send(holder, ("fetch", key, keys))
+                            outstanding += 1
+                    else:
+                        compute(worker, key, data)
+
+            # Main loop, wait on tasks to finish, insert new ones
+            while state["waiting"] or state["ready"] or state["running"]:
+                fire_tasks()
+                events = []
+                for conn in wait(pool.conns):
+                    msg = _loads(conn.recv_bytes())
+                    outstanding -= 1
+                    op, key = msg[:2]
+                    if op == "data":
+                        entry = fetching[key]
+                        entry[1].update(msg[2])
+                        entry[2] -= 1
+                        if not entry[2]:
+                            del fetching[key]
+                            compute(entry[0], key, entry[1])
+                    elif op == "error":
+                        exc, tb = _loads(msg[2])
+                        raise_exception(exc, tb)
+                    else:
+                        _, key, res, size, worker_id = msg
+                        worker = pool.conns.index(conn)
+                        busy[worker] = None
+                        who_has.setdefault(key, set()).add(worker)
+                        nbytes[key] = size
+                        state["cache"][key] = res
+                        finish_task(
+                            dsk, key, state, results, keyorder.get, release_data=release
+                        )
+                        for f in posttask_cbs:
+                            f(key, res, dsk, state, worker_id)
+                        if batch_cbs:
+                            events.append((key, res, worker_id))
+                if events:
+                    for f in batch_cbs:
+                        f(events, dsk, state)
+
+            succeeded = True
+
+        finally:
+            # Wait for tasks still in flight so the pool can be reused
+            while outstanding:
+                for conn in wait(pool.conns):
+                    conn.recv_bytes()
+                    outstanding -= 1
+            for worker in range(nworkers):
+                pool.send(worker, ("clear",))
+            for cb in started_cbs:
+                if cb[4]:
+                    cb[4](dsk, state, not succeeded)
+
+    return nested_get(result, state["cache"])
+
+
 def get(
     dsk: Mapping,
     keys: Sequence[Key] | Key,
@@ -154,6 +718,8 @@ def get(
     pool=None,
     initializer=None,
     chunksize=None,
+    shared_memory_threshold=None,
+    locality=None,
     **kwargs,
 ):
     """Multiprocessed get function appropriate for Bags
@@ -165,15 +731,17 @@ def get(
     keys : object or list
         Desired results from graph
     num_workers : int
-        Number of worker processes (defaults to number of cores)
+        Number of worker processes (defaults to number of cores, see
+        ``dask.system.resources``)
     func_dumps : function
         Function to use for function serialization (defaults to cloudpickle.dumps)
     func_loads : function
         Function to use for function deserialization (defaults to cloudpickle.loads)
     optimize_graph : bool
         If True [default], `fuse` is applied to the graph before computation.
-    pool : Executor or Pool
-        Some sort of `Executor` or `Pool` to use
+    pool : Executor, Pool or LocalityPool
+        Some sort of `Executor` or `Pool` to use.  A ``LocalityPool`` implies
+        ``locality=True``.
     initializer: function
         Ignored if ``pool`` has been set.
         Function to initialize a worker process before running any tasks in it.
@@ -181,11 +749,58 @@ def get(
         Size of chunks to use when dispatching work.
         Defaults to 6 as some batching is helpful.
         If -1, will be computed to evenly divide ready work across workers.
+    shared_memory_threshold: int or str, optional
+        If set, buffers of at least this size (e.g. ``"1 MiB"``) are passed
+        between processes through shared memory instead of pipes, see
+        ``SharedMemoryTransport``.  Cannot be combined with ``func_dumps``
+        or ``func_loads``.  Not supported on Windows.
+        Defaults to the ``multiprocessing.shared-memory-threshold`` config
+        value, which is unset.
+    locality: bool, optional
+        If True, results stay in the worker process that computed them and
+        tasks are preferably sent to the worker holding their inputs, see
+        ``get_locality``.  Uses a ``LocalityPool``; ``chunksize``,
+        ``func_dumps``, ``func_loads`` and ``shared_memory_threshold`` don't
+        apply.  Defaults to the ``multiprocessing.locality`` config value.
     """
     chunksize = chunksize or config.get("chunksize", 6)
     pool = pool or config.get("pool", None)
     initializer = initializer or config.get("multiprocessing.initializer", None)
-    num_workers = num_workers or config.get("num_workers", None) or CPU_COUNT
+    num_workers = (
+        num_workers
+        or config.get("num_workers", None)
+        or resources(config.get("system.refresh-interval", None)).cpu_count
+    )
+    if locality is None:
+        locality = config.get("multiprocessing.locality", False)
+    locality = locality or isinstance(pool, LocalityPool)
+
+    # We specify marshalling functions in order to catch serialization
+    # errors and report them to the user.
+    loads = func_loads or config.get("func_loads", None) or _loads
+    dumps = func_dumps or config.get("func_dumps", None) or _dumps
+
+    transport = None
+    if shared_memory_threshold is None:
+        shared_memory_threshold = config.get(
+            "multiprocessing.shared-memory-threshold", None
+        )
+    if shared_memory_threshold is not None:
+        if loads is not _loads or dumps is not _dumps:
+            raise ValueError(
+                "shared_memory_threshold can't be combined with custom "
+                "func_dumps or func_loads"
+            )
+        if locality:
+            raise ValueError("shared_memory_threshold can't be used with locality")
+        if sys.platform == "win32":
+            warn(_SHARED_MEMORY_UNSUPPORTED, UserWarning)
+        else:
+            transport = SharedMemoryTransport(parse_bytes(shared_memory_threshold))
+            dumps, loads = transport.dumps, transport.loads
+    if locality and (loads is not _loads or dumps is not _dumps):
+        raise ValueError("locality can't be combined with func_dumps or func_loads")
+
     if pool is None:
         # In order to get consistent hashing in subprocesses, we need to set a
         # consistent seed for the Python hash algorithm. Unfortunately, there
@@ -198,9 +813,12 @@ def get(
             os.environ["PYTHONHASHSEED"] = "6640"
         context = get_context()
         initializer = partial(initialize_worker_process, user_initializer=initializer)
-        pool = ProcessPoolExecutor(
-            num_workers, mp_context=context, initializer=initializer
-        )
+        if locality:
+            pool = LocalityPool(num_workers, context=context, initializer=initializer)
+        else:
+            pool = ProcessPoolExecutor(
+                num_workers, mp_context=context, initializer=initializer
+            )
         cleanup = True
     else:
         if initializer is not None:
@@ -211,6 +829,8 @@ def get(
             )
         if isinstance(pool, multiprocessing.pool.Pool):
             pool = MultiprocessingPoolExecutor(pool)
+        if locality and not isinstance(pool, LocalityPool):
+            raise ValueError("locality requires a LocalityPool")
         cleanup = False
 
     # Optimize Dask
@@ -221,32 +841,32 @@ def get(
     else:
         dsk3 = dsk2
 
-    # We specify marshalling functions in order to catch serialization
-    # errors and report them to the user.
-    loads = func_loads or config.get("func_loads", None) or _loads
-    dumps = func_dumps or config.get("func_dumps", None) or _dumps
-
     # Note former versions used a multiprocessing Manager to share
     # a Queue between parent and workers, but this is fragile on Windows
     # (issue #1652).
     try:
         # Run
-        result = get_async(
-            pool.submit,
-            pool._max_workers,
-            dsk3,
-            keys,
-            get_id=_process_get_id,
-            dumps=dumps,
-            loads=loads,
-            pack_exception=pack_exception,
-            raise_exception=reraise,
-            chunksize=chunksize,
-            **kwargs,
-        )
+        if locality:
+            result = get_locality(pool, dsk3, keys, **kwargs)
+        else:
+            result = get_async(
+                pool.submit,
+                pool._max_workers,
+                dsk3,
+                keys,
+                get_id=_process_get_id,
+                dumps=dumps,
+                loads=loads,
+                pack_exception=pack_exception,
+                raise_exception=reraise,
+                chunksize=chunksize,
+                **kwargs,
+            )
     finally:
         if cleanup:
             pool.shutdown()
+        if transport is not None:
+            transport.cleanup()
     return result
 
 
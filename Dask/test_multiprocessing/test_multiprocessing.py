@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 import multiprocessing
+import operator
+import os
 import pickle
 import sys
+import time
 from concurrent.futures import ProcessPoolExecutor
 from operator import add
 
@@ -10,7 +13,16 @@ import pytest
 
 import dask
 from dask import compute, delayed
-from dask.multiprocessing import _dumps, _loads, get, get_context, remote_exception
+from dask.multiprocessing import (
+    LocalityPool,
+    SharedMemoryTransport,
+    _dumps,
+    _loads,
+    _shared_blocks,
+    get,
+    get_context,
+    remote_exception,
+)
 from dask.system import CPU_COUNT
 from dask.utils_test import inc
 
@@ -66,6 +78,153 @@ def test_out_of_band_pickling():
     assert np.all(a == a2)
 
 
+@pytest.mark.skipif(sys.platform == "win32", reason="Not supported on Windows")
+def test_shared_memory_transport():
+    np = pytest.importorskip("numpy")
+    worker = pickle.loads(pickle.dumps(SharedMemoryTransport(1000)))
+    parent = SharedMemoryTransport(1000)
+    assert worker.worker and not parent.worker
+
+    small, large = np.arange(10), np.arange(1000)
+    payload = worker.dumps((small, large))
+    assert len(payload) < large.nbytes
+    small2, large2 = parent.loads(payload)
+    assert_eq = np.testing.assert_array_equal
+    assert_eq(small, small2)
+    assert_eq(large, large2)
+    assert len(_shared_blocks.blocks) == 1
+
+    # Data already in shared memory is passed on by reference
+    payload = parent.dumps({"x": large2})
+    assert len(payload) < large.nbytes
+    assert_eq(worker.loads(payload)["x"], large)
+
+    del large2, payload
+    assert not _shared_blocks.blocks
+
+
+def make_array(n):
+    np = pytest.importorskip("numpy")
+    return np.arange(n)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Not supported on Windows")
+def test_shared_memory_threshold():
+    np = pytest.importorskip("numpy")
+    dsk = {
+        "a": (make_array, 100_000),
+        "b": (make_array, 10),
+        "c": (add, "a", "a"),
+        "d": (np.sum, "c"),
+    }
+    with dask.config.set({"multiprocessing.shared-memory-threshold": "1 kiB"}):
+        c, d = get(dsk, ["c", "d"], optimize_graph=False)
+    np.testing.assert_array_equal(c, 2 * np.arange(100_000))
+    assert d == c.sum()
+    assert _shared_blocks.blocks
+    del c
+    assert not _shared_blocks.blocks
+
+
+def slow_array(n):
+    time.sleep(0.2)
+    return make_array(n)
+
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="Needs /dev/shm")
+def test_shared_memory_cleanup_on_error():
+    pytest.importorskip("numpy")
+    before = set(os.listdir("/dev/shm"))
+    dsk = {("a", i): (slow_array, 100_000) for i in range(3)}
+    dsk["b"] = (bad,)
+    with pytest.raises(ValueError, match="12345"):
+        get(dsk, [*dsk], num_workers=4, shared_memory_threshold="1 kiB")
+    # Results still in flight when the computation failed are unlinked
+    assert not set(os.listdir("/dev/shm")) - before
+
+
+def test_shared_memory_threshold_custom_dumps():
+    with pytest.raises(ValueError, match="func_dumps"):
+        get({"x": 1}, "x", func_dumps=pickle.dumps, shared_memory_threshold=0)
+
+
+def test_locality():
+    dsk = {("x", i): (inc, i) for i in range(20)}
+    dsk.update({("y", i): (add, ("x", i), ("x", (i + 1) % 20)) for i in range(20)})
+    dsk["z"] = (sum, [("y", i) for i in range(20)])
+    assert get(dsk, "z", locality=True, num_workers=2) == 420
+
+    with LocalityPool(3) as pool:
+        assert get(dsk, ["z", ("y", 0)], pool=pool) == (420, 3)
+        with pytest.raises(ValueError, match="12345"):
+            get({"x": 1, "y": (inc, "x"), "z": (bad,)}, ["y", "z"], pool=pool)
+        # The pool is reusable after errors
+        with dask.config.set({"multiprocessing.locality": True}):
+            assert get(dsk, "z", pool=pool, optimize_graph=False) == 420
+
+
+def make_full(n, value):
+    np = pytest.importorskip("numpy")
+    return np.full(n, value, dtype="f8")
+
+
+def test_locality_large_data():
+    # Inputs and results larger than the pipe buffers flow in both directions
+    np = pytest.importorskip("numpy")
+    n = 2_000_000
+    dsk = {
+        "a": (make_full, n, 1.0),
+        "b": (make_full, n, 2.0),
+        "c": (add, "a", "b"),
+        "d": (operator.sub, "b", "a"),
+    }
+    c, d = get(dsk, ["c", "d"], locality=True, num_workers=2, optimize_graph=False)
+    np.testing.assert_array_equal(c, 3.0)
+    np.testing.assert_array_equal(d, 1.0)
+
+
+def test_locality_callbacks():
+    from dask.callbacks import Callback
+
+    results = {}
+
+    def posttask(key, result, dsk, state, worker_id):
+        results[key] = result
+
+    def posttask_batch(events, dsk, state):
+        batched.update((key, result) for key, result, _ in events)
+
+    batched = {}
+    dsk = {"x": 1, "y": (inc, "x"), "z": (add, "y", "x")}
+    with Callback(posttask=posttask), Callback(posttask_batch=posttask_batch):
+        assert get(dsk, "z", locality=True, num_workers=2, optimize_graph=False) == 3
+    assert results == batched == {"y": 2, "z": 3}
+
+
+def test_scheduler_trace():
+    from dask.local import SchedulerTrace
+
+    dsk = {"x": (make_list, 1000), "y": (len, "x")}
+    with SchedulerTrace() as trace:
+        assert get(dsk, "y", num_workers=2, optimize_graph=False) == 1000
+    assert [t.key for t in trace.tasks] == ["x", "y"]
+    phases = trace.phases()
+    # Results are serialized in the worker and deserialized by the scheduler
+    assert phases["worker dumps"][0] > 0
+    assert phases["scheduler loads"][0] > 0
+    assert os.getpid() not in {t.worker for t in trace.tasks}
+
+
+def make_list(n):
+    return list(range(n))
+
+
+def test_locality_requires_locality_pool():
+    with ProcessPoolExecutor(1) as pool:
+        with pytest.raises(ValueError, match="LocalityPool"):
+            get({"x": (inc, 1)}, "x", pool=pool, locality=True)
+
+
 def bad():
     raise ValueError("12345")
 
@@ -249,6 +249,7 @@ class RuleSet:
             One or more instances of RewriteRule
         """
         self._net = Node()
+        self._compiled = None
         self.rules = []
         for p in rules:
             self.add(p)
@@ -279,6 +280,14 @@ class RuleSet:
         # We've reached a leaf node. Add the term index to this leaf.
         prev_node.edges[t].patterns.append(ind)
         self.rules.append(rule)
+        self._compiled = None
+
+    @property
+    def compiled(self):
+        """The discrimination net compiled to flat dispatch tables"""
+        if self._compiled is None:
+            self._compiled = _CompiledNet(self._net)
+        return self._compiled
 
     def iter_matches(self, term):
         """A generator that lazily finds matchings for term from the RuleSet.
@@ -293,8 +302,7 @@ class RuleSet:
         matched, and `subs` is a dictionary mapping the variables in the lhs
         of the rule to their matching values in the term."""
 
-        S = Traverser(term)
-        for m, syms in _match(S, self._net):
+        for m, syms in self.compiled.match(term):
             for i in m:
                 rule = self.rules[i]
                 subs = _process_match(rule, syms)
@@ -304,6 +312,8 @@ class RuleSet:
     def _rewrite(self, term):
         """Apply the rewrite rules in RuleSet to top level of term"""
 
+        if not self.compiled.may_match(term):
+            return term
         for rule, sd in self.iter_matches(term):
             # We use for (...) because it's fast in all cases for getting the
             # first element from the match iterator. As we only want that
@@ -355,22 +365,148 @@ class RuleSet:
         """
         return strategies[strategy](self, task)
 
+    def rewrite_graph(self, dsk, strategy="bottom_up"):
+        """Apply the `RuleSet` to every task in a graph.
+
+        Equivalent to ``{k: self.rewrite(v, strategy) for k, v in
+        dsk.items()}``, but with the "bottom_up" strategy the rewrites of
+        subterms are memoized over the whole graph, so subterms shared
+        between tasks are only rewritten once.
+
+        Parameters
+        ----------
+        dsk: dict
+            The graph to rewrite
+        strategy: str, optional
+            The rewriting strategy to use. Options are "bottom_up" (default),
+            or "top_level".
+
+        Returns
+        -------
+        A new graph with the rewritten tasks.
+
+        Examples
+        --------
+        >>> from operator import add
+        >>> rs = RuleSet(RewriteRule((add, 'x', 0), 'x', ('x',)))
+        >>> rs.rewrite_graph({'a': (add, 1, 0), 'b': (add, (add, 'a', 0), 0)})
+        {'a': 1, 'b': 'a'}
+        """
+        if strategy == "bottom_up":
+            memo = {}
+            return {k: _bottom_up(self, v, memo) for k, v in dsk.items()}
+        rewrite = strategies[strategy]
+        return {k: rewrite(self, v) for k, v in dsk.items()}
+
 
 def _top_level(net, term):
     return net._rewrite(term)
 
 
-def _bottom_up(net, term):
+def _bottom_up(net, term, memo=None):
+    # ``memo`` maps ``id(term)`` to ``(term, result)`` so that subterms
+    # shared by reference are rewritten once.  The term is kept alive in the
+    # value so that its id can't be reused during the traversal.
+    if memo is None:
+        memo = {}
     if istask(term):
-        term = (head(term),) + tuple(_bottom_up(net, t) for t in args(term))
+        hit = memo.get(id(term))
+        if hit is not None:
+            return hit[1]
+        new = tuple(_bottom_up(net, t, memo) for t in args(term))
+        result = net._rewrite((head(term),) + new)
+        memo[id(term)] = (term, result)
+        return result
     elif isinstance(term, list):
-        term = [_bottom_up(net, t) for t in args(term)]
+        term = [_bottom_up(net, t, memo) for t in term]
     return net._rewrite(term)
 
 
 strategies = {"top_level": _top_level, "bottom_up": _bottom_up}
 
 
+class _CompiledNet:
+    """A discrimination net flattened into dispatch tables
+
+    Node ``i`` of the net is represented by ``edges[i]``, a dictionary
+    mapping heads to child node ids, ``var[i]``, the child node for a
+    variable (or -1), and ``patterns[i]``.  Node 0 is the root.
+
+    Matching follows ``_match``, but keeps the pending subterms in a linked
+    list of ``(term, rest)`` pairs instead of copying a ``Traverser`` for
+    every backtracking point.
+    """
+
+    def __init__(self, net):
+        self.edges = []
+        self.var = []
+        self.patterns = []
+        nodes = [net]
+        for node in nodes:
+            edges = {}
+            var = -1
+            for t, child in node.edges.items():
+                if t is VAR:
+                    var = len(nodes)
+                else:
+                    edges[t] = len(nodes)
+                nodes.append(child)
+            self.edges.append(edges)
+            self.var.append(var)
+            self.patterns.append(tuple(node.patterns))
+
+    def may_match(self, term):
+        """Whether any pattern could match ``term``, looking at its head"""
+        if self.var[0] >= 0:
+            return True
+        try:
+            return head(term) in self.edges[0]
+        except TypeError:
+            return False
+
+    def match(self, term):
+        """Yield ``(patterns, matches)`` for all matches, like ``_match``"""
+        edges, var, patterns = self.edges, self.var, self.patterns
+        stack = []
+        rest = (END, None)
+        node = 0
+        matches = ()
+        restore = False
+        while True:
+            if term is END:
+                yield patterns[node], matches
+            else:
+                if not restore:
+                    try:
+                        n = edges[node].get(head(term))
+                    except TypeError:
+                        # Unhashable heads can still match variables
+                        n = None
+                    if n is not None:
+                        stack.append((term, rest, node, matches))
+                        node = n
+                        # Advance to the next term in the preorder traversal
+                        subterms = args(term)
+                        if subterms:
+                            for t in reversed(subterms[1:]):
+                                rest = (t, rest)
+                            term = subterms[0]
+                        else:
+                            term, rest = rest
+                        continue
+                restore = False
+                n = var[node]
+                if n >= 0:
+                    matches = matches + (term,)
+                    term, rest = rest
+                    node = n
+                    continue
+            if not stack:
+                return
+            term, rest, node, matches = stack.pop()
+            restore = True
+
+
 def _match(S, N):
     """Structural matching of term S to discrimination net node N."""
 
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from dask.rewrite import VAR, RewriteRule, RuleSet, Traverser, args, head
+from dask.rewrite import VAR, RewriteRule, RuleSet, Traverser, _match, args, head
 from dask.utils_test import add, inc
 
 
@@ -155,3 +155,50 @@ def test_rewrite():
     assert rs.rewrite(term) == [1, 2, 3]
     term = (list, (map, inc, [1, 2, 3]))
     assert rs.rewrite(term) == term
+
+
+def test_matches_compiled_net_agrees_with_match():
+    terms = [
+        (add, 2, 1),
+        (add, 1, 1),
+        (add, [1], [1]),
+        (add, (inc, 1), (inc, 1)),
+        (add, (inc, 2), (inc, 1)),
+        (sum, [1, (inc, 2), 3]),
+        (list, (map, inc, [1, 2, 3])),
+        (inc, 1),
+        1,
+    ]
+    for term in terms:
+        expected = [(tuple(m), syms) for m, syms in _match(Traverser(term), rs._net)]
+        assert list(rs.compiled.match(term)) == expected
+
+
+def test_matches_shorter_term():
+    rs2 = RuleSet(
+        RewriteRule((add, "x"), "x", ("x",)),
+        RewriteRule((add, "x", "y"), "y", ("x", "y")),
+    )
+    assert rs2.rewrite((add, 1)) == 1
+    assert rs2.rewrite((add, 1, 2)) == 2
+
+
+def test_rewrite_graph():
+    shared = (add, (add, 1, 1), 1)
+    dsk = {
+        "a": (sum, [(add, 1, 1), (add, 1, 1), (add, 1, 1)]),
+        "b": (inc, shared),
+        "c": (add, shared, shared),
+        "d": 1,
+    }
+    expected = {k: rs.rewrite(v) for k, v in dsk.items()}
+    assert rs.rewrite_graph(dsk) == expected
+    assert rs.rewrite_graph(dsk, strategy="top_level") == {
+        k: rs.rewrite(v, strategy="top_level") for k, v in dsk.items()
+    }
+
+    # Rules added after compilation are picked up
+    rs2 = RuleSet(rule1)
+    assert rs2.rewrite((add, 1, 1)) == (inc, 1)
+    rs2.add(rule2)
+    assert rs2.rewrite((add, 2, 2)) == (double, 2)
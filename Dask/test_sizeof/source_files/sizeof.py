@@ -1,13 +1,19 @@
 from __future__ import annotations
 
+import contextvars
 import itertools
 import logging
+import math
 import random
 import sys
+import weakref
 from array import array
+from functools import wraps
+from typing import NamedTuple
 
 from packaging.version import Version
 
+from dask import config
 from dask._compatibility import importlib_metadata
 from dask.utils import Dispatch
 
@@ -16,6 +22,147 @@ sizeof = Dispatch(name="sizeof")
 logger = logging.getLogger(__name__)
 
 
+class SizeEstimate(NamedTuple):
+    """Estimated size in bytes with a 95% confidence interval"""
+
+    nbytes: int
+    low: int
+    high: int
+
+
+def sizeof_estimate(o) -> SizeEstimate:
+    """Estimate the size of ``o`` with a 95% confidence interval
+
+    Large Python collections are sized by sampling their items, see
+    ``sizeof_python_collection``.  The interval accounts for the sampling
+    at the top level only; nested collections contribute their point
+    estimates.  Sizes of all other objects are treated as exact.
+
+    Examples
+    --------
+    >>> sizeof_estimate(b"123")
+    SizeEstimate(nbytes=3, low=3, high=3)
+    """
+    if isinstance(o, dict):
+        nbytes, error = _sizeof_items(o.items(), len(o), _sizeof_item_pair)
+        nbytes += sys.getsizeof(o)
+    elif type(o) in (list, tuple, set, frozenset):
+        nbytes, error = _sizeof_items(o, len(o), sizeof)
+        nbytes += sys.getsizeof(o)
+    else:
+        nbytes, error = sizeof(o), 0
+    return SizeEstimate(nbytes, max(0, nbytes - error), nbytes + error)
+
+
+# Sampled items of these types all have the same size
+_FIXED_SIZE_TYPES = frozenset({float, complex, bool, type(None)})
+
+
+def _sizeof_item_pair(kv):
+    return sizeof(kv[0]) + sizeof(kv[1])
+
+
+#: ``(sample-size, max-sample-size, rtol)`` while sizing an object, so that
+#: nested collections don't read the config again
+_budget: contextvars.ContextVar[tuple[int, int, float] | None] = contextvars.ContextVar(
+    "sizeof_budget", default=None
+)
+
+
+def _sizeof_items(items, num_items, itemsize):
+    """Estimate the total size of ``items`` by adaptive sampling
+
+    Starts with ``sizeof.sample-size`` random items (10 by default) and
+    doubles the sample until the 95% confidence interval of the total is
+    within ``sizeof.rtol`` (0.1) of the estimate, or until
+    ``sizeof.max-sample-size`` (100) items have been sized.  If all sampled
+    items have the same type and that type has a fixed size, the total is
+    extrapolated from a single item.
+
+    Returns ``(nbytes, error)`` where ``error`` is the half width of the
+    confidence interval.
+    """
+    budget = _budget.get()
+    if budget is not None:
+        return _sample_sizes(items, num_items, itemsize, *budget)
+    options = config.get("sizeof", None) or {}
+    k = max(2, options.get("sample-size", 10))
+    budget = (k, max(k, options.get("max-sample-size", 100)), options.get("rtol", 0.1))
+    token = _budget.set(budget)
+    try:
+        return _sample_sizes(items, num_items, itemsize, *budget)
+    finally:
+        _budget.reset(token)
+
+
+def _sample_sizes(items, num_items, itemsize, k, max_k, rtol):
+    if num_items <= k:
+        return sum(map(itemsize, items)), 0
+    max_k = min(num_items, max_k)
+
+    # The sample grows through this, without ever sizing an item twice
+    sample = _sample(items, num_items, max_k)
+    typ = type(sample[0])
+    if typ in _FIXED_SIZE_TYPES and all(type(x) is typ for x in sample[:k]):
+        return num_items * itemsize(sample[0]), 0
+
+    sizes = list(map(itemsize, sample[:k]))
+    while True:
+        n = len(sizes)
+        mean = sum(sizes) / n
+        var = sum((x - mean) ** 2 for x in sizes) / (n - 1)
+        # Normal approximation with finite population correction
+        error = (
+            1.96 * num_items * math.sqrt(var / n * (num_items - n) / (num_items - 1))
+        )
+        if n >= max_k or error <= rtol * mean * num_items:
+            return int(num_items * mean), int(error)
+        sizes.extend(map(itemsize, sample[n : 2 * n]))
+
+
+def _sample(items, num_items, k):
+    """``k`` random items of a collection with ``num_items`` items, in random
+    order
+
+    Sets and other collections without indexing are sampled from their first
+    ``k`` items, which are in arbitrary order anyway, so that they are never
+    walked further than that.
+    """
+    if isinstance(items, (list, tuple)):
+        return random.sample(items, k)
+    sample = list(itertools.islice(items, k))
+    random.shuffle(sample)
+    return sample
+
+
+_immutable_sizes: dict[int, tuple[weakref.ref, int]] = {}
+
+
+def _cache_immutable(func):
+    """Cache ``sizeof`` results by object identity for immutable objects
+
+    Entries are dropped when the object is garbage collected, so ids can't
+    be reused while cached.
+    """
+
+    @wraps(func)
+    def wrapper(o):
+        key = id(o)
+        try:
+            return _immutable_sizes[key][1]
+        except KeyError:
+            pass
+        result = func(o)
+        try:
+            ref = weakref.ref(o, lambda _, key=key: _immutable_sizes.pop(key, None))
+        except TypeError:
+            return result
+        _immutable_sizes[key] = (ref, result)
+        return result
+
+    return wrapper
+
+
 @sizeof.register(object)
 def sizeof_default(o):
     return sys.getsizeof(o)
@@ -42,21 +189,13 @@ def sizeof_array(o):
 @sizeof.register(set)
 @sizeof.register(frozenset)
 def sizeof_python_collection(seq):
-    num_items = len(seq)
-    num_samples = 10
-    if num_items > num_samples:
-        if isinstance(seq, (set, frozenset)):
-            # As of Python v3.9, it is deprecated to call random.sample() on
-            # sets but since sets are unordered anyways we can simply pick
-            # the first `num_samples` items.
-            samples = itertools.islice(seq, num_samples)
-        else:
-            samples = random.sample(seq, num_samples)
-        return sys.getsizeof(seq) + int(
-            num_items / num_samples * sum(map(sizeof, samples))
-        )
-    else:
-        return sys.getsizeof(seq) + sum(map(sizeof, seq))
+    """Size of a Python collection, estimated by sampling large ones
+
+    See Also
+    --------
+    sizeof_estimate
+    """
+    return sys.getsizeof(seq) + _sizeof_items(seq, len(seq), sizeof)[0]
 
 
 class SimpleSizeof:
@@ -90,12 +229,7 @@ def sizeof_blocked(d):
 
 @sizeof.register(dict)
 def sizeof_python_dict(d):
-    return (
-        sys.getsizeof(d)
-        + sizeof(list(d.keys()))
-        + sizeof(list(d.values()))
-        - 2 * sizeof(list())
-    )
+    return sys.getsizeof(d) + _sizeof_items(d.items(), len(d), _sizeof_item_pair)[0]
 
 
 @sizeof.register_lazy("cupy")
@@ -204,7 +338,10 @@ def register_pandas():
             p += object_size(s._values)
         return p
 
+    # Indexes are immutable and often shared between many partitions, so
+    # their sampled object sizes are cached
     @sizeof.register(pd.Index)
+    @_cache_immutable
     def sizeof_pandas_index(i):
         p = 400 + i.memory_usage(deep=False)
         if i.dtype in OBJECT_DTYPES:
@@ -212,6 +349,7 @@ def register_pandas():
         return p
 
     @sizeof.register(pd.MultiIndex)
+    @_cache_immutable
     def sizeof_pandas_multiindex(i):
         return sum(sizeof(l) for l in i.levels) + sum(c.nbytes for c in i.codes)
 
@@ -247,6 +385,7 @@ def register_pyarrow():
         return p
 
     @sizeof.register(pa.Table)
+    @_cache_immutable
     def sizeof_pyarrow_table(table):
         p = sizeof(table.schema.metadata)
         for col in table.itercolumns():
@@ -254,6 +393,7 @@ def register_pyarrow():
         return int(p) + 1000
 
     @sizeof.register(pa.ChunkedArray)
+    @_cache_immutable
     def sizeof_pyarrow_chunked_array(data):
         return int(_get_col_size(data)) + 1000
 
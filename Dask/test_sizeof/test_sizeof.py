@@ -7,8 +7,9 @@ from array import array
 import pytest
 from packaging.version import Version
 
+import dask
 from dask.multiprocessing import get_context
-from dask.sizeof import sizeof
+from dask.sizeof import sizeof, sizeof_estimate
 from dask.utils import funcname, tmpdir
 
 try:
@@ -209,6 +210,83 @@ def test_dict():
     assert isinstance(sizeof(d), int)
 
 
+def test_sizeof_estimate():
+    exact = [b"x" * (i % 50) * 100 for i in range(10_000)]
+    true_size = sys.getsizeof(exact) + sum(map(sizeof, exact))
+    with dask.config.set({"sizeof.max-sample-size": 1000}):
+        est = sizeof_estimate(exact)
+    assert est.low <= est.nbytes <= est.high
+    assert est.high - est.low < 0.5 * true_size
+    assert abs(est.nbytes - true_size) < 0.2 * true_size
+
+    with dask.config.set({"sizeof.sample-size": 100_000}):
+        est = sizeof_estimate(exact)
+    assert est.nbytes == est.low == est.high == true_size
+
+    assert sizeof_estimate(b"123") == (3, 3, 3)
+
+
+def test_sizeof_homogeneous():
+    floats = [float(i) for i in range(100_000)]
+    expected = sys.getsizeof(floats) + 100_000 * sys.getsizeof(1.0)
+    assert sizeof(floats) == expected
+    assert sizeof_estimate(floats) == (expected, expected, expected)
+    assert sizeof(set(floats)) == sys.getsizeof(set(floats)) + expected - sys.getsizeof(
+        floats
+    )
+
+
+def test_dict_sampled():
+    d = {i: b"x" * 1000 for i in range(10_000)}
+    expected = sys.getsizeof(d) + sum(sizeof(k) + sizeof(v) for k, v in d.items())
+    est = sizeof_estimate(d)
+    assert est.nbytes == sizeof(d)
+    assert 0.9 * expected < sizeof(d) < 1.1 * expected
+
+
+class CountingSet(set):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.walked = 0
+
+    def __iter__(self):
+        for x in super().__iter__():
+            self.walked += 1
+            yield x
+
+
+def test_set_sampled_from_prefix():
+    s = CountingSet(b"x" * (i % 100) for i in range(1_000_000))
+    with dask.config.set({"sizeof.max-sample-size": 50}):
+        est = sizeof_estimate(s)
+    assert s.walked <= 50
+    assert est.low <= est.nbytes <= est.high
+
+
+def test_config_read_once(monkeypatch):
+    calls = []
+    get = dask.config.get
+
+    def counting_get(key, *args, **kwargs):
+        calls.append(key)
+        return get(key, *args, **kwargs)
+
+    monkeypatch.setattr(dask.config, "get", counting_get)
+    assert sizeof([[b"x" * i for i in range(20)] for _ in range(20)]) > 20 * 190
+    assert calls.count("sizeof") == 1
+
+
+@requires_pandas
+def test_pandas_index_cached():
+    from dask.sizeof import _immutable_sizes
+
+    idx = pd.Index([str(i) * (i % 20) for i in range(10_000)], dtype=object)
+    assert sizeof(idx) == sizeof(idx) == _immutable_sizes[id(idx)][1]
+    key = id(idx)
+    del idx
+    assert key not in _immutable_sizes
+
+
 def _get_sizeof_on_path(path, size):
     sys.path.append(os.fsdecode(path))
 
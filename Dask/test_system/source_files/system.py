@@ -3,44 +3,120 @@ from __future__ import annotations
 import math
 import os
 import sys
+import time
+from typing import NamedTuple
+
+from dask.utils import parse_timedelta
 
 try:
     import psutil
 except ImportError:
     psutil = None  # type: ignore
 
-__all__ = ("cpu_count", "CPU_COUNT")
+__all__ = (
+    "cpu_count",
+    "CPU_COUNT",
+    "memory_limit",
+    "Resources",
+    "resources",
+    "refresh",
+)
+
+
+def _cgroup_groups():
+    """Map each cgroup controller to the group of this process
+
+    Parsed from ``/proc/self/cgroup``.  The cgroup v2 unified hierarchy is
+    stored under the empty string.
+    """
+    groups = {}
+    try:
+        with open("/proc/self/cgroup") as f:
+            lines = f.read().strip().splitlines()
+    except Exception:
+        return groups
+    for line in lines:
+        try:
+            _, controllers, path = line.split(":", 2)
+        except ValueError:
+            continue
+        if not path.endswith("/"):
+            path = f"{path}/"
+        for controller in controllers.split(","):
+            groups[controller] = path
+    return groups
+
 
+def _cgroup_v1_dirs(dirnames, group):
+    # Containers usually mount their own group at the root of the hierarchy,
+    # otherwise the limits live in the directory of the process' group
+    for dirname in dirnames:
+        yield "/sys/fs/cgroup/%s/" % dirname
+        if group not in (None, "/"):
+            yield "/sys/fs/cgroup/%s%s" % (dirname, group)
+
+
+def _try_extract_cgroup_cpu_quota(groups=None):
+    if groups is None:
+        groups = _cgroup_groups()
 
-def _try_extract_cgroup_cpu_quota():
     # cgroup v1
-    # The directory name isn't standardized across linux distros, check both
-    for dirname in ["cpuacct,cpu", "cpu,cpuacct"]:
+    # The directory name isn't standardized across linux distros, check all
+    for path in _cgroup_v1_dirs(
+        ["cpuacct,cpu", "cpu,cpuacct", "cpu"], groups.get("cpu")
+    ):
         try:
-            with open("/sys/fs/cgroup/%s/cpu.cfs_quota_us" % dirname) as f:
+            with open("%scpu.cfs_quota_us" % path) as f:
                 quota = int(f.read())
-            with open("/sys/fs/cgroup/%s/cpu.cfs_period_us" % dirname) as f:
+            if quota <= 0:
+                # -1 means no quota is set
+                continue
+            with open("%scpu.cfs_period_us" % path) as f:
                 period = int(f.read())
             return quota, period
         except Exception:
             pass
 
     # cgroup v2
-    try:
-        with open("/proc/self/cgroup") as f:
-            group_path = f.read().strip().split(":")[-1]
-        if not group_path.endswith("/"):
-            group_path = f"{group_path}/"
-        with open("/sys/fs/cgroup%scpu.max" % group_path) as f:
-            quota, period = map(int, f.read().split(" "))
-            return quota, period
-    except Exception:
-        pass
+    if "" in groups:
+        try:
+            with open("/sys/fs/cgroup%scpu.max" % groups[""]) as f:
+                quota, period = map(int, f.read().split(" "))
+                return quota, period
+        except Exception:
+            pass
 
     # No cgroup CPU quota found
     return None, None
 
 
+def _try_extract_cgroup_memory_limit(groups=None):
+    if groups is None:
+        groups = _cgroup_groups()
+    paths = [
+        # cgroup v1 hard limit, "unlimited" is reported as a huge number
+        "%smemory.limit_in_bytes" % path
+        for path in _cgroup_v1_dirs(["memory"], groups.get("memory"))
+    ]
+    if "" in groups:
+        # cgroup v2 hard limit and throttling limit, "max" if unset
+        paths += [
+            "/sys/fs/cgroup%smemory.max" % groups[""],
+            "/sys/fs/cgroup%smemory.high" % groups[""],
+        ]
+
+    limit = None
+    for path in paths:
+        try:
+            with open(path) as f:
+                value = int(f.read())
+        except Exception:
+            continue
+        if value > 0 and (limit is None or value < limit):
+            limit = value
+    return limit
+
+
 def cpu_count():
     """Get the available CPU count for this system.
 
@@ -50,20 +126,26 @@ def cpu_count():
     - CPU Affinity (if set)
     - Cgroups limit (if set)
     """
+    return _cpu_count()
+
+
+def _cpu_count(groups=None):
     count = os.cpu_count()
 
     # Check CPU affinity if available
-    if psutil is not None:
-        try:
+    try:
+        if psutil is not None:
             affinity_count = len(psutil.Process().cpu_affinity())
-            if affinity_count > 0:
-                count = min(count, affinity_count)
-        except Exception:
-            pass
+        else:
+            affinity_count = len(os.sched_getaffinity(0))
+        if affinity_count > 0:
+            count = min(count, affinity_count)
+    except Exception:
+        pass
 
     # Check cgroups if available
     if sys.platform == "linux":
-        quota, period = _try_extract_cgroup_cpu_quota()
+        quota, period = _try_extract_cgroup_cpu_quota(groups)
         if quota is not None and period is not None:
             # We round up on fractional CPUs
             cgroups_count = math.ceil(quota / period)
@@ -73,4 +155,119 @@ def cpu_count():
     return count
 
 
-CPU_COUNT = cpu_count()
+def memory_limit():
+    """Get the memory limit (in bytes) for this system.
+
+    Takes the minimum value from the following locations:
+
+    - Total system memory on the host
+    - Cgroups limit (if set)
+    - RSS rlimit (if set)
+
+    Returns None if none of these can be determined.
+    """
+    return _memory_limit()
+
+
+def _memory_limit(groups=None):
+    limit = None
+    if psutil is not None:
+        limit = psutil.virtual_memory().total
+    else:
+        try:
+            limit = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+        except (AttributeError, ValueError, OSError):
+            pass
+
+    # Check cgroups if available
+    if sys.platform == "linux":
+        cgroups_limit = _try_extract_cgroup_memory_limit(groups)
+        if cgroups_limit is not None and (limit is None or cgroups_limit < limit):
+            limit = cgroups_limit
+
+    # Check rlimit if available
+    if sys.platform != "win32":
+        try:
+            import resource
+
+            hard_limit = resource.getrlimit(resource.RLIMIT_RSS)[1]
+            if hard_limit > 0 and (limit is None or hard_limit < limit):
+                limit = hard_limit
+        except (ImportError, OSError):
+            pass
+
+    return limit
+
+
+class Resources(NamedTuple):
+    """A snapshot of the resources available to this process
+
+    See ``resources`` and ``refresh``.
+    """
+
+    #: Number of usable CPUs, see ``cpu_count``
+    cpu_count: int
+    #: Usable memory in bytes or None if unknown, see ``memory_limit``
+    memory_limit: int | None
+    #: ``time.monotonic()`` at which the snapshot was taken
+    timestamp: float
+
+
+def refresh():
+    """Probe the available resources again and update the cached snapshot
+
+    Use this when the limits of the process may have changed, e.g. after a
+    Kubernetes pod was resized.  Also updates ``CPU_COUNT``.  The default
+    pools of ``dask.threaded.get`` and ``dask.multiprocessing.get`` pick up
+    the new CPU count on their next call.
+
+    Returns
+    -------
+    Resources
+    """
+    global CPU_COUNT, _resources
+    snapshot = _resources = _probe()
+    CPU_COUNT = snapshot.cpu_count
+    return snapshot
+
+
+def resources(max_age=None):
+    """Get the cached snapshot of the resources available to this process
+
+    The snapshot is taken once at import, which is cheap to read from.
+
+    Parameters
+    ----------
+    max_age: float, str or None
+        If given, ``refresh`` the snapshot when it is older than this many
+        seconds (or a duration like ``"30s"``).  Schedulers pass the
+        ``system.refresh-interval`` config value here, which is unset by
+        default, so that resources are only probed again when asked for.
+
+    Returns
+    -------
+    Resources
+
+    Examples
+    --------
+    >>> resources().cpu_count  # doctest: +SKIP
+    8
+    >>> resources(max_age="30s").memory_limit  # doctest: +SKIP
+    17179869184
+    """
+    snapshot = _resources
+    if max_age is not None:
+        max_age = parse_timedelta(max_age, default="s")
+        if time.monotonic() - snapshot.timestamp >= max_age:
+            snapshot = refresh()
+    return snapshot
+
+
+def _probe():
+    # Share a single read of /proc/self/cgroup between both probes
+    groups = _cgroup_groups() if sys.platform == "linux" else {}
+    return Resources(_cpu_count(groups), _memory_limit(groups), time.monotonic())
+
+
+_resources = _probe()
+CPU_COUNT = _resources.cpu_count
@@ -7,7 +7,8 @@ import sys
 
 import pytest
 
-from dask.system import cpu_count
+import dask.system
+from dask.system import cpu_count, memory_limit, refresh, resources
 
 psutil = pytest.importorskip("psutil")
 
@@ -96,3 +97,79 @@ def test_cpu_count_cgroups_v2(quota, group_name, monkeypatch):
     else:
         # Rounds up
         assert count == 201
+
+
+@pytest.mark.parametrize(
+    "cgroup, paths",
+    [
+        (
+            "4:memory:/\n1:cpu:/\n",
+            {"/sys/fs/cgroup/memory/memory.limit_in_bytes": "2000"},
+        ),
+        (
+            "4:memory:/my.slice\n1:cpu:/\n",
+            {"/sys/fs/cgroup/memory/my.slice/memory.limit_in_bytes": "2000"},
+        ),
+        (
+            "0::/my.slice",
+            {
+                "/sys/fs/cgroup/my.slice/memory.max": "3000",
+                "/sys/fs/cgroup/my.slice/memory.high": "2000",
+            },
+        ),
+        ("0::/", {"/sys/fs/cgroup/memory.max": "max"}),
+    ],
+)
+def test_memory_limit_cgroups(cgroup, paths, monkeypatch):
+    class MyVirtualMemory:
+        total = 10_000
+
+    monkeypatch.setattr(psutil, "virtual_memory", MyVirtualMemory)
+
+    paths = {"/proc/self/cgroup": cgroup, **paths}
+    builtin_open = builtins.open
+
+    def myopen(path, *args, **kwargs):
+        if path in paths:
+            return io.StringIO(paths[path])
+        if str(path).startswith(("/sys/fs/cgroup", "/proc/self/cgroup")):
+            raise FileNotFoundError(path)
+        return builtin_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "open", myopen)
+    monkeypatch.setattr(sys, "platform", "linux")
+
+    if "max" in paths.values():
+        assert memory_limit() == 10_000
+    else:
+        assert memory_limit() == 2000
+
+
+def test_memory_limit():
+    limit = memory_limit()
+    assert isinstance(limit, int)
+    assert 0 < limit <= psutil.virtual_memory().total
+
+
+def test_resources_refresh(monkeypatch):
+    before = resources()
+    assert before.cpu_count == dask.system.CPU_COUNT
+    assert before.memory_limit == memory_limit()
+    assert resources() is before
+    assert resources(max_age=3600) is before
+
+    monkeypatch.setattr(dask.system, "_cpu_count", lambda groups=None: 123)
+    monkeypatch.setattr(dask.system, "_resources", before)
+    monkeypatch.setattr(dask.system, "CPU_COUNT", before.cpu_count)
+    # The snapshot is only probed again on request
+    assert resources().cpu_count == before.cpu_count
+
+    after = refresh()
+    assert after.cpu_count == 123
+    assert after.timestamp >= before.timestamp
+    assert resources() is after
+    assert dask.system.CPU_COUNT == 123
+
+    monkeypatch.setattr(dask.system, "_cpu_count", lambda groups=None: 7)
+    assert resources(max_age="1h") is after
+    assert resources(max_age=0).cpu_count == 7
@@ -10,24 +10,218 @@ import atexit
 import multiprocessing.pool
 import sys
 import threading
-from collections import defaultdict
+from collections import deque
 from collections.abc import Mapping, Sequence
-from concurrent.futures import Executor, ThreadPoolExecutor
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager, nullcontext
 from threading import Lock, current_thread
 
 from dask import config
-from dask.local import MultiprocessingPoolExecutor, get_async
-from dask.system import CPU_COUNT
+from dask.local import MultiprocessingPoolExecutor, get_async, get_async_work_stealing
+from dask.system import resources
 from dask.typing import Key
+from dask.utils import parse_timedelta
 
 
 def _thread_get_id():
     return current_thread().ident
 
 
+_worker_state = threading.local()
+
+
+class ElasticExecutor(Executor):
+    """A thread pool that grows and shrinks with demand
+
+    At most ``max_workers`` threads run tasks at any time.  Threads are
+    started when work is submitted and nobody is idle, and exit after
+    ``idle_timeout`` seconds without work.  Tasks are queued per submitting
+    thread and taken from these queues round-robin, so concurrent callers
+    get a fair share of the threads regardless of how much work each of
+    them submits.
+
+    A process-wide instance is shared by all calls to ``dask.threaded.get``
+    that don't pass a ``pool``.
+
+    Parameters
+    ----------
+    max_workers : int
+        Maximum number of threads running tasks, see ``resize``
+    idle_timeout : float, optional
+        Seconds after which an idle thread exits
+    thread_name_prefix : str, optional
+        Prefix of the names of the worker threads
+
+    Examples
+    --------
+    >>> with ElasticExecutor(4) as pool:
+    ...     pool.submit(sum, [1, 2, 3]).result()
+    6
+    """
+
+    def __init__(self, max_workers, idle_timeout=10.0, thread_name_prefix="Dask"):
+        if max_workers <= 0:
+            raise ValueError("max_workers must be greater than 0")
+        self._max_workers = max_workers
+        self.idle_timeout = idle_timeout
+        self.thread_name_prefix = thread_name_prefix
+        self._lock = Lock()
+        self._work = threading.Condition(self._lock)
+        # Queued work per submitting thread and the round-robin order of the
+        # threads with queued work
+        self._queues: dict[int, deque] = {}
+        self._callers: deque[int] = deque()
+        self._pending = 0
+        self._threads: set[threading.Thread] = set()
+        self._idle = 0
+        self._starting = 0
+        # Workers waiting on a nested computation don't count towards
+        # max_workers, see ``blocking``
+        self._blocked = 0
+        self._counter = 0
+        self._shutdown = False
+
+    @property
+    def num_threads(self):
+        """Number of threads currently alive"""
+        return len(self._threads)
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = Future()
+        caller = threading.get_ident()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            queue = self._queues.get(caller)
+            if queue is None:
+                queue = self._queues[caller] = deque()
+                self._callers.append(caller)
+            queue.append((future, fn, args, kwargs))
+            self._pending += 1
+            self._work.notify()
+            self._adjust()
+        return future
+
+    def resize(self, max_workers):
+        """Change the maximum number of threads running tasks
+
+        Surplus threads exit after finishing their current task.
+        """
+        if max_workers <= 0:
+            raise ValueError("max_workers must be greater than 0")
+        with self._lock:
+            self._max_workers = max_workers
+            self._work.notify_all()
+            self._adjust()
+
+    @contextmanager
+    def blocking(self):
+        """Mark the current thread as blocked while in this context
+
+        A task of this executor that waits for other tasks of this executor,
+        e.g. a nested call to ``dask.threaded.get``, would otherwise hold on to
+        one of the ``max_workers`` slots, which deadlocks once all slots are
+        taken this way.  Does nothing in threads of other executors.
+        """
+        if getattr(_worker_state, "executor", None) is not self:
+            yield
+            return
+        with self._lock:
+            self._blocked += 1
+            self._adjust()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._blocked -= 1
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                for queue in self._queues.values():
+                    for future, _, _, _ in queue:
+                        future.cancel()
+                self._queues.clear()
+                self._callers.clear()
+                self._pending = 0
+            self._work.notify_all()
+            threads = list(self._threads)
+        if wait:
+            for t in threads:
+                if t is not current_thread():
+                    t.join()
+
+    def _adjust(self):
+        # Start threads while there is more queued work than idle threads.
+        # Must hold the lock.
+        while (
+            self._pending > self._idle + self._starting
+            and len(self._threads) < self._max_workers + self._blocked
+        ):
+            self._starting += 1
+            self._counter += 1
+            t = threading.Thread(
+                target=self._worker,
+                name=f"{self.thread_name_prefix}-{self._counter}",
+                daemon=True,
+            )
+            self._threads.add(t)
+            t.start()
+
+    def _next(self):
+        # Pop the next task of the next caller in line.  Must hold the lock.
+        caller = self._callers.popleft()
+        queue = self._queues[caller]
+        item = queue.popleft()
+        if queue:
+            self._callers.append(caller)
+        else:
+            del self._queues[caller]
+        self._pending -= 1
+        return item
+
+    def _worker(self):
+        _worker_state.executor = self
+        this = current_thread()
+        self._lock.acquire()
+        self._starting -= 1
+        try:
+            while True:
+                if len(self._threads) > self._max_workers + self._blocked:
+                    # Shrunk by ``resize``
+                    break
+                if self._pending:
+                    future, fn, args, kwargs = self._next()
+                    self._lock.release()
+                    try:
+                        if future.set_running_or_notify_cancel():
+                            try:
+                                result = fn(*args, **kwargs)
+                            except BaseException as e:  # noqa: B036
+                                future.set_exception(e)
+                            else:
+                                future.set_result(result)
+                        del future, fn, args, kwargs
+                    finally:
+                        self._lock.acquire()
+                    continue
+                if self._shutdown:
+                    break
+                self._idle += 1
+                notified = self._work.wait(self.idle_timeout)
+                self._idle -= 1
+                if not notified and not self._pending:
+                    break
+        finally:
+            self._threads.discard(this)
+            self._lock.release()
+
+
 main_thread = current_thread()
-default_pool: Executor | None = None
-pools: defaultdict[threading.Thread, dict[int, Executor]] = defaultdict(dict)
+default_pool: ElasticExecutor | None = None
+# Executors for calls asking for more threads than the default pool runs
+pools: dict[int, ElasticExecutor] = {}
 pools_lock = Lock()
 
 
@@ -41,6 +235,7 @@ def get(
     cache=None,
     num_workers=None,
     pool=None,
+    scheduler=None,
     **kwargs,
 ):
     """Threaded cached implementation of dask.get
@@ -53,9 +248,24 @@ def get(
     keys: key or list of keys
         Keys corresponding to desired data
     num_workers: integer of thread count
-        The number of threads to use in the ThreadPool that will actually execute tasks
+        The number of tasks to run at the same time.  Unless ``pool`` is
+        given, tasks run in a process-wide ``ElasticExecutor`` that runs at
+        most ``threaded.max-workers`` tasks at once, across all concurrent
+        calls.  That defaults to the CPU count of ``dask.system.resources()``
+        and the executor is resized when that changes, see
+        ``dask.system.refresh``.  Larger values, e.g. for I/O bound tasks,
+        get an ``ElasticExecutor`` of their own, shared by all calls with
+        the same ``num_workers``.
+    pool: Executor or multiprocessing.pool.Pool (optional)
+        Pool running the tasks instead of the shared ``ElasticExecutor``
     cache: dict-like (optional)
         Temporary storage of results
+    scheduler: {"default", "work-stealing"} (optional)
+        How scheduling decisions are made.  ``"default"`` runs the scheduler
+        loop in the calling thread, see ``dask.local.get_async``.
+        ``"work-stealing"`` gives each thread its own queue of ready tasks,
+        see ``dask.local.get_async_work_stealing``.  Defaults to the
+        ``threaded.scheduler`` config value.
 
     Examples
     --------
@@ -70,42 +280,58 @@ def get(
     global default_pool
     pool = pool or config.get("pool", None)
     num_workers = num_workers or config.get("num_workers", None)
-    thread = current_thread()
-
+    scheduler = scheduler or config.get("threaded.scheduler", "default")
+    if scheduler == "default":
+        get_func = get_async
+    elif scheduler == "work-stealing":
+        get_func = get_async_work_stealing
+    else:
+        raise ValueError(
+            f"Unknown scheduler {scheduler!r}, expected 'default' or 'work-stealing'"
+        )
     with pools_lock:
         if pool is None:
-            if num_workers is None and thread is main_thread:
+            max_workers = (
+                config.get("threaded.max-workers", None)
+                or resources(config.get("system.refresh-interval", None)).cpu_count
+            )
+            idle_timeout = parse_timedelta(config.get("threaded.idle-timeout", "10s"))
+            if num_workers and num_workers > max_workers:
+                pool = pools.get(num_workers)
+                if pool is None:
+                    pool = pools[num_workers] = ElasticExecutor(
+                        num_workers, idle_timeout=idle_timeout
+                    )
+                    atexit.register(pool.shutdown)
+            else:
                 if default_pool is None:
-                    default_pool = ThreadPoolExecutor(CPU_COUNT)
+                    default_pool = ElasticExecutor(
+                        max_workers, idle_timeout=idle_timeout
+                    )
                     atexit.register(default_pool.shutdown)
+                elif default_pool._max_workers != max_workers:
+                    default_pool.resize(max_workers)
                 pool = default_pool
-            elif thread in pools and num_workers in pools[thread]:
-                pool = pools[thread][num_workers]
-            else:
-                pool = ThreadPoolExecutor(num_workers)
-                atexit.register(pool.shutdown)
-                pools[thread][num_workers] = pool
+                num_workers = num_workers or max_workers
         elif isinstance(pool, multiprocessing.pool.Pool):
             pool = MultiprocessingPoolExecutor(pool)
+            num_workers = pool._max_workers
+        else:
+            num_workers = pool._max_workers
 
-    results = get_async(
-        pool.submit,
-        pool._max_workers,
-        dsk,
-        keys,
-        cache=cache,
-        get_id=_thread_get_id,
-        pack_exception=pack_exception,
-        **kwargs,
-    )
-
-    # Cleanup pools associated to dead threads
-    with pools_lock:
-        active_threads = set(threading.enumerate())
-        if thread is not main_thread:
-            for t in list(pools):
-                if t not in active_threads:
-                    for p in pools.pop(t).values():
-                        p.shutdown()
+    # Nested calls from tasks of the shared executor hand their slot over
+    # while waiting for their own tasks
+    blocking = pool.blocking() if isinstance(pool, ElasticExecutor) else nullcontext()
+    with blocking:
+        results = get_func(
+            pool.submit,
+            num_workers,
+            dsk,
+            keys,
+            cache=cache,
+            get_id=_thread_get_id,
+            pack_exception=pack_exception,
+            **kwargs,
+        )
 
     return results
@@ -10,9 +10,11 @@ from time import sleep, time
 import pytest
 
 import dask
+import dask.system
+from dask import threaded
 from dask.system import CPU_COUNT
-from dask.threaded import get
-from dask.utils_test import add, inc
+from dask.threaded import ElasticExecutor, get
+from dask.utils_test import GetFunctionTestMixin, add, inc
 
 
 def test_get():
@@ -187,3 +189,161 @@ def test_interrupt():
             get(dsk, "x", pool=pool)
         clog_event.set()
     interrupter.join()
+
+
+def test_default_pool_follows_refresh(monkeypatch):
+    def check_pool_size(n):
+        get({"x": (inc, 1)}, "x")
+        assert threaded.default_pool._max_workers == n
+
+    check_pool_size(dask.system.resources().cpu_count)
+    old = threaded.default_pool
+
+    monkeypatch.setattr(dask.system, "_resources", dask.system.resources())
+    monkeypatch.setattr(dask.system, "_cpu_count", lambda groups=None: 3)
+    # Not probed again until refreshed or the refresh interval passed
+    check_pool_size(old._max_workers)
+    assert threaded.default_pool is old
+
+    dask.system.refresh()
+    check_pool_size(3)
+    # Resized in place
+    assert threaded.default_pool is old
+
+    monkeypatch.setattr(dask.system, "_cpu_count", lambda groups=None: 2)
+    with dask.config.set({"system.refresh-interval": 0}):
+        check_pool_size(2)
+
+
+def test_elastic_executor_grows_and_shrinks():
+    event = threading.Event()
+    with ElasticExecutor(3, idle_timeout=0.05) as pool:
+        futures = [pool.submit(event.wait) for _ in range(5)]
+        assert pool.num_threads == 3
+        event.set()
+        assert all(f.result() for f in futures)
+
+        start = time()
+        while pool.num_threads:
+            sleep(0.01)
+            assert time() < start + 5
+        assert pool.submit(inc, 1).result() == 2
+
+
+def test_elastic_executor_resize():
+    event = threading.Event()
+    with ElasticExecutor(1) as pool:
+        futures = [pool.submit(event.wait) for _ in range(4)]
+        assert pool.num_threads == 1
+        pool.resize(4)
+        assert pool.num_threads == 4
+        pool.resize(2)
+        event.set()
+        for f in futures:
+            f.result()
+        start = time()
+        while pool.num_threads > 2:
+            sleep(0.01)
+            assert time() < start + 5
+        with pytest.raises(ValueError):
+            pool.resize(0)
+
+
+def test_elastic_executor_fair_share():
+    order = []
+    with ElasticExecutor(1) as pool:
+        blocker = threading.Event()
+        pool.submit(blocker.wait)
+
+        def submit_many(name, n):
+            return [pool.submit(order.append, name) for _ in range(n)]
+
+        futures = submit_many("a", 5)
+        t = threading.Thread(target=lambda: futures.extend(submit_many("b", 2)))
+        t.start()
+        t.join()
+        blocker.set()
+        for f in futures:
+            f.result()
+    # Callers take turns rather than running in submission order
+    assert order == ["a", "b", "a", "b", "a", "a", "a"]
+
+
+def test_elastic_executor_exceptions_and_shutdown():
+    pool = ElasticExecutor(2)
+    with pytest.raises(ValueError):
+        pool.submit(bad, 1).result()
+    pool.shutdown()
+    assert pool.num_threads == 0
+    with pytest.raises(RuntimeError, match="shutdown"):
+        pool.submit(inc, 1)
+
+
+def test_shared_executor_across_threads():
+    dsk = {("x", i): (inc, i) for i in range(10)}
+    dsk["x"] = (sum, list(dsk))
+    before = threading.active_count()
+    L = []
+
+    def f():
+        L.append(get(dsk, "x", num_workers=4))
+
+    with dask.config.set({"threaded.max-workers": 2}):
+        threads = [threading.Thread(target=f) for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    assert L == [55] * 20
+    assert threaded.default_pool.num_threads <= 2
+    assert threading.active_count() <= before + 2
+
+
+def test_num_workers_above_shared_pool_size():
+    # All tasks must run at once to get past the barrier
+    barrier = threading.Barrier(8, timeout=5)
+    dsk = {("x", i): (barrier.wait,) for i in range(8)}
+    dsk["x"] = (len, list(dsk))
+    with dask.config.set({"threaded.max-workers": 2}):
+        assert get(dsk, "x", num_workers=8) == 8
+        assert threaded.default_pool is None or threaded.default_pool.num_threads <= 2
+        assert threaded.pools[8]._max_workers == 8
+
+
+def test_nested_get_does_not_deadlock():
+    def nested(i):
+        return get({"y": (inc, i)}, "y")
+
+    dsk = {("x", i): (nested, i) for i in range(4)}
+    dsk["x"] = (sum, list(dsk))
+    with dask.config.set({"threaded.max-workers": 1}):
+        assert get(dsk, "x") == 10
+
+
+class TestWorkStealing(GetFunctionTestMixin):
+    @staticmethod
+    def get(dsk, keys, **kwargs):
+        return get(dsk, keys, scheduler="work-stealing", **kwargs)
+
+
+@pytest.mark.parametrize("num_workers", [1, 2, 8])
+def test_work_stealing_many_tasks(num_workers):
+    dsk = {("x", i): (inc, i) for i in range(1000)}
+    dsk.update({("y", i): (add, ("x", i), ("x", i + 1)) for i in range(999)})
+    dsk["z"] = (sum, [("y", i) for i in range(999)])
+    expected = get(dsk, "z", num_workers=num_workers)
+    with dask.config.set({"threaded.scheduler": "work-stealing"}):
+        assert get(dsk, "z", num_workers=num_workers) == expected
+
+
+def test_work_stealing_exceptions_rise_to_top():
+    dsk = {("x", i): (inc, i) for i in range(100)}
+    dsk["y"] = (bad, ("x", 50))
+    dsk["z"] = (sum, [("x", i) for i in range(100)] + ["y"])
+    with pytest.raises(ValueError):
+        get(dsk, "z", scheduler="work-stealing", num_workers=4)
+
+
+def test_unknown_scheduler():
+    with pytest.raises(ValueError, match="Unknown scheduler"):
+        get({"x": 1}, "x", scheduler="foo")
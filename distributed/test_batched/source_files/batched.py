@@ -1,22 +1,39 @@
 from __future__ import annotations
 
-import contextlib
+import asyncio
 import logging
-from collections import deque
+import math
+from collections import defaultdict, deque
+from collections.abc import Callable
 from typing import Any
 
-from tornado import gen, locks
 from tornado.ioloop import IOLoop
+from tornado.iostream import StreamClosedError
 
 import dask
-from dask.utils import parse_timedelta
+from dask.sizeof import sizeof
+from dask.utils import parse_bytes, parse_timedelta
 
 from distributed.core import CommClosedError
 from distributed.metrics import time
+from distributed.utils import wait_for
 
 logger = logging.getLogger(__name__)
 
 
+def _nbytes_bucket(nbytes: int) -> int:
+    """Smallest power of two that is >= ``nbytes``"""
+    return 1 << max(0, nbytes - 1).bit_length()
+
+
+def _latency_bucket(seconds: float) -> float:
+    """Smallest power of two (in seconds) that is >= ``seconds``
+
+    Everything under a microsecond lands in the same bucket.
+    """
+    return 2.0 ** max(-20, math.ceil(math.log2(max(seconds, 1e-6))))
+
+
 class BatchedSend:
     """Batch messages in batches on a stream
 
@@ -38,32 +55,116 @@ class BatchedSend:
     On the other side, the recipient will get a message like the following::
 
         ['Hello,', 'world!']
+
+    Messages are normally held back for up to ``interval`` after the previous
+    batch.  A batch is sent earlier once the buffer holds more than
+    ``max_batch_messages`` messages or an estimated ``max_batch_bytes`` bytes,
+    so that a burst of traffic does not pile up into one huge write.  When the
+    link has been quiet for longer than ``interval`` the first message is sent
+    right away and the loop parks without a timer until more arrive.
+
+    Messages sent with ``priority=True`` go into a separate lane which is
+    flushed as soon as possible, ahead of the regular buffer and regardless of
+    the interval.  Ordering is only preserved within a lane; use it for small
+    control messages that must not wait behind bulk traffic.
+
+    Besides ``message_count``, ``batch_count`` and ``byte_count``, the sizes of
+    written batches and the time between the oldest message of a batch being
+    buffered and the batch being written are tracked in ``byte_histogram`` and
+    ``latency_histogram``.  Both map the upper bound of a power-of-two bucket
+    (bytes and seconds respectively) to the number of batches that fell into
+    it.
+
+    Backpressure
+    ------------
+    ``send`` never blocks and never drops messages.  When the peer cannot keep
+    up, the messages held by the ``BatchedSend`` (buffered or in flight) are
+    compared against ``high_water_messages`` and an estimated
+    ``high_water_bytes``.  Once either is exceeded the ``on_backpressure``
+    callback is called with ``True``; once both are back under half of their
+    high water mark it is called with ``False``.  Producers that can wait
+    should use ``await send_and_wait(...)``, which returns only once the
+    buffer has drained below the low water mark.
     """
 
     # XXX why doesn't BatchedSend follow either the IOStream or Comm API?
 
-    def __init__(self, interval, loop=None, serializers=None):
+    def __init__(
+        self,
+        interval,
+        loop=None,
+        serializers=None,
+        max_batch_bytes=None,
+        max_batch_messages=None,
+        high_water_bytes=None,
+        high_water_messages=None,
+        on_backpressure: Callable[[bool], None] | None = None,
+    ):
         # XXX is the loop arg useful?
         self.loop = loop or IOLoop.current()
         self.interval = parse_timedelta(interval, default="ms")
-        self.waker = locks.Event()
-        self.stopped = locks.Event()
+        if max_batch_bytes is None:
+            max_batch_bytes = dask.config.get(
+                "distributed.comm.batched-send.max-bytes", "4 MiB"
+            )
+        if max_batch_messages is None:
+            max_batch_messages = dask.config.get(
+                "distributed.comm.batched-send.max-messages", 10000
+            )
+        self.max_batch_bytes = parse_bytes(max_batch_bytes)
+        self.max_batch_messages = max_batch_messages
+        if high_water_bytes is None:
+            high_water_bytes = dask.config.get(
+                "distributed.comm.batched-send.high-water-bytes", "256 MiB"
+            )
+        if high_water_messages is None:
+            high_water_messages = dask.config.get(
+                "distributed.comm.batched-send.high-water-messages", 1_000_000
+            )
+        self.high_water_bytes = parse_bytes(high_water_bytes)
+        self.high_water_messages = high_water_messages
+        self.on_backpressure = on_backpressure
+        self.waker = asyncio.Event()
+        self.stopped = asyncio.Event()
+        self.drained = asyncio.Event()
+        self.drained.set()
+        self.backpressure = False
         self.please_stop = False
         self.buffer = []
+        self.priority_buffer = []
         self.comm = None
         self.message_count = 0
         self.batch_count = 0
         self.byte_count = 0
+        self.byte_histogram = defaultdict(int)
+        self.latency_histogram = defaultdict(int)
         self.next_deadline = None
         self.recent_message_log = deque(
             maxlen=dask.config.get("distributed.admin.low-level-log-length")
         )
+        self._recent_message_nbytes = deque()
+        self._recent_message_total = 0
+        self._recent_message_max_bytes = parse_bytes(
+            dask.config.get("distributed.admin.low-level-log-bytes", "32 MiB")
+        )
         self.serializers = serializers
         self._consecutive_failures = 0
+        # Moving average of the wire size of a message, learnt from previous
+        # writes.  Used to estimate the size of the buffer without having to
+        # look at the messages themselves.
+        self._message_nbytes = 0.0
+        self._buffer_since = None
+        self._priority_since = None
+        self._in_flight = 0
+        self._task = None
 
     def start(self, comm):
         self.comm = comm
-        self.loop.add_callback(self._background_send)
+        self.loop.add_callback(self._start)
+
+    def _start(self):
+        # Hold a reference; the event loop only keeps weak references to tasks
+        self._task = asyncio.ensure_future(self._background_send())
 
     def closed(self):
         return self.comm and self.comm.closed()
@@ -72,53 +173,128 @@ class BatchedSend:
         if self.closed():
             return "<BatchedSend: closed>"
         else:
-            return "<BatchedSend: %d in buffer>" % len(self.buffer)
+            return "<BatchedSend: %d in buffer>" % (
+                len(self.buffer) + len(self.priority_buffer)
+            )
 
     __str__ = __repr__
 
-    @gen.coroutine
-    def _background_send(self):
-        while not self.please_stop:
+    def _full(self):
+        """Whether the regular buffer should be sent without waiting"""
+        n = len(self.buffer)
+        return (
+            n >= self.max_batch_messages
+            or n * self._message_nbytes >= self.max_batch_bytes
+        )
+
+    @property
+    def pending(self) -> int:
+        """Number of messages buffered or being written"""
+        return len(self.buffer) + len(self.priority_buffer) + self._in_flight
+
+    def _update_backpressure(self):
+        n = self.pending
+        if not self.backpressure:
+            if (
+                n > self.high_water_messages
+                or n * self._message_nbytes > self.high_water_bytes
+            ):
+                self._set_backpressure(True)
+        elif (
+            n <= self.high_water_messages // 2
+            and n * self._message_nbytes <= self.high_water_bytes // 2
+        ) or self.please_stop:
+            self._set_backpressure(False)
+
+    def _set_backpressure(self, value):
+        self.backpressure = value
+        if value:
+            self.drained.clear()
+        else:
+            self.drained.set()
+        if self.on_backpressure is not None:
             try:
-                yield self.waker.wait(self.next_deadline)
-                self.waker.clear()
-            except gen.TimeoutError:
-                pass
-            if not self.buffer:
+                self.on_backpressure(value)
+            except Exception:
+                logger.exception("Error in backpressure callback")
+
+    def _record(self, payload, nbytes, since):
+        self.byte_count += nbytes
+        self.byte_histogram[_nbytes_bucket(nbytes)] += 1
+        if since is not None:
+            self.latency_histogram[_latency_bucket(time() - since)] += 1
+        if payload:
+            self._message_nbytes = 0.8 * self._message_nbytes + 0.2 * (
+                nbytes / len(payload)
+            )
+
+        # Bound the memory held by the log both in entries and in bytes
+        if nbytes >= min(1e6, self._recent_message_max_bytes):
+            payload, nbytes = "large-message", 0
+        log = self.recent_message_log
+        sizes = self._recent_message_nbytes
+        if log.maxlen is not None and len(log) == log.maxlen:
+            self._recent_message_total -= sizes.popleft()
+        log.append(payload)
+        sizes.append(nbytes)
+        self._recent_message_total += nbytes
+        while self._recent_message_total > self._recent_message_max_bytes:
+            log.popleft()
+            self._recent_message_total -= sizes.popleft()
+
+    async def _background_send(self):
+        while not self.please_stop:
+            if self.priority_buffer or self.next_deadline is None:
+                await self.waker.wait()
+            else:
+                try:
+                    await wait_for(
+                        self.waker.wait(), max(0, self.next_deadline - time())
+                    )
+                except asyncio.TimeoutError:
+                    pass
+            self.waker.clear()
+            if self.priority_buffer:
+                # Control messages don't wait for the interval and don't push
+                # back the deadline of the regular buffer
+                payload, self.priority_buffer = self.priority_buffer, []
+                since, self._priority_since = self._priority_since, None
+                if self.buffer and self.next_deadline is None:
+                    # Regular messages that were due right away
+                    self.waker.set()
+            elif not self.buffer:
                 # Nothing to send
                 self.next_deadline = None
                 continue
-            if self.next_deadline is not None and time() < self.next_deadline:
+            elif (
+                self.next_deadline is not None
+                and time() < self.next_deadline
+                and not self._full()
+            ):
                 # Send interval not expired yet
                 continue
-            payload, self.buffer = self.buffer, []
+            else:
+                payload, self.buffer = self.buffer, []
+                since, self._buffer_since = self._buffer_since, None
+                self.next_deadline = time() + self.interval
             self.batch_count += 1
-            self.next_deadline = time() + self.interval
+            self._in_flight = len(payload)
             try:
-                # NOTE: Since `BatchedSend` doesn't have a handle on the running
-                # `_background_send` coroutine, the only thing with a reference to this
-                # coroutine is the event loop itself. If the event loop stops while
-                # we're waiting on a `write`, the `_background_send` coroutine object
-                # may be garbage collected. If that happens, the `yield coro` will raise
-                # `GeneratorExit`. But because this is an old-school `gen.coroutine`,
-                # and we're using `yield` and not `await`, the `write` coroutine object
-                # will not actually have been awaited, and it will remain sitting around
-                # for someone to retrieve it. At interpreter exit, this will warn
-                # sommething like `RuntimeWarning: coroutine 'TCP.write' was never
-                # awaited`. By using the `closing` contextmanager, the `write` coroutine
-                # object is always cleaned up, even if `yield` raises `GeneratorExit`.
-                with contextlib.closing(
-                    self.comm.write(
-                        payload, serializers=self.serializers, on_error="raise"
-                    )
-                ) as coro:
-                    nbytes = yield coro
-                if nbytes < 1e6:
-                    self.recent_message_log.append(payload)
-                else:
-                    self.recent_message_log.append("large-message")
-                self.byte_count += nbytes
-            except CommClosedError:
+                nbytes = await self.comm.write(
+                    payload, serializers=self.serializers, on_error="raise"
+                )
+                self._record(payload, nbytes, since)
+                # TCP comms only queue the frames on the stream and return.  If
+                # the peer is slow, wait for the socket to catch up so that the
+                # backlog stays in our buffer, where it counts towards
+                # backpressure, instead of piling up unseen in the stream.
+                stream = getattr(self.comm, "stream", None)
+                unflushed = getattr(stream, "_write_buffer", None)
+                if unflushed is not None and len(unflushed) > (
+                    self.high_water_bytes // 2
+                ):
+                    await stream.write(b"")
+            except (CommClosedError, StreamClosedError):
                 logger.info("Batched Comm Closed %r", self.comm, exc_info=True)
                 break
             except Exception:
@@ -132,6 +308,8 @@ class BatchedSend:
                 break
             finally:
                 payload = None  # lose ref
+                self._in_flight = 0
+                self._update_backpressure()
         else:
             # nobreak. We've been gracefully closed.
             self.stopped.set()
@@ -147,51 +325,84 @@ class BatchedSend:
         self.stopped.set()
         self.abort()
 
-    def send(self, *msgs: Any) -> None:
+    def send(self, *msgs: Any, priority: bool = False) -> None:
         """Schedule a message for sending to the other side
 
-        This completes quickly and synchronously
+        This completes quickly and synchronously.  Messages sent with
+        ``priority=True`` are written as soon as possible, ahead of any
+        regular messages still waiting in the buffer.
         """
         if self.comm is not None and self.comm.closed():
             raise CommClosedError(f"Comm {self.comm!r} already closed.")
+        if not msgs:
+            return
 
         self.message_count += len(msgs)
-        self.buffer.extend(msgs)
-        # Avoid spurious wakeups if possible
-        if self.next_deadline is None:
+        if not self._message_nbytes:
+            # Nothing written yet to learn from
+            self._message_nbytes = float(sizeof(msgs[0]))
+        if priority:
+            if not self.priority_buffer:
+                self._priority_since = time()
+            self.priority_buffer.extend(msgs)
             self.waker.set()
+        else:
+            if not self.buffer:
+                self._buffer_since = time()
+            self.buffer.extend(msgs)
+            # Avoid spurious wakeups if possible
+            if self.next_deadline is None or self._full():
+                self.waker.set()
+        if not self.backpressure:
+            self._update_backpressure()
+
+    async def send_and_wait(self, *msgs: Any, priority: bool = False) -> None:
+        """Schedule a message for sending and wait for the buffer to drain
 
-    @gen.coroutine
-    def close(self, timeout=None):
+        Returns immediately unless the buffer is above its high water mark,
+        in which case this waits until it has drained below the low water
+        mark.  Raises ``CommClosedError`` if the comm closes while waiting.
+        """
+        self.send(*msgs, priority=priority)
+        if self.backpressure:
+            await self.drained.wait()
+            if self.closed():
+                raise CommClosedError(f"Comm {self.comm!r} closed.")
+
+    async def close(self, timeout=None):
         """Flush existing messages and then close comm
 
-        If set, raises `tornado.util.TimeoutError` after a timeout.
+        If set, raises ``TimeoutError`` after a timeout.
         """
         if self.comm is None:
             return
         self.please_stop = True
         self.waker.set()
-        yield self.stopped.wait(timeout=timeout)
+        if timeout is not None:
+            timeout = parse_timedelta(timeout)
+        await wait_for(self.stopped.wait(), timeout)
         if not self.comm.closed():
             try:
-                if self.buffer:
-                    self.buffer, payload = [], self.buffer
-                    # See note in `_background_send` for explanation of `closing`.
-                    with contextlib.closing(
-                        self.comm.write(
-                            payload, serializers=self.serializers, on_error="raise"
-                        )
-                    ) as coro:
-                        yield coro
+                for lane in ("priority_buffer", "buffer"):
+                    payload = getattr(self, lane)
+                    if not payload:
+                        continue
+                    setattr(self, lane, [])
+                    await self.comm.write(
+                        payload, serializers=self.serializers, on_error="raise"
+                    )
             except CommClosedError:
                 pass
-            yield self.comm.close()
+            await self.comm.close()
+        self._update_backpressure()
 
     def abort(self):
         if self.comm is None:
             return
         self.please_stop = True
         self.buffer = []
+        self.priority_buffer = []
         self.waker.set()
         if not self.comm.closed():
             self.comm.abort()
+        self._update_backpressure()
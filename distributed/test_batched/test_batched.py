@@ -1,13 +1,16 @@
 from __future__ import annotations
 
 import asyncio
+import os
 import random
 
 import pytest
 from tlz import assoc
 
+import dask
+
 from distributed.batched import BatchedSend
-from distributed.core import CommClosedError, connect, listen
+from distributed.core import CommClosedError, ConnectionPool, connect, listen
 from distributed.metrics import time
 from distributed.protocol import to_serialize
 from distributed.utils import All, wait_for
@@ -254,3 +257,236 @@ async def test_serializers():
         assert "function" in value
 
         assert comm.closed()
+
+
+@gen_test()
+async def test_priority_lane():
+    async with EchoServer() as e:
+        comm = await connect(e.address)
+
+        b = BatchedSend(interval="500ms")
+        b.start(comm)
+
+        b.send("first")
+        assert await wait_for(comm.read(), 5) == ("first",)
+
+        b.send("bulk")
+        b.send("ping", priority=True)
+        b.send("pong", priority=True)
+        # Control messages overtake the regular buffer
+        assert await wait_for(comm.read(), 0.4) == ("ping", "pong")
+        assert await wait_for(comm.read(), 5) == ("bulk",)
+        assert b.message_count == 4
+        assert b.batch_count == 3
+
+        await comm.close()
+        await b.close()
+
+
+@gen_test()
+async def test_flush_on_threshold():
+    async with EchoServer() as e:
+        comm = await connect(e.address)
+
+        b = BatchedSend(interval="10s", max_batch_messages=3)
+        b.start(comm)
+
+        b.send("first")
+        assert await wait_for(comm.read(), 5) == ("first",)
+        b.send(1, 2)
+        b.send(3)
+        # Not waiting for the interval to pass
+        assert await wait_for(comm.read(), 5) == (1, 2, 3)
+
+        b.max_batch_messages = 1000
+        b.max_batch_bytes = 1000
+        assert b._message_nbytes > 0
+        n = int(1000 / b._message_nbytes) + 1
+        b.send(*range(n))
+        assert len(await wait_for(comm.read(), 5)) == n
+
+        await comm.close()
+        await b.close()
+
+
+@gen_test()
+async def test_histograms():
+    async with EchoServer() as e:
+        comm = await connect(e.address)
+
+        b = BatchedSend(interval="1ms")
+        b.start(comm)
+
+        for i in range(5):
+            b.send(i)
+            b.send(os.urandom(3000), priority=True)
+            await asyncio.sleep(0.005)
+
+        while b.buffer or b.priority_buffer:
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0.005)
+
+        assert b.batch_count == 10
+        assert sum(b.byte_histogram.values()) == b.batch_count
+        assert sum(b.latency_histogram.values()) == b.batch_count
+        assert max(b.byte_histogram) == 4096
+        for bucket in b.byte_histogram:
+            assert bucket & (bucket - 1) == 0
+
+        await comm.close()
+        await b.close()
+
+
+@gen_test()
+async def test_recent_message_log_is_bounded():
+    async with EchoServer() as e:
+        comm = await connect(e.address)
+
+        with dask.config.set({"distributed.admin.low-level-log-bytes": "10 kiB"}):
+            b = BatchedSend(interval="1ms")
+        b.start(comm)
+
+        for _ in range(10):
+            b.send(b"x" * 3000)
+            await wait_for(comm.read(), 5)
+
+        assert 1 <= len(b.recent_message_log) <= 3
+        assert b._recent_message_total <= 10 * 1024
+
+        b.send(b"x" * 20000)
+        await wait_for(comm.read(), 5)
+        assert b.recent_message_log[-1] == "large-message"
+
+        await comm.close()
+        await b.close()
+
+
+@gen_test()
+async def test_backpressure():
+    async with EchoServer() as e:
+        comm = await connect(e.address)
+
+        events = []
+        b = BatchedSend(
+            interval="1ms", high_water_messages=10, on_backpressure=events.append
+        )
+        b.send(*range(10))
+        assert not b.backpressure
+        b.send(10)
+        assert b.backpressure
+        assert events == [True]
+
+        waiter = asyncio.ensure_future(b.send_and_wait(11))
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+
+        b.start(comm)
+        await wait_for(waiter, 5)
+        assert not b.backpressure
+        assert events == [True, False]
+        assert await wait_for(comm.read(), 5) == tuple(range(12))
+
+        # No waiting below the high water mark
+        await wait_for(b.send_and_wait("x"), 0.1)
+
+        await comm.close()
+        await b.close()
+
+
+@gen_test()
+async def test_send_and_wait_closed():
+    async with EchoServer() as e:
+        comm = await connect(e.address)
+
+        b = BatchedSend(interval="1ms", high_water_messages=1)
+        waiter = asyncio.ensure_future(b.send_and_wait(1, 2))
+        await asyncio.sleep(0.01)
+        b.comm = comm
+        b.abort()
+        with pytest.raises(CommClosedError):
+            await wait_for(waiter, 5)
+
+
+@gen_test()
+async def test_connection_pool_limit_per_address():
+    async with EchoServer() as e, EchoServer() as e2:
+        async with ConnectionPool(limit=10, limit_per_address=2) as pool:
+            a = await pool.connect(e.address)
+            b = await pool.connect(e.address)
+            waiter = asyncio.ensure_future(pool.connect(e.address))
+            await asyncio.sleep(0.01)
+            assert not waiter.done()
+            # Other addresses aren't held back
+            c = await wait_for(pool.connect(e2.address), 5)
+
+            pool.reuse(e.address, a)
+            # The comm is handed over rather than parked
+            assert await wait_for(waiter, 5) is a
+            assert not pool.available[e.address]
+
+            waiter = asyncio.ensure_future(pool.connect(e.address))
+            await asyncio.sleep(0.01)
+            await b.close()
+            pool.reuse(e.address, b)
+            d = await wait_for(waiter, 5)
+            assert d is not b
+            await d.write(1)
+            assert await d.read() == 1
+            assert pool.open == 3
+
+            waiter = asyncio.ensure_future(pool.connect(e.address))
+            await asyncio.sleep(0.01)
+            pool.remove(e.address)
+            with pytest.raises(CommClosedError):
+                await wait_for(waiter, 5)
+            pool.reuse(e2.address, c)
+            assert pool.metrics["misses"] == 4
+            assert pool.metrics["hits"] == 1
+
+
+@gen_test()
+async def test_connection_pool_evicts_least_recently_used():
+    async with EchoServer() as e, EchoServer() as e2, EchoServer() as e3:
+        async with ConnectionPool(limit=2) as pool:
+            a = await pool.connect(e.address)
+            b = await pool.connect(e2.address)
+            pool.reuse(e.address, a)
+            pool.reuse(e2.address, b)
+            assert pool.open == 2
+
+            await pool.connect(e3.address)
+            assert not pool.available[e.address]
+            assert pool.available[e2.address] == {b}
+            assert pool.metrics["evicted"] == 1
+            pool._validate()
+
+
+@gen_test()
+async def test_connection_pool_idle_timeout():
+    async with EchoServer() as e:
+        async with ConnectionPool(idle_timeout="50ms") as pool:
+            comm = await pool.connect(e.address)
+            pool.reuse(e.address, comm)
+            assert pool.open == 1
+            start = time()
+            while pool.open:
+                await asyncio.sleep(0.01)
+                assert time() < start + 5
+            assert pool.metrics["reaped"] == 1
+            pool._validate()
+
+
+@gen_test()
+async def test_connection_pool_prewarm():
+    async with EchoServer() as e, EchoServer() as e2:
+        async with ConnectionPool(limit=5, limit_per_address=2, timeout=0.2) as pool:
+            addrs = [e.address, e2.address, "tcp://127.0.0.1:1"]
+            assert await pool.prewarm(addrs, n=3) == 4
+            assert pool.open == 4
+            assert await pool.prewarm(addrs) == 0
+
+            comm = await pool.connect(e.address)
+            assert pool.metrics["hits"] == 1
+            assert pool.metrics["misses"] == 0
+            pool.reuse(e.address, comm)
+            pool._validate()
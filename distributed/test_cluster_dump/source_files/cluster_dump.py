@@ -3,20 +3,36 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import math
+import zlib
 from collections import defaultdict
-from collections.abc import Awaitable, Callable, Collection, Mapping
+from collections.abc import Awaitable, Callable, Collection, Iterable, Iterator, Mapping
 from pathlib import Path
 from typing import IO, Any, Literal
 
 import msgpack
 
 from dask.typing import Key
+from dask.utils import key_split
 
 from distributed._stories import scheduler_story as _scheduler_story
 from distributed._stories import worker_story as _worker_story
 
 DEFAULT_CLUSTER_DUMP_FORMAT: Literal["msgpack" | "yaml"] = "msgpack"
 DEFAULT_CLUSTER_DUMP_EXCLUDE: Collection[str] = ("run_spec",)
+#: Bump whenever the layout of the index built by :func:`index_cluster_dump` changes
+CLUSTER_DUMP_INDEX_VERSION = 3
+CLUSTER_DUMP_TABLE_FORMATS = {"parquet": ".parquet", "arrow": ".arrow", "npz": ".npz"}
+#: Worker task states in which a task isn't waiting for anything
+_FINAL_WORKER_STATES = ("memory", "error", "released", "forgotten")
+#: Types of the columns which aren't strings, for tables without rows
+_COLUMN_TYPES = {"timestamp": float, "responsive": bool}
+#: Bytes at the start and at the end of a dump covered by the checksum in its index
+_INDEX_CHECKSUM_BLOCK = 2**16
+#: Bytes of the uncompressed dump in each block of the data file written next to an
+#: index
+_INDEX_DATA_BLOCK = 2**18
 
 
 def _tuple_to_list(node):
@@ -108,6 +124,277 @@ def load_cluster_dump(url: str, **kwargs: Any) -> dict:
         return reader(f)
 
 
+def _index_state(up: msgpack.Unpacker, n: int) -> dict:
+    """Index the ``n`` fields of a scheduler or worker state, which ``up`` is about to
+    read, without keeping any of them in memory.
+    """
+    fields = {}
+    tasks = {}
+    states = defaultdict(list)
+    workers = None
+    for _ in range(n):
+        name = up.unpack()
+        start = up.tell()
+        if name == "tasks":
+            for _ in range(up.read_map_header()):
+                key = up.unpack()
+                task_start = up.tell()
+                ts = up.unpack()
+                tasks[key] = (task_start, up.tell() - task_start)
+                states[ts.get("state")].append(key)
+        elif name == "workers":
+            workers = []
+            for _ in range(up.read_map_header()):
+                workers.append(up.unpack())
+                up.skip()
+        else:
+            up.skip()
+        fields[name] = (start, up.tell() - start)
+    return {
+        "fields": fields,
+        "tasks": tasks,
+        "states": dict(states),
+        "workers": workers,
+    }
+
+
+class _BlockWriter:
+    """Passes reads through from ``f`` and writes everything read to ``out`` in
+    independently compressed blocks, so that any part of it can be read again
+    without decompressing what comes before
+    """
+
+    def __init__(self, f: IO[bytes], out: IO[bytes]):
+        self.f = f
+        self.out = out
+        self.buffer = bytearray()
+        self.offsets = [0]
+
+    def read(self, n: int = -1) -> bytes:
+        data = self.f.read(n)
+        self.buffer += data
+        while len(self.buffer) >= _INDEX_DATA_BLOCK:
+            self._write(self.buffer[:_INDEX_DATA_BLOCK])
+            del self.buffer[:_INDEX_DATA_BLOCK]
+        return data
+
+    def _write(self, data: bytearray) -> None:
+        block = zlib.compress(data, 1)
+        self.out.write(block)
+        self.offsets.append(self.offsets[-1] + len(block))
+
+    def finish(self) -> list[int]:
+        """Write the rest of ``f`` and return the offsets of the blocks in ``out``,
+        followed by its size
+        """
+        while self.read(_INDEX_DATA_BLOCK):
+            pass
+        if self.buffer:
+            self._write(self.buffer)
+            self.buffer.clear()
+        return self.offsets
+
+
+def index_cluster_dump(url: str, data_url: str | None = None, **kwargs: Any) -> dict:
+    """Builds an index of a msgpack cluster dump in a single streaming pass
+
+    The index maps every top-level section, every field of the scheduler and worker
+    states, and every task to its offset and length in the uncompressed dump. Tasks
+    are also grouped by state. Only one task, or one field that isn't indexed
+    further (e.g. a log), is held in memory at a time.
+
+    Parameters
+    ----------
+    url : str
+        Name of the disk artefact. This must have a ``.msgpack.gz`` suffix.
+    data_url : str, optional
+        Where to also write the uncompressed dump in blocks of 256 kiB, compressed
+        one by one, so that :class:`IndexedDumpArtefact` can read any span of it
+        without decompressing the dump from the start. The index then has the
+        ``block_size`` and the offsets of the ``blocks``. Nothing is written if
+        ``data_url`` can't be opened.
+    **kwargs :
+        Extra arguments passed to :func:`fsspec.open`.
+
+    Returns
+    -------
+    index : dict
+        An index which can be serialized with msgpack.
+    """
+    if not url.endswith(".msgpack.gz"):
+        raise ValueError(f"url ({url}) must have a .msgpack.gz suffix")
+
+    kwargs.setdefault("compression", "infer")
+    import fsspec
+
+    of = fsspec.open(url, "rb", **kwargs)
+    # Taken before reading, so that a dump rewritten meanwhile is indexed again
+    fingerprint = _dump_fingerprint(of.fs, of.path)
+    data = None
+    if data_url is not None:
+        try:
+            data = fsspec.open(data_url, "wb", **{**kwargs, "compression": None}).open()
+        except OSError:
+            pass
+    sections = {}
+    scheduler = None
+    workers: dict[str, dict | None] = {}
+    blocks = None
+    with of as f, data or contextlib.nullcontext():
+        if data is not None:
+            f = _BlockWriter(f, data)
+        # Individual fields, such as the transition log, may exceed the default
+        # maximum buffer size of 100 MiB
+        up = msgpack.Unpacker(f, max_buffer_size=0)
+        for _ in range(up.read_map_header()):
+            name = up.unpack()
+            start = up.tell()
+            if name == "scheduler":
+                scheduler = _index_state(up, up.read_map_header())
+            elif name == "workers":
+                for _ in range(up.read_map_header()):
+                    address = up.unpack()
+                    try:
+                        n = up.read_map_header()
+                    except ValueError:
+                        # The worker did not respond to the request for a dump
+                        up.skip()
+                        workers[address] = None
+                    else:
+                        workers[address] = _index_state(up, n)
+            else:
+                up.skip()
+            sections[name] = (start, up.tell() - start)
+        if data is not None:
+            blocks = f.finish()
+
+    index = {
+        "version": CLUSTER_DUMP_INDEX_VERSION,
+        **fingerprint,
+        "sections": sections,
+        "scheduler": scheduler,
+        "workers": workers,
+    }
+    if blocks is not None:
+        index["block_size"] = _INDEX_DATA_BLOCK
+        index["blocks"] = blocks
+    return index
+
+
+def _dump_fingerprint(fs: Any, path: str) -> dict:
+    """Size, modification time and a checksum of the first and last blocks of a
+    compressed dump, which its index must match to be used
+    """
+    size = fs.size(path)
+    try:
+        mtime = fs.modified(path).timestamp()
+    except (NotImplementedError, OSError):
+        mtime = None
+    head = fs.cat_file(path, start=0, end=min(size, _INDEX_CHECKSUM_BLOCK))
+    tail = fs.cat_file(path, start=max(size - _INDEX_CHECKSUM_BLOCK, 0), end=size)
+    return {
+        "size": size,
+        "mtime": mtime,
+        "checksum": zlib.crc32(tail, zlib.crc32(head)),
+    }
+
+
+def _exists(url: str, **kwargs: Any) -> bool:
+    import fsspec
+
+    of = fsspec.open(url, "rb", **kwargs)
+    return of.fs.exists(of.path)
+
+
+def _scalar(value: Any) -> Any:
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return str(value)
+
+
+def _key(value: Any) -> Any:
+    """A task key as it was before msgpack decoded its tuples as lists"""
+    return tuple(map(_key, value)) if isinstance(value, list) else value
+
+
+def _key_columns(keys: Iterable) -> tuple[list, list[str]]:
+    """The ``key`` and ``task_prefix`` columns of task keys read from a dump"""
+    keys = [_key(k) for k in keys]
+    return (
+        [_scalar(k) for k in keys],
+        [key_split(k) if isinstance(k, (str, tuple)) else "" for k in keys],
+    )
+
+
+def _records_to_columns(records: list[dict], **extra: list) -> dict[str, list]:
+    """Columns of all the fields of ``records`` which hold a scalar in any of them.
+    Other values are converted to strings, and missing ones to None.
+    """
+    columns = dict(extra)
+    names = {
+        k: None
+        for r in records
+        for k, v in r.items()
+        if v is None or isinstance(v, (str, int, float))
+    }
+    for name in names:
+        columns.setdefault(name, [_scalar(r.get(name)) for r in records])
+    return columns
+
+
+def _to_array(values: list, strings: str, empty: type | None = None) -> Any:
+    """Convert a column to a numpy array of bools, ints, floats (with NaN for None)
+    or strings (with "" for None), stored with the ``strings`` dtype. Empty columns
+    are of type ``empty``, or strings.
+    """
+    import numpy as np
+
+    if not values:
+        return np.array([], dtype=empty or strings)
+    kinds = {type(v) for v in values}
+    if kinds == {bool}:
+        return np.array(values, dtype=bool)
+    if kinds == {int}:
+        try:
+            return np.array(values, dtype=np.int64)
+        except OverflowError:
+            pass
+    if kinds <= {int, float, bool, type(None)} and kinds != {bool, type(None)}:
+        return np.array([math.nan if v is None else v for v in values], dtype=float)
+    return np.array(["" if v is None else str(v) for v in values], dtype=strings)
+
+
+def _log_to_columns(log: Iterable, **extra: Any) -> dict[str, list]:
+    """Columns of a transition log or a worker story log. Transitions have a dict of
+    recommendations in third to last position and get a ``finish`` state; other
+    events only have a ``key`` and an ``action``.
+    """
+    columns: dict[str, list] = {
+        **{k: [] for k in extra},
+        "key": [],
+        "task_prefix": [],
+        "action": [],
+        "finish": [],
+        "stimulus_id": [],
+        "timestamp": [],
+    }
+    keys = []
+    for entry in log:
+        for k, v in extra.items():
+            columns[k].append(v)
+        keys.append(entry[0])
+        columns["action"].append(_scalar(entry[1]))
+        transition = len(entry) >= 6 and isinstance(entry[-3], dict)
+        columns["finish"].append(_scalar(entry[2]) if transition else None)
+        columns["stimulus_id"].append(_scalar(entry[-2]))
+        timestamp = entry[-1]
+        columns["timestamp"].append(
+            timestamp if isinstance(timestamp, (int, float)) else None
+        )
+    columns["key"], columns["task_prefix"] = _key_columns(keys)
+    return columns
+
+
 class DumpArtefact(Mapping):
     """
     Utility class for inspecting the state of a cluster dump
@@ -337,3 +624,464 @@ class DumpArtefact(Mapping):
 
             with open(filename, "w") as fd:
                 yaml.dump(_logs, fd, Dumper=dumper)
+
+    def _tables(self) -> Iterator[tuple[str, dict[str, list]]]:
+        # The columns used by time_in_state and stuck_tasks exist even without rows
+        scheduler = self.dump["scheduler"]
+        tasks = list(scheduler["tasks"].values())
+        keys, prefixes = _key_columns(t.get("key") for t in tasks)
+        yield "scheduler_tasks", _records_to_columns(
+            tasks,
+            key=keys,
+            state=[_scalar(t.get("state")) for t in tasks],
+            task_prefix=prefixes,
+        )
+        yield "transitions", _log_to_columns(scheduler["transition_log"])
+
+        workers = {
+            address: info
+            for address, info in self.dump["workers"].items()
+            if isinstance(info, dict)
+        }
+        addresses = list(dict.fromkeys([*scheduler["workers"], *workers]))
+        yield "workers", _records_to_columns(
+            [workers.get(address, {}) for address in addresses],
+            address=addresses,
+            responsive=[address in workers for address in addresses],
+        )
+
+        tasks = []
+        task_workers = []
+        for address, info in workers.items():
+            worker_tasks = info.get("tasks", {}).values()
+            tasks.extend(worker_tasks)
+            task_workers.extend([address] * len(worker_tasks))
+        keys, prefixes = _key_columns(t.get("key") for t in tasks)
+        yield "worker_tasks", _records_to_columns(
+            tasks,
+            worker=task_workers,
+            key=keys,
+            state=[_scalar(t.get("state")) for t in tasks],
+            task_prefix=prefixes,
+        )
+
+        log = _log_to_columns((), worker=None)
+        for address, info in workers.items():
+            for k, v in _log_to_columns(info.get("log", ()), worker=address).items():
+                log[k].extend(v)
+        yield "worker_log", log
+
+    def to_tables(
+        self,
+        root_dir: str | Path | None = None,
+        format: Literal["parquet", "arrow", "npz"] = "parquet",
+    ) -> None:
+        """
+        Writes the tasks, transitions and worker stories of the Dump Artefact to
+        columnar tables, one file per table in ``root_dir``, for offline analysis
+        with :func:`load_tables`, :func:`time_in_state` and :func:`stuck_tasks`.
+
+        The tables are
+
+        - ``scheduler_tasks`` and ``worker_tasks``: one row per task, with its
+          ``task_prefix`` and every scalar field of the task's state, plus the
+          ``worker`` for the latter
+        - ``transitions`` and ``worker_log``: one row per entry of the scheduler's
+          transition log and of the workers' story logs, with ``key``,
+          ``task_prefix``, ``action``, ``finish``, ``stimulus_id`` and
+          ``timestamp`` columns, plus the ``worker`` for the latter
+        - ``workers``: one row per worker known to the scheduler or in the dump,
+          with its ``address``, whether it was ``responsive``, and every scalar field
+          of its state
+
+        Missing strings are stored as ``""`` and missing numbers as NaN. Tuple keys
+        are stored as ``str(key)``.
+
+        Parameters
+        ----------
+        root_dir : str or Path
+            The directory into which the tables are written.
+            Defaults to the current working directory if ``None``.
+        format : str
+            ``"parquet"`` or ``"arrow"`` (IPC file format), which require pyarrow,
+            or ``"npz"``, which only requires numpy. ``"npz"`` stores strings with a
+            fixed width, so it gets large when a column holds e.g. long tracebacks.
+        """
+        try:
+            suffix = CLUSTER_DUMP_TABLE_FORMATS[format]
+        except KeyError:
+            raise ValueError(
+                f"Unsupported format {format!r}. "
+                f"Possible values are {list(CLUSTER_DUMP_TABLE_FORMATS)}."
+            ) from None
+
+        import numpy as np
+
+        if format != "npz":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+        root_dir = Path(root_dir) if root_dir else Path.cwd()
+        root_dir.mkdir(parents=True, exist_ok=True)
+        for name, columns in self._tables():
+            path = root_dir / f"{name}{suffix}"
+            if format == "npz":
+                np.savez(
+                    path,
+                    **{
+                        k: _to_array(v, "U", _COLUMN_TYPES.get(k))
+                        for k, v in columns.items()
+                    },
+                )
+                continue
+            table = pa.table(
+                {
+                    k: pa.array(
+                        _to_array(v, "O", _COLUMN_TYPES.get(k)),
+                        type=None if v or k in _COLUMN_TYPES else pa.string(),
+                    )
+                    for k, v in columns.items()
+                }
+            )
+            if format == "parquet":
+                pq.write_table(table, path)
+            else:
+                with pa.ipc.new_file(path, table.schema) as writer:
+                    writer.write_table(table)
+
+
+class _LazySections(Mapping):
+    """The top-level sections of an indexed dump, each read on first access"""
+
+    def __init__(self, artefact: IndexedDumpArtefact):
+        self.artefact = artefact
+        self.cache: dict[str, Any] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self.cache[key]
+        except KeyError:
+            pass
+        span = self.artefact.index["sections"][key]
+        value = self.cache[key] = next(self.artefact._read([span]))
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.artefact.index["sections"])
+
+    def __len__(self) -> int:
+        return len(self.artefact.index["sections"])
+
+
+class IndexedDumpArtefact(DumpArtefact):
+    """
+    A :class:`DumpArtefact` which reads a ``.msgpack.gz`` cluster dump lazily
+
+    On first open, the dump is streamed once to build an index (see
+    :func:`index_cluster_dump`), which is saved next to it together with a copy of
+    the dump compressed in small blocks. They are built again if the size,
+    modification time, first or last blocks of the dump change. Queries then only
+    read and decompress the blocks holding the tasks or logs they need. The Mapping
+    API loads top-level sections on demand.
+
+    .. code-block:: python
+
+        dump = IndexedDumpArtefact.from_url("dump.msgpack.gz")
+        memory_tasks = dump.scheduler_tasks_in_state("memory")
+    """
+
+    def __init__(
+        self, url: str, index: dict, data_url: str | None = None, **kwargs: Any
+    ):
+        self.url = url
+        self.index = index
+        self.data_url = data_url
+        self.storage_options = kwargs
+        self.dump = _LazySections(self)  # type: ignore[assignment]
+
+    @classmethod
+    def from_url(  # type: ignore[override]
+        cls, url: str, index_url: str | None = None, **kwargs: Any
+    ) -> IndexedDumpArtefact:
+        """Opens a cluster dump, indexing it unless an up to date index exists
+
+        Parameters
+        ----------
+        url : str
+            Name of the disk artefact. This must have a ``.msgpack.gz`` suffix.
+        index_url : str, optional
+            Where to read and write the index. Defaults to ``url`` with an
+            ``.index`` suffix. The blocks of the dump go to ``index_url`` with a
+            ``.data`` suffix. If they can't be written, the index is only kept in
+            memory and queries decompress the dump up to the data they need.
+        **kwargs :
+            Extra arguments passed to :func:`fsspec.open`.
+        """
+        if not url.endswith(".msgpack.gz"):
+            raise ValueError(f"url ({url}) must have a .msgpack.gz suffix")
+
+        import fsspec
+
+        kwargs.setdefault("compression", "infer")
+        if index_url is None:
+            index_url = url + ".index"
+        data_url = index_url + ".data"
+        index_kwargs = {**kwargs, "compression": None}
+
+        of = fsspec.open(url, "rb", **kwargs)
+        fingerprint = _dump_fingerprint(of.fs, of.path)
+        try:
+            with fsspec.open(index_url, "rb", **index_kwargs) as f:
+                index = msgpack.unpack(f, strict_map_key=False)
+        except (OSError, ValueError):
+            index = None
+
+        if (
+            not isinstance(index, dict)
+            or index.get("version") != CLUSTER_DUMP_INDEX_VERSION
+            or any(index.get(k) != v for k, v in fingerprint.items())
+            or ("blocks" in index and not _exists(data_url, **index_kwargs))
+        ):
+            index = index_cluster_dump(url, data_url=data_url, **kwargs)
+            try:
+                with fsspec.open(index_url, "wb", **index_kwargs) as f:
+                    msgpack.pack(index, f)
+            except OSError:
+                pass
+        return cls(url, index, data_url=data_url, **kwargs)
+
+    def _read(self, spans: Iterable[tuple[int, int]]) -> Iterator[Any]:
+        """Decode the objects at the given spans of the uncompressed dump, in the
+        order in which they appear in it
+        """
+        if self.data_url is None or "blocks" not in self.index:
+            return self._read_dump(spans)
+        return self._read_blocks(spans)
+
+    def _read_dump(self, spans: Iterable[tuple[int, int]]) -> Iterator[Any]:
+        import fsspec
+
+        with fsspec.open(self.url, "rb", **self.storage_options) as f:
+            for start, size in sorted(spans):
+                f.seek(start)
+                yield msgpack.unpackb(f.read(size))
+
+    def _read_blocks(self, spans: Iterable[tuple[int, int]]) -> Iterator[Any]:
+        import fsspec
+
+        blocks = self.index["blocks"]
+        block_size = self.index["block_size"]
+        current = -1
+        block = b""
+        with fsspec.open(
+            self.data_url, "rb", **{**self.storage_options, "compression": None}
+        ) as f:
+            for start, size in sorted(spans):
+                first = start // block_size
+                parts = []
+                for i in range(first, (start + size - 1) // block_size + 1):
+                    if i != current:
+                        f.seek(blocks[i])
+                        block = zlib.decompress(f.read(blocks[i + 1] - blocks[i]))
+                        current = i
+                    parts.append(block)
+                offset = start - first * block_size
+                data = parts[0] if len(parts) == 1 else b"".join(parts)
+                yield msgpack.unpackb(data[offset : offset + size])
+
+    def _workers(self) -> Iterator[dict]:
+        return (w for w in self.index["workers"].values() if w is not None)
+
+    def scheduler_tasks_in_state(self, state: str | None = None) -> list:
+        scheduler = self.index["scheduler"]
+        tasks = scheduler["tasks"]
+        keys = scheduler["states"].get(state, ()) if state else tasks
+        return list(self._read(tasks[k] for k in keys))
+
+    def worker_tasks_in_state(self, state: str | None = None) -> list:
+        spans = []
+        for worker in self._workers():
+            tasks = worker["tasks"]
+            keys = worker["states"].get(state, ()) if state else tasks
+            spans.extend(tasks[k] for k in keys)
+        return list(self._read(spans))
+
+    def scheduler_story(self, *key_or_stimulus_id: Key | str) -> dict:
+        stories = defaultdict(list)
+        span = self.index["scheduler"]["fields"]["transition_log"]
+        for log in self._read([span]):
+            for story in _scheduler_story(set(key_or_stimulus_id), log):
+                stories[story[0]].append(tuple(story))
+        return dict(stories)
+
+    def worker_story(self, *key_or_stimulus_id: str) -> dict:
+        keys = set(key_or_stimulus_id)
+        stories = defaultdict(list)
+        spans = [w["fields"]["log"] for w in self._workers() if "log" in w["fields"]]
+        for log in self._read(spans):
+            for story in _worker_story(keys, log):
+                stories[story[0]].append(tuple(story))
+        return dict(stories)
+
+    def missing_workers(self) -> list:
+        workers = self.index["workers"]
+        return [w for w in self.index["scheduler"]["workers"] if workers.get(w) is None]
+
+
+def load_tables(root_dir: str | Path) -> dict[str, dict[str, Any]]:
+    """Loads the tables written by :meth:`DumpArtefact.to_tables`
+
+    Returns
+    -------
+    tables : dict
+        ``{table name: {column name: numpy array}}``
+    """
+    tables = {}
+    for path in sorted(Path(root_dir).iterdir()):
+        if path.suffix == ".npz":
+            import numpy as np
+
+            with np.load(path, allow_pickle=False) as f:
+                tables[path.stem] = dict(f)
+        elif path.suffix in (".parquet", ".arrow"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if path.suffix == ".parquet":
+                table = pq.read_table(path)
+            else:
+                with pa.memory_map(str(path)) as source:
+                    table = pa.ipc.open_file(source).read_all()
+            tables[path.stem] = {
+                name: column.to_numpy()
+                for name, column in zip(table.column_names, table.columns)
+            }
+    return tables
+
+
+def _group_codes(*columns: Any) -> tuple[Any, list]:
+    """Label every row with a code unique to its combination of values in
+    ``columns``, and return the codes along with the values of every group.
+    Groups are in no particular order.
+    """
+    import numpy as np
+
+    codes = np.zeros(len(columns[0]), dtype=np.int64)
+    uniques = []
+    for column in columns:
+        if column.dtype == object:
+            # Strings loaded by pyarrow. Sorting Python strings is much slower than
+            # letting pyarrow hash them.
+            import pyarrow as pa
+
+            encoded = pa.array(column, type=pa.string()).dictionary_encode()
+            inverse = encoded.indices.to_numpy().astype(np.int64)
+            unique = encoded.dictionary.to_numpy(zero_copy_only=False)
+        else:
+            unique, inverse = np.unique(column, return_inverse=True)
+        codes = codes * len(unique) + inverse
+        uniques.append(unique)
+    groups, codes = np.unique(codes, return_inverse=True)
+    values = []
+    for unique in reversed(uniques):
+        values.append(unique[groups % len(unique)])
+        groups = groups // len(unique)
+    return codes, values[::-1]
+
+
+def time_in_state(
+    tables: dict[str, dict[str, Any]], table: str = "transitions"
+) -> dict[str, Any]:
+    """Total and mean time that tasks spent in each state, per task prefix
+
+    The time in a state is measured from the transition into it to the next
+    transition of the same task, in the scheduler's ``transitions`` or in the
+    ``worker_log`` of :func:`load_tables`. The last state of every task isn't counted.
+
+    Returns
+    -------
+    result : dict
+        Columns ``task_prefix``, ``state``, ``count``, ``total`` and ``mean``
+    """
+    import numpy as np
+
+    t = tables[table]
+    mask = t["finish"] != ""
+    group_by = ("worker", "key") if "worker" in t else ("key",)
+    task, _ = _group_codes(*(t[name][mask] for name in group_by))
+    timestamp = t["timestamp"][mask]
+    order = np.lexsort((timestamp, task))
+    task = task[order]
+    timestamp = timestamp[order]
+    same = task[1:] == task[:-1]
+
+    duration = (timestamp[1:] - timestamp[:-1])[same]
+    state = t["finish"][mask][order][:-1][same]
+    prefix = t["task_prefix"][mask][order][:-1][same]
+    if not len(duration):
+        return {
+            "task_prefix": prefix,
+            "state": state,
+            "count": np.zeros(0, dtype=np.int64),
+            "total": duration,
+            "mean": duration,
+        }
+    codes, (prefixes, states) = _group_codes(prefix, state)
+    count = np.bincount(codes)
+    total = np.bincount(codes, weights=duration)
+    order = sorted(range(len(count)), key=lambda i: (prefixes[i], states[i]))
+    return {
+        "task_prefix": prefixes[order],
+        "state": states[order],
+        "count": count[order],
+        "total": total[order],
+        "mean": total[order] / count[order],
+    }
+
+
+def stuck_tasks(
+    tables: dict[str, dict[str, Any]], min_age: float = 60
+) -> dict[str, Any]:
+    """Worker tasks that are neither done nor released and whose last story event
+    on their worker is at least ``min_age`` seconds older than the dump
+
+    The time of the dump is taken to be that of the latest event in either the
+    ``transitions`` or the ``worker_log`` of :func:`load_tables`.
+
+    Returns
+    -------
+    result : dict
+        Columns ``worker``, ``key``, ``task_prefix``, ``state`` and ``age``, in
+        order of decreasing age. Tasks without any story event have an age of inf.
+    """
+    import numpy as np
+
+    tasks = tables["worker_tasks"]
+    log = tables["worker_log"]
+    now = max(
+        (t["timestamp"].max() for t in (log, tables["transitions"]) if len(t["key"])),
+        default=math.nan,
+    )
+    active = ~np.isin(tasks["state"], _FINAL_WORKER_STATES)
+    worker = tasks["worker"][active]
+    key = tasks["key"][active]
+
+    # Label (worker, key) pairs consistently across both tables
+    codes, _ = _group_codes(
+        np.concatenate([worker, log["worker"]]), np.concatenate([key, log["key"]])
+    )
+    task_codes = codes[: len(key)]
+    log_codes = codes[len(key) :]
+    last = np.full(codes.max() + 1 if len(codes) else 0, -math.inf)
+    np.maximum.at(last, log_codes, log["timestamp"])
+    age = now - last[task_codes]
+
+    stuck = np.flatnonzero(age >= min_age)
+    stuck = stuck[np.argsort(-age[stuck], kind="stable")]
+    return {
+        "worker": worker[stuck],
+        "key": key[stuck],
+        "task_prefix": tasks["task_prefix"][active][stuck],
+        "state": tasks["state"][active][stuck],
+        "age": age[stuck],
+    }
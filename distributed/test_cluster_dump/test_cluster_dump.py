@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import asyncio
+import math
+import os
 from pathlib import Path
 
 import fsspec
@@ -8,8 +10,19 @@ import msgpack
 import pytest
 import yaml
 
+from dask.utils import key_split
+
 import distributed
-from distributed.cluster_dump import DumpArtefact, _tuple_to_list, write_state
+from distributed.cluster_dump import (
+    DumpArtefact,
+    IndexedDumpArtefact,
+    _tuple_to_list,
+    index_cluster_dump,
+    load_tables,
+    stuck_tasks,
+    time_in_state,
+    write_state,
+)
 from distributed.utils_test import assert_story, gen_cluster, gen_test, inc
 
 
@@ -136,6 +149,132 @@ async def test_cluster_dump_story(c, s, a, b, tmp_path):
         assert_story(task_story, a.state.story(k) + b.state.story(k))
 
 
+@gen_cluster(client=True)
+async def test_cluster_dump_indexed(c, s, a, b, tmp_path, monkeypatch):
+    futs = c.map(inc, range(5))
+    await c.gather(futs)
+    event = distributed.Event()
+    blocked_fut = c.submit(blocked_inc, 1, event, key="blocked")
+    await asyncio.sleep(0.05)
+    filename = tmp_path / "dump"
+    await c.dump_cluster_state(filename, format="msgpack")
+    await event.set()
+    await blocked_fut
+
+    url = f"{filename}.msgpack.gz"
+    dump = DumpArtefact.from_url(url)
+    indexed = IndexedDumpArtefact.from_url(url)
+    assert Path(f"{url}.index").exists()
+
+    for state in (None, "memory", "processing", "released"):
+        assert indexed.scheduler_tasks_in_state(state) == (
+            dump.scheduler_tasks_in_state(state)
+        )
+    for state in (None, "memory", "executing"):
+        assert indexed.worker_tasks_in_state(state) == dump.worker_tasks_in_state(state)
+    keys = [f.key for f in futs] + ["blocked"]
+    assert indexed.scheduler_story(*keys) == dump.scheduler_story(*keys)
+    assert indexed.worker_story(*keys) == dump.worker_story(*keys)
+    assert indexed.missing_workers() == dump.missing_workers() == []
+
+    # Spans across many blocks
+    monkeypatch.setattr(distributed.cluster_dump, "_INDEX_DATA_BLOCK", 100)
+    small = IndexedDumpArtefact.from_url(url, index_url=str(tmp_path / "small"))
+    assert len(small.index["blocks"]) > 10
+    assert small.scheduler_tasks_in_state() == dump.scheduler_tasks_in_state()
+    assert small.worker_story(*keys) == dump.worker_story(*keys)
+    assert small["workers"] == dump["workers"]
+
+    # Mapping API works
+    assert set(indexed) == set(dump)
+    assert len(indexed) == len(dump)
+    assert indexed["workers"] == dump["workers"]
+
+
+@gen_test()
+async def test_indexed_dump_artefact_reuses_index(tmp_path, monkeypatch):
+    async def get_state():
+        return {
+            "scheduler": {
+                "tasks": {
+                    "x": {"key": "x", "state": "memory"},
+                    "y": {"key": "y", "state": "processing"},
+                },
+                "workers": {"a": {}, "b": {}, "c": {}},
+                "transition_log": [],
+            },
+            "workers": {
+                "a": {"tasks": {"x": {"key": "x", "state": "memory"}}, "log": []},
+                "b": "OSError('timed out')",
+            },
+        }
+
+    path = str(tmp_path / "dump")
+    await write_state(get_state, path, "msgpack")
+    url = f"{path}.msgpack.gz"
+    index = index_cluster_dump(url)
+    assert index["scheduler"]["states"] == {"memory": ["x"], "processing": ["y"]}
+    assert index["workers"]["b"] is None
+
+    dump = IndexedDumpArtefact.from_url(url)
+    assert dump.missing_workers() == ["b", "c"]
+    assert dump.worker_tasks_in_state() == [{"key": "x", "state": "memory"}]
+
+    # The index is read back from disk rather than rebuilt
+    def fail(*args, **kwargs):
+        raise AssertionError("dump was indexed again")
+
+    monkeypatch.setattr(distributed.cluster_dump, "index_cluster_dump", fail)
+    dump = IndexedDumpArtefact.from_url(url)
+    # Queries read the blocks written next to the index instead of the dump
+    os.rename(url, tmp_path / "moved")
+    assert dump.scheduler_tasks_in_state("processing") == [
+        {"key": "y", "state": "processing"}
+    ]
+    assert dump.worker_tasks_in_state() == [{"key": "x", "state": "memory"}]
+    os.rename(tmp_path / "moved", url)
+
+    with pytest.raises(ValueError, match="msgpack"):
+        IndexedDumpArtefact.from_url(str(tmp_path / "dump.yaml"))
+
+
+@gen_test()
+async def test_indexed_dump_artefact_rebuilds_stale_index(tmp_path):
+    def get_state(state):
+        async def get_state():
+            return {
+                "scheduler": {
+                    "tasks": {"x": {"key": "x", "state": state}},
+                    "workers": {},
+                    "transition_log": [],
+                },
+                "workers": {},
+            }
+
+        return get_state
+
+    path = str(tmp_path / "dump")
+    url = f"{path}.msgpack.gz"
+    await write_state(get_state("memory"), path, "msgpack")
+    stat = os.stat(url)
+    dump = IndexedDumpArtefact.from_url(url)
+    assert dump.scheduler_tasks_in_state("memory") == [{"key": "x", "state": "memory"}]
+
+    # A regenerated dump of the same size and modification time
+    await write_state(get_state("queued"), path, "msgpack")
+    assert os.stat(url).st_size == stat.st_size
+    os.utime(url, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    dump = IndexedDumpArtefact.from_url(url)
+    assert dump.scheduler_tasks_in_state("memory") == []
+    assert dump.scheduler_tasks_in_state("queued") == [{"key": "x", "state": "queued"}]
+
+    # Only touched
+    os.utime(url, (stat.st_atime + 10, stat.st_mtime + 10))
+    index = IndexedDumpArtefact.from_url(url).index
+    assert index["mtime"] != dump.index["mtime"]
+    assert index == index_cluster_dump(url, data_url=str(tmp_path / "data"))
+
+
 @gen_cluster(client=True)
 async def test_cluster_dump_to_yamls(c, s, a, b, tmp_path):
     futs = c.map(inc, range(2))
@@ -184,3 +323,149 @@ async def test_cluster_dump_to_yamls(c, s, a, b, tmp_path):
     # has not been destructive of the original dictionary
     assert "id" in dump["scheduler"]
     assert "address" in dump["scheduler"]
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow", "npz"])
+def test_to_tables(tmp_path, format):
+    pytest.importorskip("numpy")
+    if format != "npz":
+        pytest.importorskip("pyarrow")
+
+    dump = DumpArtefact(
+        {
+            "scheduler": {
+                "tasks": {
+                    "x-1": {"key": "x-1", "state": "memory", "nbytes": 8},
+                    "x-2": {"key": "x-2", "state": "processing", "nbytes": None},
+                    "y-1": {"key": "y-1", "state": "waiting", "who_has": ["a"]},
+                },
+                "workers": {"a": {}, "b": {}},
+                "transition_log": [
+                    ("x-1", "released", "waiting", {}, "s1", 0.0),
+                    ("x-2", "released", "waiting", {}, "s1", 0.0),
+                    ("x-1", "waiting", "processing", {}, "s1", 1.0),
+                    ("x-2", "waiting", "processing", {}, "s1", 2.0),
+                    ("x-1", "processing", "memory", {}, "s2", 4.0),
+                ],
+            },
+            "workers": {
+                "a": {
+                    "nthreads": 2,
+                    "tasks": {
+                        "x-1": {"key": "x-1", "state": "memory"},
+                        "x-2": {"key": "x-2", "state": "executing"},
+                    },
+                    "log": [
+                        ("x-1", "compute-task", "released", "s1", 1.0),
+                        ("x-1", "ready", "executing", "executing", {}, "s1", 1.5),
+                        ("x-1", "executing", "memory", "memory", {}, "s2", 3.5),
+                        ("x-2", "ready", "executing", "executing", {}, "s1", 2.5),
+                        ("free-keys", ("x-0",), "s3", 100.0),
+                    ],
+                },
+                "b": "OSError('timed out')",
+            },
+        }
+    )
+    dump.to_tables(tmp_path / "tables", format=format)
+    tables = load_tables(tmp_path / "tables")
+    assert set(tables) == {
+        "scheduler_tasks",
+        "transitions",
+        "workers",
+        "worker_tasks",
+        "worker_log",
+    }
+
+    tasks = tables["scheduler_tasks"]
+    assert list(tasks["task_prefix"]) == ["x", "x", "y"]
+    assert list(tasks["state"]) == ["memory", "processing", "waiting"]
+    assert tasks["nbytes"][0] == 8
+    assert math.isnan(tasks["nbytes"][1])
+    assert "who_has" not in tasks
+
+    workers = tables["workers"]
+    assert list(workers["address"]) == ["a", "b"]
+    assert list(workers["responsive"]) == [True, False]
+    assert workers["nthreads"][0] == 2
+    assert list(tables["worker_tasks"]["worker"]) == ["a", "a"]
+    assert list(tables["worker_log"]["finish"]) == [
+        "",
+        "executing",
+        "memory",
+        "executing",
+        "",
+    ]
+
+    result = time_in_state(tables)
+    assert list(zip(result["task_prefix"], result["state"])) == [
+        ("x", "processing"),
+        ("x", "waiting"),
+    ]
+    assert list(result["count"]) == [1, 2]
+    assert list(result["total"]) == [3.0, 3.0]
+    assert list(result["mean"]) == [3.0, 1.5]
+
+    result = time_in_state(tables, "worker_log")
+    assert list(result["state"]) == ["executing"]
+    assert list(result["total"]) == [2.0]
+
+    result = stuck_tasks(tables, min_age=60)
+    assert list(result["key"]) == ["x-2"]
+    assert list(result["worker"]) == ["a"]
+    assert list(result["state"]) == ["executing"]
+    assert list(result["age"]) == [97.5]
+    assert not len(stuck_tasks(tables, min_age=98)["key"])
+
+    with pytest.raises(ValueError, match="Unsupported format"):
+        dump.to_tables(tmp_path, format="csv")
+
+
+@gen_cluster(client=True)
+async def test_to_tables_collection_keys(c, s, a, b, tmp_path):
+    # msgpack turns tuple keys into lists
+    pytest.importorskip("numpy")
+    da = pytest.importorskip("dask.array")
+
+    x = c.persist(da.ones(10, chunks=5))
+    assert await c.compute(x.sum()) == 10
+    await c.dump_cluster_state(tmp_path / "dump", format="msgpack")
+    dump = DumpArtefact.from_url(str(tmp_path / "dump.msgpack.gz"))
+    dump.to_tables(tmp_path / "tables", format="npz")
+    tables = load_tables(tmp_path / "tables")
+
+    key = str((x.name, 0))
+    for name in ("scheduler_tasks", "transitions", "worker_tasks", "worker_log"):
+        table = tables[name]
+        assert key in table["key"]
+        assert set(table["task_prefix"][table["key"] == key]) == {key_split(x.name)}
+    assert set(time_in_state(tables)["task_prefix"]) <= set(
+        tables["scheduler_tasks"]["task_prefix"]
+    )
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow", "npz"])
+@pytest.mark.parametrize("worker", [{"tasks": {}, "log": []}, "OSError('timed out')"])
+def test_to_tables_without_worker_tasks(tmp_path, format, worker):
+    # An idle cluster, or one whose workers didn't respond
+    pytest.importorskip("numpy")
+    if format != "npz":
+        pytest.importorskip("pyarrow")
+
+    dump = DumpArtefact(
+        {
+            "scheduler": {"tasks": {}, "workers": {"a": {}}, "transition_log": []},
+            "workers": {"a": worker},
+        }
+    )
+    dump.to_tables(tmp_path, format=format)
+    tables = load_tables(tmp_path)
+    for name in ("scheduler_tasks", "worker_tasks"):
+        assert {"key", "state", "task_prefix"} <= set(tables[name])
+    assert "worker" in tables["worker_tasks"]
+    assert {"worker", "key", "finish", "timestamp"} <= set(tables["worker_log"])
+    assert list(tables["workers"]["responsive"]) == [isinstance(worker, dict)]
+
+    for table in ("transitions", "worker_log"):
+        assert not len(time_in_state(tables, table)["state"])
+    assert not len(stuck_tasks(tables)["key"])
@@ -3,32 +3,173 @@ from __future__ import annotations
 import heapq
 import itertools
 import weakref
-from collections import OrderedDict, UserDict
-from collections.abc import Callable, Hashable, Iterable, Iterator, Mapping, MutableSet
-from typing import Any, TypeVar, cast
+from collections import OrderedDict
+from collections.abc import (
+    Callable,
+    Hashable,
+    Iterable,
+    ItemsView,
+    Iterator,
+    Mapping,
+    MutableMapping,
+    MutableSet,
+    ValuesView,
+)
+from time import monotonic
+from typing import Any, ClassVar, TypeVar
 
 T = TypeVar("T", bound=Hashable)
 K = TypeVar("K", bound=Hashable)
 V = TypeVar("V")
 
 
-class LRU(UserDict[K, V]):
-    """Limited size mapping, evicting the least recently looked-up key when full"""
+class LRU(MutableMapping[K, V]):
+    """Limited size mapping, evicting the least recently looked-up key when full
 
-    def __init__(self, maxsize: float) -> None:
-        super().__init__()
-        self.data = OrderedDict()
+    By default every item weighs 1, so ``maxsize`` is a number of items.  With
+    ``sizeof``, an item weighs ``sizeof(value)`` and ``maxsize`` bounds the
+    total weight instead, e.g. ``LRU(parse_bytes("64 MiB"), sizeof=sizeof)``.
+    A value heavier than ``maxsize`` on its own is not stored at all.
+
+    With ``ttl``, items are treated as missing once they were set more than
+    ``ttl`` seconds ago.  Expired items are dropped when they are looked up
+    or evicted, or all at once by ``expire``.
+
+    ``hits``, ``misses`` and ``evictions`` count lookups and items evicted to
+    make room; replacing or deleting an item is not an eviction.  Membership
+    tests neither count nor refresh an item.
+    """
+
+    __slots__ = (
+        "maxsize",
+        "sizeof",
+        "ttl",
+        "timer",
+        "weight",
+        "hits",
+        "misses",
+        "evictions",
+        "_data",
+        "_weights",
+        "_expires",
+    )
+    maxsize: float
+    sizeof: Callable[[V], float] | None
+    ttl: float | None
+    timer: Callable[[], float]
+    weight: float
+    hits: int
+    misses: int
+    evictions: int
+    _data: OrderedDict[K, V]
+    _weights: dict[K, float]
+    _expires: dict[K, float]
+
+    def __init__(
+        self,
+        maxsize: float,
+        *,
+        sizeof: Callable[[V], float] | None = None,
+        ttl: float | None = None,
+        timer: Callable[[], float] = monotonic,
+    ) -> None:
         self.maxsize = maxsize
+        self.sizeof = sizeof
+        self.ttl = ttl
+        self.timer = timer
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._weights = {}
+        self._expires = {}
+
+    def __repr__(self) -> str:
+        return (
+            f"<{type(self).__name__}: {len(self)} items, weight {self.weight} "
+            f"of {self.maxsize}>"
+        )
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(self._data)
+
+    def items(self) -> ItemsView[K, V]:
+        # Don't go through __getitem__, which would reorder while iterating
+        return self._data.items()
+
+    def values(self) -> ValuesView[V]:
+        return self._data.values()
+
+    def __contains__(self, key: object) -> bool:
+        if key not in self._data:
+            return False
+        if self.ttl is not None and self._expires[key] <= self.timer():  # type: ignore[index]
+            self._remove(key)  # type: ignore[arg-type]
+            return False
+        return True
 
     def __getitem__(self, key: K) -> V:
-        value = super().__getitem__(key)
-        cast(OrderedDict, self.data).move_to_end(key)
+        data = self._data
+        try:
+            value = data[key]
+        except KeyError:
+            self.misses += 1
+            raise
+        if self.ttl is not None and self._expires[key] <= self.timer():
+            self._remove(key)
+            self.misses += 1
+            raise KeyError(key)
+        data.move_to_end(key)
+        self.hits += 1
         return value
 
     def __setitem__(self, key: K, value: V) -> None:
-        if len(self) >= self.maxsize:
-            cast(OrderedDict, self.data).popitem(last=False)
-        super().__setitem__(key, value)
+        data = self._data
+        if key in data:
+            self._remove(key)
+        weight = 1 if self.sizeof is None else self.sizeof(value)
+        if weight > self.maxsize:
+            return
+        while data and self.weight + weight > self.maxsize:
+            self._remove(next(iter(data)))
+            self.evictions += 1
+        data[key] = value
+        self.weight += weight
+        if self.sizeof is not None:
+            self._weights[key] = weight
+        if self.ttl is not None:
+            self._expires[key] = self.timer() + self.ttl
+
+    def __delitem__(self, key: K) -> None:
+        if key not in self._data:
+            raise KeyError(key)
+        self._remove(key)
+
+    def _remove(self, key: K) -> None:
+        del self._data[key]
+        self.weight -= self._weights.pop(key, 1) if self.sizeof is not None else 1
+        if self.ttl is not None:
+            del self._expires[key]
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._weights.clear()
+        self._expires.clear()
+        self.weight = 0
+
+    def expire(self) -> int:
+        """Drop all expired items and return how many there were"""
+        if self.ttl is None:
+            return 0
+        now = self.timer()
+        expired = [k for k, t in self._expires.items() if t <= now]
+        for k in expired:
+            self._remove(k)
+        return len(expired)
 
 
 class HeapSet(MutableSet[T]):
@@ -48,10 +189,15 @@ class HeapSet(MutableSet[T]):
     ----
     The key returned for each element should not to change over time. If it does, the
     position in the heap won't change, even if the element is re-added, and it *may* not
-    change even if it's discarded and then re-added later.
+    change even if it's discarded and then re-added later. Use :class:`IndexedHeapSet`
+    for elements whose key changes.
+
+    Discarded elements are removed from the heap lazily. Once the dead entries outnumber
+    the live ones by ``compact_ratio``, the heap is rebuilt without them.
     """
 
     __slots__ = ("key", "_data", "_heap", "_inc", "_sorted")
+    compact_ratio: ClassVar[float] = 1.0
     key: Callable[[T], Any]
     _data: set[T]
     _heap: list[tuple[Any, int, weakref.ref[T]]]
@@ -105,6 +251,25 @@ class HeapSet(MutableSet[T]):
         self._data.discard(value)
         if not self._data:
             self.clear()
+        elif len(self._heap) - len(self._data) > max(
+            len(self._data) * self.compact_ratio, 64
+        ):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Drop the entries of discarded elements from the heap, as well as all but the
+        smallest entry of elements that were discarded and then re-added.
+        """
+        live: dict[T, tuple[Any, int, weakref.ref[T]]] = {}
+        for entry in self._heap:
+            value = entry[2]()
+            if value in self._data:
+                other = live.get(value)  # type: ignore[arg-type]
+                if other is None or entry < other:
+                    live[value] = entry  # type: ignore[index]
+        self._heap = list(live.values())
+        heapq.heapify(self._heap)
+        self._sorted = False
 
     def peek(self) -> T:
         """Return the smallest element without removing it"""
@@ -200,6 +365,182 @@ class HeapSet(MutableSet[T]):
         self._sorted = True
 
 
+class IndexedHeapSet(MutableSet[T]):
+    """A set-like where the `pop` method returns the smallest item, as sorted by an
+    arbitrary key function. Ties are broken by oldest first.
+
+    Unlike :class:`HeapSet`, this keeps track of the position of every element in the
+    heap, so that ``discard`` removes it straight away in O(logn) and
+    ``update_priority`` can move it after its key changed. It holds strong references
+    to its elements, which don't need to support :mod:`weakref`.
+
+    Parameters
+    ----------
+    key: Callable
+        A function that takes a single element of the collection as a parameter and
+        returns a sorting key. The key does not need to be hashable.
+    """
+
+    __slots__ = ("key", "_heap", "_index", "_inc")
+    key: Callable[[T], Any]
+    _heap: list[tuple[Any, int, T]]
+    _index: dict[T, int]
+    _inc: int
+
+    def __init__(self, *, key: Callable[[T], Any]):
+        self.key = key
+        self._heap = []
+        self._index = {}
+        self._inc = 0
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__}: {len(self)} items>"
+
+    def __contains__(self, value: object) -> bool:
+        return value in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __iter__(self) -> Iterator[T]:
+        """Iterate over all elements. This is a O(n) operation which returns the
+        elements in insertion order.
+        """
+        return iter(self._index)
+
+    def add(self, value: T) -> None:
+        if value in self._index:
+            return
+        entry = (self.key(value), self._inc, value)
+        self._heap.append(entry)
+        try:
+            self._sift_up(len(self._heap) - 1)
+        except TypeError:
+            # key() returned something that doesn't sort against the other keys
+            self.discard(value)
+            raise
+        self._inc += 1
+
+    def discard(self, value: T) -> None:
+        pos = self._index.pop(value, None)
+        if pos is None:
+            return
+        heap = self._heap
+        last = heap.pop()
+        if pos < len(heap):
+            heap[pos] = last
+            self._index[last[2]] = pos
+            self._sift(pos)
+
+    def update_priority(self, value: T) -> None:
+        """Move an element to its new place after its key has changed.
+        It keeps its insertion order for the purpose of breaking ties.
+        """
+        pos = self._index[value]
+        _, inc, _ = self._heap[pos]
+        self._heap[pos] = (self.key(value), inc, value)
+        self._sift(pos)
+
+    def peek(self) -> T:
+        """Return the smallest element without removing it"""
+        if not self._heap:
+            raise KeyError("peek into empty set")
+        return self._heap[0][2]
+
+    def peekn(self, n: int) -> Iterator[T]:
+        """Iterate over the n smallest elements without removing them.
+        This is O(1) for n == 1; O(n*logn) otherwise.
+        """
+        if n <= 0 or not self._heap:
+            return  # empty iterator
+        if n == 1:
+            yield self._heap[0][2]
+        else:
+            for _, _, value in heapq.nsmallest(n, self._heap):
+                yield value
+
+    def pop(self) -> T:
+        if not self._heap:
+            raise KeyError("pop from an empty set")
+        value = self._heap[0][2]
+        self.discard(value)
+        return value
+
+    def peekright(self) -> T:
+        """Return one of the largest elements (not necessarily the largest!) without
+        removing it. It's guaranteed that ``self.peekright() >= self.peek()``.
+        """
+        if not self._heap:
+            raise KeyError("peek into empty set")
+        return self._heap[-1][2]
+
+    def popright(self) -> T:
+        """Remove and return one of the largest elements (not necessarily the largest!)
+        It's guaranteed that ``self.popright() >= self.peek()``.
+        """
+        if not self._heap:
+            raise KeyError("pop from an empty set")
+        _, _, value = self._heap.pop()
+        del self._index[value]
+        return value
+
+    def sorted(self) -> Iterator[T]:
+        """Iterate over all elements. This is a O(n*logn) operation which returns the
+        elements in order, from smallest to largest according to the key and insertion
+        order.
+        """
+        for _, _, value in sorted(self._heap):
+            yield value
+
+    def clear(self) -> None:
+        self._heap.clear()
+        self._index.clear()
+
+    def _sift(self, pos: int) -> None:
+        if pos and self._heap[pos] < self._heap[(pos - 1) >> 1]:
+            self._sift_up(pos)
+        else:
+            self._sift_down(pos)
+
+    def _sift_up(self, pos: int) -> None:
+        heap = self._heap
+        index = self._index
+        entry = heap[pos]
+        # Leave the heap and the index consistent if two keys can't be compared
+        try:
+            while pos:
+                parent_pos = (pos - 1) >> 1
+                parent = heap[parent_pos]
+                if not entry < parent:
+                    break
+                heap[pos] = parent
+                index[parent[2]] = pos
+                pos = parent_pos
+        finally:
+            heap[pos] = entry
+            index[entry[2]] = pos
+
+    def _sift_down(self, pos: int) -> None:
+        heap = self._heap
+        index = self._index
+        n = len(heap)
+        entry = heap[pos]
+        try:
+            while (child_pos := 2 * pos + 1) < n:
+                right_pos = child_pos + 1
+                if right_pos < n and heap[right_pos] < heap[child_pos]:
+                    child_pos = right_pos
+                child = heap[child_pos]
+                if not child < entry:
+                    break
+                heap[pos] = child
+                index[child[2]] = pos
+                pos = child_pos
+        finally:
+            heap[pos] = entry
+            index[entry[2]] = pos
+
+
 def sum_mappings(ds: Iterable[Mapping[K, V] | Iterable[tuple[K, V]]], /) -> dict[K, V]:
     """Sum the values of the given mappings, key by key"""
     out: dict[K, V] = {}
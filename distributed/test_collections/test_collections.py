@@ -8,7 +8,7 @@ from collections.abc import Mapping
 
 import pytest
 
-from distributed.collections import LRU, HeapSet, sum_mappings
+from distributed.collections import LRU, HeapSet, IndexedHeapSet, sum_mappings
 
 
 def test_lru():
@@ -27,6 +27,86 @@ def test_lru():
     assert len(l) == 3
     assert list(l.keys()) == ["c", "a", "d"]
 
+    # Replacing an item doesn't evict another one
+    l["c"] = 5
+    assert list(l.items()) == [("a", 1), ("d", 4), ("c", 5)]
+
+    # Membership tests don't refresh
+    assert "a" in l
+    assert "b" not in l
+    l["e"] = 6
+    assert list(l) == ["d", "c", "e"]
+
+    assert (l.hits, l.misses, l.evictions) == (1, 0, 2)
+    with pytest.raises(KeyError):
+        l["a"]
+    assert l.get("a") is None
+    assert l.misses == 2
+
+    del l["d"]
+    assert list(l) == ["c", "e"]
+    assert l.weight == 2
+    with pytest.raises(KeyError):
+        del l["d"]
+    l.clear()
+    assert not l
+    assert l.weight == 0
+
+
+def test_lru_sizeof():
+    l = LRU(maxsize=10, sizeof=len)
+    l["a"] = "xxxx"
+    l["b"] = "xxxx"
+    assert l.weight == 8
+    l["c"] = "xxx"
+    assert list(l) == ["b", "c"]
+    assert l.weight == 7
+    assert l.evictions == 1
+
+    # Too large on its own; nothing is evicted to make room
+    l["d"] = "x" * 11
+    assert "d" not in l
+    assert list(l) == ["b", "c"]
+
+    l["b"] = "x"
+    assert l.weight == 4
+    l["e"] = "x" * 6
+    assert list(l) == ["c", "b", "e"]
+    assert l.weight == 10
+
+
+def test_lru_ttl():
+    now = [0.0]
+    l = LRU(maxsize=3, ttl=10, timer=lambda: now[0])
+    l["a"] = 1
+    now[0] = 5
+    l["b"] = 2
+    assert l["a"] == 1
+    now[0] = 10
+    assert "a" not in l
+    assert len(l) == 1
+    now[0] = 15
+    with pytest.raises(KeyError):
+        l["b"]
+    assert l.misses == 1
+    assert not l
+
+    l["c"] = 3
+    l["d"] = 4
+    now[0] = 30
+    assert l.expire() == 2
+    assert not l
+    assert LRU(maxsize=1).expire() == 0
+
+
+def test_lru_pickle():
+    l = LRU(maxsize=2, sizeof=len)
+    l["a"] = "x"
+    l["a"]
+    l2 = pickle.loads(pickle.dumps(l))
+    assert list(l2.items()) == [("a", "x")]
+    assert (l2.weight, l2.hits, l2.maxsize) == (1, 1, 2)
+
 
 class C:
     def __init__(self, k, i):
@@ -348,6 +428,126 @@ def test_heapset_sort_duplicate():
     assert list(heap.sorted()) == [c1, c2]
 
 
+def test_heapset_compact():
+    heap = HeapSet(key=operator.attrgetter("i"))
+    cs = [C(str(i), i) for i in range(1000)]
+    for c in cs:
+        heap.add(c)
+    for _ in range(10):
+        for c in cs[::2]:
+            heap.discard(c)
+        for c in cs[::2]:
+            heap.add(c)
+        # Dead entries, and duplicates of re-added elements, don't pile up
+        assert len(heap._heap) <= 2 * len(cs) + 64
+
+    for c in cs[100:]:
+        heap.discard(c)
+    assert len(heap._heap) <= 2 * 100 + 64
+    assert list(heap.sorted()) == cs[:100]
+    assert [heap.pop() for _ in range(100)] == cs[:100]
+    assert not heap
+
+
+def assert_indexed_heap(heap: IndexedHeapSet) -> None:
+    h2 = heap._heap[:]
+    heapq.heapify(h2)
+    assert h2 == heap._heap
+    assert heap._index == {v: i for i, (_, _, v) in enumerate(heap._heap)}
+
+
+def test_indexed_heapset():
+    heap = IndexedHeapSet(key=operator.attrgetter("i"))
+    cx = C("x", 2)
+    cy = C("y", 1)
+    cz = C("z", 3)
+    cw = C("w", 3)
+    for c in (cx, cy, cz, cw):
+        heap.add(c)
+    heap.add(C("x", 0))  # Ignored; x already in heap
+    assert len(heap) == 4
+    assert repr(heap) == "<IndexedHeapSet: 4 items>"
+    assert list(heap) == [cx, cy, cz, cw]
+    assert list(heap.sorted()) == [cy, cx, cz, cw]
+    assert list(heap.peekn(2)) == [cy, cx]
+    assert list(heap.peekn(1)) == [cy]
+    assert list(heap.peekn(0)) == []
+    assert heap.peek() is cy
+    assert heap.peekright().i >= cy.i
+
+    # Discarding removes the element from the heap
+    heap.discard(cy)
+    heap.discard(cy)
+    assert cy not in heap
+    assert len(heap._heap) == 3
+    assert_indexed_heap(heap)
+
+    # Ties are still broken by insertion order after a change of priority
+    cw.i = 0
+    heap.update_priority(cw)
+    assert heap.peek() is cw
+    cw.i = 3
+    heap.update_priority(cw)
+    assert list(heap.sorted()) == [cx, cz, cw]
+    cx.i = 4
+    heap.update_priority(cx)
+    assert_indexed_heap(heap)
+    assert [heap.pop() for _ in range(3)] == [cz, cw, cx]
+    with pytest.raises(KeyError):
+        heap.update_priority(cx)
+    with pytest.raises(KeyError):
+        heap.pop()
+    with pytest.raises(KeyError):
+        heap.peek()
+    with pytest.raises(KeyError):
+        heap.popright()
+    with pytest.raises(KeyError):
+        heap.peekright()
+
+    # Elements don't need to support weakref
+    class D:
+        __slots__ = ("i",)
+
+        def __init__(self, i):
+            self.i = i
+
+    d = D(1)
+    heap.add(d)
+    assert heap.peekright() is d
+    assert heap.popright() is d
+    assert not heap
+
+    # Test resilience to key() returning non-sortable output
+    for c in (cx, cy, cz):
+        heap.add(c)
+    with pytest.raises(TypeError):
+        heap.add(C("unsortable_key", None))
+    assert set(heap) == {cx, cy, cz}
+    assert_indexed_heap(heap)
+    heap.clear()
+    assert not heap
+    assert not heap._heap
+
+
+def test_indexed_heapset_random():
+    heap = IndexedHeapSet(key=operator.attrgetter("i"))
+    cs = [C(str(i), random.randrange(50)) for i in range(300)]
+    for c in cs:
+        heap.add(c)
+    for c in random.sample(cs, 100):
+        heap.discard(c)
+    for c in random.sample(list(heap), 100):
+        c.i = random.randrange(50)
+        heap.update_priority(c)
+    assert_indexed_heap(heap)
+    heap2 = pickle.loads(pickle.dumps(heap))
+
+    expect = sorted(heap, key=lambda c: (c.i, cs.index(c)))
+    assert list(heap.sorted()) == expect
+    assert [heap.pop() for _ in range(len(expect))] == expect
+    assert [heap2.pop() for _ in range(len(expect))] == expect
+
+
 class ReadOnlyMapping(Mapping):
     def __init__(self, d: Mapping):
         self.d = d
@@ -1,13 +1,176 @@
 from __future__ import annotations
 
+import math
 from collections import defaultdict
 from collections.abc import Hashable, Iterable, Sequence
+from typing import Any
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class QuantileSketch:
+    """A small merging digest, used by :class:`Digest` when crick is not installed
+
+    Values are buffered on ``add`` and periodically merged into at most about
+    ``compression`` weighted centroids.  Centroids are narrower towards the tails,
+    so extreme quantiles stay accurate.  It implements the subset of
+    ``crick.TDigest`` that distributed uses; it needs numpy.
+    """
+
+    compression: float
+    _means: Any  # np.ndarray
+    _weights: Any  # np.ndarray
+    _buffer: list[float]
+    _buffer_weights: list[float]
+    _min: float
+    _max: float
+    __slots__ = (
+        "compression",
+        "_means",
+        "_weights",
+        "_buffer",
+        "_buffer_weights",
+        "_min",
+        "_max",
+    )
+
+    def __init__(self, compression: float = 100):
+        self.compression = compression
+        self._means = np.empty(0)
+        self._weights = np.empty(0)
+        self._buffer = []
+        self._buffer_weights = []
+        self._min = math.inf
+        self._max = -math.inf
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__}: size={self.size()}>"
+
+    def add(self, x: float, w: float = 1) -> None:
+        self._buffer.append(x)
+        self._buffer_weights.append(w)
+        if len(self._buffer) >= 5 * self.compression:
+            self._compress()
+
+    def update(self, x: Iterable[float], w: float = 1) -> None:
+        x = list(x)
+        self._buffer.extend(x)
+        self._buffer_weights.extend([w] * len(x))
+        if len(self._buffer) >= 5 * self.compression:
+            self._compress()
+
+    def merge(self, *others: QuantileSketch) -> None:
+        for other in others:
+            other._compress()
+            self._compress(other._means, other._weights)
+            self._min = min(self._min, other._min)
+            self._max = max(self._max, other._max)
+
+    def scale(self, factor: float) -> QuantileSketch:
+        """Return a copy with all weights multiplied by ``factor``"""
+        self._compress()
+        out = QuantileSketch(self.compression)
+        out._means = self._means.copy()
+        out._weights = self._weights * factor
+        out._min = self._min
+        out._max = self._max
+        return out
+
+    def size(self) -> float:
+        return float(self._weights.sum()) + math.fsum(self._buffer_weights)
+
+    def min(self) -> float:
+        self._compress()
+        return self._min if self._weights.size else math.nan
+
+    def max(self) -> float:
+        self._compress()
+        return self._max if self._weights.size else math.nan
+
+    def quantile(self, q: Any) -> Any:
+        xp, fp = self._curve()
+        if not xp.size:
+            return np.full_like(q, math.nan, dtype=float) if np.ndim(q) else math.nan
+        return np.interp(np.asarray(q) * xp[-1], xp, fp)
+
+    def cdf(self, x: Any) -> Any:
+        xp, fp = self._curve()
+        if not xp.size:
+            return np.full_like(x, math.nan, dtype=float) if np.ndim(x) else math.nan
+        return np.interp(x, fp, xp, left=0, right=xp[-1]) / xp[-1]
+
+    def histogram(
+        self, bins: int = 10, range: tuple[float, float] | None = None
+    ) -> tuple[Any, Any]:
+        """Approximate counts and bin edges, like :func:`numpy.histogram`"""
+        if range is None:
+            range = self.min(), self.max()
+        edges = np.linspace(range[0], range[1], bins + 1)
+        if not self._weights.size:
+            return np.zeros(bins), edges
+        return np.diff(self.cdf(edges)) * self.size(), edges
+
+    def _curve(self) -> tuple[Any, Any]:
+        """Cumulative weight at the centre of every centroid, and the centroids' means,
+        bracketed by the min and the max
+        """
+        self._compress()
+        w = self._weights
+        if not w.size:
+            return w, w
+        total = w.sum()
+        xp = np.concatenate([[0], np.cumsum(w) - w / 2, [total]])
+        fp = np.concatenate([[self._min], self._means, [self._max]])
+        return xp, fp
+
+    def _compress(self, means: Any = None, weights: Any = None) -> None:
+        parts_m = [self._means]
+        parts_w = [self._weights]
+        if self._buffer:
+            buf = np.asarray(self._buffer, dtype=float)
+            parts_m.append(buf)
+            parts_w.append(np.asarray(self._buffer_weights, dtype=float))
+            self._min = min(self._min, buf.min())
+            self._max = max(self._max, buf.max())
+            self._buffer = []
+            self._buffer_weights = []
+        if means is not None:
+            parts_m.append(means)
+            parts_w.append(weights)
+        if len(parts_m) == 1:
+            return
+
+        m = np.concatenate(parts_m)
+        w = np.concatenate(parts_w)
+        order = np.argsort(m, kind="stable")
+        m = m[order]
+        w = w[order]
+        total = w.sum()
+        if total <= 0:
+            self._means = m[:0]
+            self._weights = w[:0]
+            return
+        # Place every input at the quantile of its centre and bin it on the arcsine
+        # scale of the t-digest, which is finer near q=0 and q=1
+        q = (np.cumsum(w) - w / 2) / total
+        q = np.clip(2 * q - 1, -1, 1)
+        k = np.floor(self.compression * (np.arcsin(q) / np.pi + 0.5))
+        bins = np.searchsorted(np.unique(k), k)
+        weights = np.bincount(bins, w)
+        keep = weights > 0
+        self._means = (np.bincount(bins, w * m) / np.where(keep, weights, 1))[keep]
+        self._weights = weights[keep]
+
 
 try:
     from crick import TDigest
 except ImportError:
-    pass
-else:
+    TDigest = QuantileSketch if np is not None else None
+
+if TDigest is not None:
 
     class Digest:
         intervals: Sequence[float]
@@ -37,29 +200,123 @@ else:
             return sum(d.size() for d in self.components)
 
 
-class Counter:
-    intervals: Sequence[float]
-    components: list[defaultdict[Hashable, float]]
-    __slots__ = ("intervals", "components")
+if np is None:
+
+    class Counter:
+        intervals: Sequence[float]
+        components: list[defaultdict[Hashable, float]]
+        __slots__ = ("intervals", "components")
+
+        def __init__(self, intervals: Sequence[float] = (5, 60, 3600)):
+            self.intervals = intervals
+            self.components = [defaultdict(int) for _ in intervals]
+
+        def add(self, item: Hashable) -> None:
+            self.components[0][item] += 1
+
+        def shift(self) -> None:
+            for i in range(len(self.intervals) - 1):
+                frac = 0.2 * self.intervals[0] / self.intervals[i]
+                part = {k: v * frac for k, v in self.components[i].items()}
+                rest = {k: v * (1 - frac) for k, v in self.components[i].items()}
+
+                for k, v in part.items():
+                    self.components[i + 1][k] += v
+                d: defaultdict[Hashable, float] = defaultdict(int)
+                d.update(rest)
+                self.components[i] = d
 
-    def __init__(self, intervals: Sequence[float] = (5, 60, 3600)):
-        self.intervals = intervals
-        self.components = [defaultdict(int) for _ in intervals]
+        def size(self) -> float:
+            return sum(sum(d.values()) for d in self.components)
 
-    def add(self, item: Hashable) -> None:
-        self.components[0][item] += 1
+        def snapshot(self) -> dict[str, Any]:
+            keys = list({k: None for d in self.components for k in d})
+            return {
+                "intervals": list(self.intervals),
+                "keys": keys,
+                "counts": [[d.get(k, 0) for k in keys] for d in self.components],
+            }
 
-    def shift(self) -> None:
-        for i in range(len(self.intervals) - 1):
-            frac = 0.2 * self.intervals[0] / self.intervals[i]
-            part = {k: v * frac for k, v in self.components[i].items()}
-            rest = {k: v * (1 - frac) for k, v in self.components[i].items()}
+else:
 
-            for k, v in part.items():
-                self.components[i + 1][k] += v
-            d: defaultdict[Hashable, float] = defaultdict(int)
-            d.update(rest)
-            self.components[i] = d
+    class Counter:  # type: ignore[no-redef]
+        """Decaying counts of hashable items over several time scales
 
-    def size(self) -> float:
-        return sum(sum(d.values()) for d in self.components)
+        Every key gets a column in a 2D array with a row per interval, so that
+        ``shift`` costs a few vector operations regardless of the number of keys.
+        ``add`` only bumps a plain dict, which is folded into the array on the next
+        ``shift`` or read.
+        """
+
+        intervals: Sequence[float]
+        _index: dict[Hashable, int]
+        _keys: list[Hashable]
+        _counts: np.ndarray
+        _fresh: defaultdict[Hashable, int]
+        __slots__ = ("intervals", "_index", "_keys", "_counts", "_fresh")
+
+        def __init__(self, intervals: Sequence[float] = (5, 60, 3600)):
+            self.intervals = intervals
+            self._index = {}
+            self._keys = []
+            self._counts = np.zeros((len(intervals), 8))
+            self._fresh = defaultdict(int)
+
+        def add(self, item: Hashable) -> None:
+            self._fresh[item] += 1
+
+        def shift(self) -> None:
+            self._flush()
+            counts = self._counts
+            for i in range(len(self.intervals) - 1):
+                frac = 0.2 * self.intervals[0] / self.intervals[i]
+                counts[i + 1] += counts[i] * frac
+                counts[i] *= 1 - frac
+
+        def size(self) -> float:
+            self._flush()
+            return float(self._counts.sum())
+
+        @property
+        def components(self) -> list[dict[Hashable, float]]:
+            """The counts of every interval, as ``{item: count}``"""
+            self._flush()
+            n = len(self._keys)
+            return [dict(zip(self._keys, row)) for row in self._counts[:, :n].tolist()]
+
+        def snapshot(self) -> dict[str, Any]:
+            """A compact, msgpack-friendly copy of the counts for dashboards:
+            ``{"intervals": [...], "keys": [...], "counts": [[...], ...]}`` with a row
+            of ``counts`` per interval and a column per key.
+            """
+            self._flush()
+            n = len(self._keys)
+            return {
+                "intervals": list(self.intervals),
+                "keys": list(self._keys),
+                "counts": self._counts[:, :n].tolist(),
+            }
+
+        def _flush(self) -> None:
+            fresh = self._fresh
+            if not fresh:
+                return
+            self._fresh = defaultdict(int)
+            index = self._index
+            for k in fresh:
+                if k not in index:
+                    index[k] = len(self._keys)
+                    self._keys.append(k)
+            capacity = self._counts.shape[1]
+            if len(self._keys) > capacity:
+                counts = np.zeros(
+                    (len(self.intervals), max(len(self._keys), 2 * capacity))
+                )
+                counts[:, :capacity] = self._counts
+                self._counts = counts
+            idx = np.fromiter(
+                (index[k] for k in fresh), dtype=np.intp, count=len(fresh)
+            )
+            self._counts[0, idx] += np.fromiter(
+                fresh.values(), dtype=float, count=len(fresh)
+            )
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import pytest
 
-from distributed.counter import Counter
+from distributed.counter import Counter, QuantileSketch
 
 try:
     from distributed.counter import Digest
@@ -17,7 +17,7 @@ except ImportError:
         pytest.param(
             Digest,
             lambda x: x.size(),
-            marks=pytest.mark.skipif(not Digest, reason="no crick library"),
+            marks=pytest.mark.skipif(not Digest, reason="needs crick or numpy"),
         ),
     ],
 )
@@ -47,3 +47,79 @@ def test_counter():
     for _ in range(5):
         c.shift()
         assert abs(sum(cc[1] for cc in c.components) - 1) < 1e-13
+
+
+def test_counter_many_keys():
+    c = Counter()
+    for i in range(1, 100):
+        for _ in range(i):
+            c.add(f"op-{i}")
+    c.shift()
+    c.add("op-1")
+    c.add("new")
+    c.shift()
+
+    assert abs(c.size() - sum(range(100)) - 2) < 1e-9
+    components = c.components
+    assert set(components[0]) == {f"op-{i}" for i in range(1, 100)} | {"new"}
+    assert components[0]["op-50"] == pytest.approx(50 * 0.8 * 0.8)
+    assert components[0]["new"] == pytest.approx(0.8)
+    for i in range(1, 100):
+        total = sum(d[f"op-{i}"] for d in components)
+        assert total == pytest.approx(i + (i == 1))
+
+
+def test_counter_snapshot():
+    c = Counter(intervals=(1, 10))
+    assert c.snapshot() == {"intervals": [1, 10], "keys": [], "counts": [[], []]}
+    c.add("a")
+    c.add("b")
+    c.add("a")
+    c.shift()
+    snap = c.snapshot()
+    assert snap["intervals"] == [1, 10]
+    assert snap["keys"] == ["a", "b"]
+    assert snap["counts"] == [
+        [pytest.approx(1.6), pytest.approx(0.8)],
+        [pytest.approx(0.4), pytest.approx(0.2)],
+    ]
+
+
+def test_quantile_sketch():
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(42)
+    data = rng.normal(size=100_000)
+    d = QuantileSketch()
+    for x in data[:1000]:
+        d.add(x)
+    d.update(data[1000:])
+    assert d.size() == 100_000
+    assert d.min() == data.min()
+    assert d.max() == data.max()
+    assert d._weights.size <= d.compression
+
+    qs = [0.001, 0.01, 0.1, 0.5, 0.9, 0.99, 0.999]
+    np.testing.assert_allclose(
+        d.quantile(qs), np.quantile(data, qs), rtol=0.02, atol=0.01
+    )
+    assert abs(d.cdf(0) - 0.5) < 0.01
+
+    counts, edges = d.histogram(10)
+    assert edges[0] == data.min()
+    assert edges[-1] == data.max()
+    assert counts.sum() == pytest.approx(100_000)
+
+    part = d.scale(0.2)
+    rest = d.scale(0.8)
+    assert part.size() == pytest.approx(20_000)
+    assert rest.size() == pytest.approx(80_000)
+    rest.merge(part)
+    assert rest.size() == pytest.approx(100_000)
+    np.testing.assert_allclose(
+        rest.quantile(qs), np.quantile(data, qs), rtol=0.02, atol=0.01
+    )
+
+    empty = QuantileSketch()
+    assert empty.size() == 0
+    assert np.isnan(empty.quantile(0.5))
+    assert np.isnan(empty.min())
@@ -3,6 +3,7 @@ from __future__ import annotations
 import asyncio
 import functools
 import inspect
+import itertools
 import logging
 import math
 import os
@@ -14,7 +15,7 @@ import types
 import uuid
 import warnings
 import weakref
-from collections import defaultdict, deque
+from collections import OrderedDict, defaultdict, deque
 from collections.abc import (
     Awaitable,
     Callable,
@@ -22,6 +23,7 @@ from collections.abc import (
     Coroutine,
     Generator,
     Hashable,
+    Iterable,
 )
 from enum import Enum
 from functools import wraps
@@ -469,7 +471,7 @@ class Server:
         execute a RPC"""
         return self.rpc.active
 
-    def get_connection_counters(self) -> dict[str, int]:
+    def get_connection_counters(self) -> dict[str, float]:
         """A dict with various connection counters
 
         See also
@@ -478,8 +480,9 @@ class Server:
         Server.incoming_comms_active
         Server.outgoing_comms_open
         Server.outgoing_comms_active
+        ConnectionPool.metrics
         """
-        return {
+        counters: dict[str, float] = {
             attr: getattr(self, attr)
             for attr in [
                 "incoming_comms_open",
@@ -488,6 +491,9 @@ class Server:
                 "outgoing_comms_active",
             ]
         }
+        for k, v in self.rpc.metrics.items():
+            counters[f"outgoing_comms_{k}"] = v
+        return counters
 
     async def finished(self):
         """Wait until the server has finished"""
@@ -1310,9 +1316,13 @@ class ConnectionPool:
     It reuses existing comms so that we don't have to continuously reconnect.
 
     It also maintains a comm limit to avoid "too many open file handle"
-    issues.  Whenever this maximum is reached we clear out all idling comms.
-    If that doesn't do the trick then we wait until one of the occupied comms
-    closes.
+    issues.  Whenever this maximum is reached we close the least recently used
+    idle comm.  If there is none then we wait until one of the occupied comms
+    closes.  Optionally, the number of comms to any single address is capped as
+    well, in which case further requests wait for one of them to be returned,
+    and comms idle for longer than ``idle_timeout`` are closed.
+
+    Comms can be opened ahead of a known transfer with :meth:`prewarm`.
 
     Parameters
     ----------
@@ -1320,6 +1330,13 @@ class ConnectionPool:
         The number of open comms to maintain at once
     deserialize: bool
         Whether or not to deserialize data by default or pass it through
+    limit_per_address: int, optional
+        The number of open comms to maintain at once to any one address.
+        Defaults to ``distributed.comm.connection-pool.limit-per-address``, or no
+        limit.
+    idle_timeout: str or float, optional
+        Close comms which haven't been used for this long.  Defaults to
+        ``distributed.comm.connection-pool.idle-timeout``, or never.
     """
 
     _instances: ClassVar[weakref.WeakSet[ConnectionPool]] = weakref.WeakSet()
@@ -1334,8 +1351,20 @@ class ConnectionPool:
         connection_args: dict[str, object] | None = None,
         timeout: float | None = None,
         server: object = None,
+        limit_per_address: int | None = None,
+        idle_timeout: str | float | None = None,
     ) -> None:
         self.limit = limit  # Max number of open comms
+        if limit_per_address is None:
+            limit_per_address = dask.config.get(
+                "distributed.comm.connection-pool.limit-per-address", None
+            )
+        self.limit_per_address = limit_per_address
+        if idle_timeout is None:
+            idle_timeout = dask.config.get(
+                "distributed.comm.connection-pool.idle-timeout", None
+            )
+        self.idle_timeout = parse_timedelta(idle_timeout)
         # Invariant: len(available) == open - active
         self.available: defaultdict[str, set[Comm]] = defaultdict(set)
         # Invariant: len(occupied) == active
@@ -1359,6 +1388,23 @@ class ConnectionPool:
         self._pending_count = 0
         self._connecting_count = 0
         self._connecting_close_timeout = 5
+        # Available comms from least to most recently returned, with the address
+        # and the time they were returned at
+        self._idle: OrderedDict[Comm, tuple[str, float]] = OrderedDict()
+        # Connection attempts per address, including those waiting for the
+        # semaphore, and requests waiting for a comm to an address at its limit
+        self._address_connecting: defaultdict[str, int] = defaultdict(int)
+        self._address_waiters: defaultdict[str, deque[asyncio.Future[Comm | None]]] = (
+            defaultdict(deque)
+        )
+        self._reaper: PeriodicCallback | None = None
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.reaped = 0
+        self.connects = 0
+        self.connect_time = 0.0
+        self.connect_time_max = 0.0
         self.status = Status.init
 
     def _validate(self) -> None:
@@ -1377,6 +1423,28 @@ class ConnectionPool:
     def open(self) -> int:
         return self.active + sum(map(len, self.available.values()))
 
+    @property
+    def metrics(self) -> dict[str, float]:
+        """Counters of how comms were obtained since the pool was created:
+        reused (``hits``) or newly opened (``misses``), the ``hit_rate``, the
+        number of idle comms closed to make room (``evicted``) or because of
+        ``idle_timeout`` (``reaped``), and the number of comms opened, including by
+        :meth:`prewarm`, with the mean and max time it took
+        """
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "evicted": self.evicted,
+            "reaped": self.reaped,
+            "connects": self.connects,
+            "connect_latency_mean": (
+                self.connect_time / self.connects if self.connects else 0.0
+            ),
+            "connect_latency_max": self.connect_time_max,
+        }
+
     def __repr__(self) -> str:
         return "<ConnectionPool: open=%d, active=%d, connecting=%d>" % (
             self.open,
@@ -1414,6 +1482,11 @@ class ConnectionPool:
     async def start(self) -> None:
         # Invariant: semaphore._value == limit - open - _n_connecting
         self.semaphore = asyncio.Semaphore(self.limit)
+        if self.idle_timeout:
+            self._reaper = PeriodicCallback(
+                self._reap_idle, max(self.idle_timeout / 2, 0.01) * 1000
+            )
+            self._reaper.start()
         self.status = Status.running
 
     @property
@@ -1426,12 +1499,17 @@ class ConnectionPool:
             await self.semaphore.acquire()
             try:
                 self._connecting_count += 1
+                start = time()
                 comm = await connect(
                     addr,
                     timeout=timeout or self.timeout,
                     deserialize=self.deserialize,
                     **self.connection_args,
                 )
+                elapsed = time() - start
+                self.connects += 1
+                self.connect_time += elapsed
+                self.connect_time_max = max(self.connect_time_max, elapsed)
                 comm.name = "ConnectionPool"
                 comm._pool = weakref.ref(self)
                 comm.allow_offload = self.allow_offload
@@ -1452,21 +1530,161 @@ class ConnectionPool:
         """
         Get a Comm to the given address.  For internal use.
         """
-        if self.status != Status.running:
-            raise RuntimeError("ConnectionPool is closed")
+        while True:
+            if self.status != Status.running:
+                raise RuntimeError("ConnectionPool is closed")
+            comm = self._pop_available(addr)
+            if comm is not None:
+                self.hits += 1
+                return comm
+            if not self._at_address_limit(addr):
+                break
+            comm = await self._wait_for_address(addr)
+            if comm is not None:
+                self.hits += 1
+                return comm
+
+        if self.semaphore.locked():
+            self._evict_idle()
+
+        self.misses += 1
+        self._address_connecting[addr] += 1
+        try:
+            return await self._connect_cancellable(addr, timeout)
+        except BaseException:
+            self._wake(addr)
+            raise
+        finally:
+            self._address_connecting[addr] -= 1
+            if not self._address_connecting[addr]:
+                del self._address_connecting[addr]
+
+    def _pop_available(self, addr: str) -> Comm | None:
         available = self.available[addr]
-        occupied = self.occupied[addr]
         while available:
             comm = available.pop()
+            del self._idle[comm]
             if comm.closed():
                 self.semaphore.release()
             else:
-                occupied.add(comm)
+                self.occupied[addr].add(comm)
                 return comm
+        return None
+
+    def _at_address_limit(self, addr: str) -> bool:
+        if self.limit_per_address is None:
+            return False
+        n = (
+            len(self.available.get(addr, ()))
+            + len(self.occupied.get(addr, ()))
+            + self._address_connecting.get(addr, 0)
+        )
+        return n >= self.limit_per_address
 
-        if self.semaphore.locked():
-            self.collect()
+    async def _wait_for_address(self, addr: str) -> Comm | None:
+        """Wait until a comm to an address at its limit is returned, in which case
+        it's handed over, or closed, in which case return None
+        """
+        fut: asyncio.Future[Comm | None] = asyncio.get_running_loop().create_future()
+        waiters = self._address_waiters[addr]
+        waiters.append(fut)
+        try:
+            return await fut
+        except asyncio.CancelledError:
+            # Don't leak a comm that was handed over just before the cancellation
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                comm = fut.result()
+                if comm is not None:
+                    self.reuse(addr, comm)
+            raise
+        finally:
+            try:
+                waiters.remove(fut)
+            except ValueError:
+                pass
+            if not waiters and self._address_waiters.get(addr) is waiters:
+                del self._address_waiters[addr]
+
+    def _wake(self, addr: str, comm: Comm | None = None) -> bool:
+        """Hand over a comm, or the news that one was closed, to the first request
+        waiting for the address
+        """
+        waiters = self._address_waiters.get(addr)
+        while waiters:
+            fut = waiters.popleft()
+            if not fut.done():
+                fut.set_result(comm)
+                return True
+        return False
+
+    def _close_idle(self, comm: Comm) -> None:
+        addr, _ = self._idle.pop(comm)
+        self.available[addr].discard(comm)
+        IOLoop.current().add_callback(comm.close)
+        self.semaphore.release()
+        self._wake(addr)
+
+    def _evict_idle(self, n: int = 1) -> None:
+        """Close the ``n`` least recently used idle comms"""
+        for comm in list(itertools.islice(self._idle, n)):
+            self._close_idle(comm)
+            self.evicted += 1
+
+    def _reap_idle(self) -> None:
+        """Close the comms which have been idle for longer than ``idle_timeout``"""
+        assert self.idle_timeout
+        deadline = time() - self.idle_timeout
+        while self._idle:
+            comm, (_, since) = next(iter(self._idle.items()))
+            if since > deadline:
+                break
+            self._close_idle(comm)
+            self.reaped += 1
+
+    async def prewarm(self, addresses: Iterable[str], n: int = 1) -> int:
+        """Open comms to ``addresses`` concurrently ahead of a known transfer, so
+        that there are at least ``n`` comms to each of them, within the limits of the
+        pool.  Failures to connect are logged and otherwise ignored.
 
+        Returns
+        -------
+        The number of comms that were opened
+        """
+        if self.status != Status.running:
+            raise RuntimeError("ConnectionPool is closed")
+        addrs = []
+        for addr in dict.fromkeys(addresses):
+            have = (
+                len(self.available.get(addr, ()))
+                + len(self.occupied.get(addr, ()))
+                + self._address_connecting.get(addr, 0)
+            )
+            want = (
+                n if self.limit_per_address is None else min(n, self.limit_per_address)
+            )
+            addrs.extend([addr] * (want - have))
+        # Don't evict other idle comms, let alone wait, to prewarm
+        addrs = addrs[: self.semaphore._value]
+
+        async def _prewarm(addr: str) -> bool:
+            self._address_connecting[addr] += 1
+            try:
+                comm = await self._connect_cancellable(addr, None)
+            except OSError as e:
+                logger.debug("Could not prewarm a comm to %s: %s", addr, e)
+                self._wake(addr)
+                return False
+            finally:
+                self._address_connecting[addr] -= 1
+                if not self._address_connecting[addr]:
+                    del self._address_connecting[addr]
+            self.reuse(addr, comm)
+            return True
+
+        results = await asyncio.gather(*map(_prewarm, addrs))
+        return sum(results)
+
+    async def _connect_cancellable(self, addr: str, timeout: float | None) -> Comm:
         # on 3.11 this uses asyncio.timeout as a cancel scope to avoid having
         # to track inner and outer CancelledError exceptions and correctly
         # call .uncancel() when a CancelledError is caught.
@@ -1550,16 +1768,19 @@ class ConnectionPool:
         # this comm: just close it.
         if comm not in self.occupied[addr]:
             IOLoop.current().add_callback(comm.close)
-        else:
+        elif comm.closed():
+            # Either the user passed the close=True parameter to send_recv, or
+            # the RPC call raised OSError or CancelledError
             self.occupied[addr].remove(comm)
-            if comm.closed():
-                # Either the user passed the close=True parameter to send_recv, or
-                # the RPC call raised OSError or CancelledError
-                self.semaphore.release()
-            else:
-                self.available[addr].add(comm)
-                if self.semaphore.locked() and self._pending_count:
-                    self.collect()
+            self.semaphore.release()
+            self._wake(addr)
+        elif not self._wake(addr, comm):
+            self.occupied[addr].remove(comm)
+            self.available[addr].add(comm)
+            self._idle[comm] = (addr, time())
+            if self.semaphore.locked() and self._pending_count:
+                # Make room for the connection attempts waiting for the semaphore
+                self._evict_idle(self._pending_count - self._connecting_count)
 
     def collect(self) -> None:
         """
@@ -1576,6 +1797,7 @@ class ConnectionPool:
                 IOLoop.current().add_callback(comm.close)
                 self.semaphore.release()
             comms.clear()
+        self._idle.clear()
 
     def remove(self, addr: str, *, reason: str = "Address removed.") -> None:
         """
@@ -1585,6 +1807,7 @@ class ConnectionPool:
         if addr in self.available:
             comms = self.available.pop(addr)
             for comm in comms:
+                del self._idle[comm]
                 IOLoop.current().add_callback(comm.close)
                 self.semaphore.release()
         if addr in self.occupied:
@@ -1598,14 +1821,26 @@ class ConnectionPool:
             for cb in cbs:
                 cb(reason)
 
+        for fut in self._address_waiters.pop(addr, ()):
+            if not fut.done():
+                fut.set_exception(CommClosedError(reason))
+
     async def close(self) -> None:
         """
         Close all communications
         """
         self.status = Status.closed
+        if self._reaper is not None:
+            self._reaper.stop()
         for cbs in self._connecting.values():
             for cb in cbs:
                 cb("ConnectionPool closing.")
+        for waiters in self._address_waiters.values():
+            for fut in waiters:
+                if not fut.done():
+                    fut.set_exception(CommClosedError("ConnectionPool closing."))
+        self._address_waiters.clear()
+        self._idle.clear()
         for d in [self.available, self.occupied]:
             comms = set()
             while d:
@@ -23,17 +23,25 @@ We represent this tree as a nested dictionary with the following form:
                    'count': ...
                    'children': {...}}}
     }
+
+Profiles gathered by ``watch`` are kept in a more compact form instead, see
+``CompactProfile``: every code location is interned once into a module wide
+table and a profile only holds counts of call stacks, stored as tuples of
+integers.  The tree above is only built when it is asked for.
 """
 
 from __future__ import annotations
 
+import asyncio
 import bisect
 import dis
 import linecache
+import logging
+import math
 import sys
 import threading
 from collections import defaultdict, deque
-from collections.abc import Callable, Collection
+from collections.abc import Callable, Collection, Hashable, Iterator, Mapping
 from time import sleep
 from types import FrameType
 from typing import Any
@@ -47,6 +55,8 @@ from dask.utils import format_time, parse_timedelta
 from distributed.metrics import time
 from distributed.utils import color_of
 
+logger = logging.getLogger(__name__)
+
 #: This lock can be acquired to ensure that no instance of watch() is concurrently holding references to frames
 lock = threading.Lock()
 
@@ -127,6 +137,223 @@ def info_frame(frame: FrameType) -> dict[str, Any]:
     }
 
 
+class _FrameTable:
+    """Intern code locations into small integers
+
+    Entry ``i`` holds the ``identifier`` and the ``info_frame`` description of
+    the first frame seen at that code location.  Entries are never removed;
+    their number is bounded by the amount of code that has run.
+    """
+
+    def __init__(self) -> None:
+        self.index: dict[Hashable, int] = {}
+        self.identifiers: list[str] = []
+        self.descriptions: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.identifiers)
+
+    def intern_task(self, name: str) -> int:
+        """Intern a pseudo frame standing for an asyncio task"""
+        key = ("<task>", name)
+        try:
+            return self.index[key]
+        except KeyError:
+            pass
+        with self._lock:
+            try:
+                return self.index[key]
+            except KeyError:
+                i = self.index[key] = len(self.identifiers)
+                self.identifiers.append(f"{name};<task>;0")
+                self.descriptions.append(
+                    {"filename": "<task>", "name": name, "line_number": 0, "line": ""}
+                )
+                return i
+
+    def intern(self, frame: FrameType) -> int:
+        co = frame.f_code
+        try:
+            # Cheaper than building the identifier string for every frame
+            key: Hashable = (co.co_name, co.co_filename, co.co_firstlineno)
+        except AttributeError:
+            key = identifier(frame)
+        try:
+            return self.index[key]
+        except KeyError:
+            pass
+        ident = identifier(frame)
+        description = info_frame(frame)
+        with self._lock:
+            try:
+                return self.index[key]
+            except KeyError:
+                i = self.index[key] = len(self.identifiers)
+                self.identifiers.append(ident)
+                self.descriptions.append(description)
+                return i
+
+
+_frames = _FrameTable()
+
+
+def _default_depth() -> int:
+    # Cut off rather conservatively since the output of the profiling
+    # sometimes need to be recursed into as well, e.g. for serialization
+    # which can cause recursion errors later on since this can generate
+    # deeply nested dictionaries
+    return min(100, sys.getrecursionlimit() // 4)
+
+
+def _stack(
+    frame: FrameType,
+    *,
+    stop: str | None = None,
+    omit: Collection[str] = (),
+    depth: int | None = None,
+) -> tuple[int, ...] | None:
+    """The call stack of a frame as interned code locations, outermost first
+
+    Returns None if the frame itself should be omitted.  See ``process`` for
+    the meaning of the keyword arguments.
+    """
+    if depth is None:
+        depth = _default_depth()
+
+    if any(frame.f_code.co_filename.endswith(o) for o in omit):
+        return None
+
+    intern = _frames.intern
+    stack = [intern(frame)]
+    prev = frame.f_back
+    while (
+        depth > 0
+        and prev is not None
+        and (stop is None or not prev.f_code.co_filename.endswith(stop))
+    ):
+        stack.append(intern(prev))
+        prev = prev.f_back
+        depth -= 1
+    stack.reverse()
+    return tuple(stack)
+
+
+def _build_tree(counts: Mapping[tuple[int, ...], int]) -> dict[str, Any]:
+    """Build the nested dictionary of ``create`` from counts of stacks"""
+    root = create()
+    identifiers = _frames.identifiers
+    descriptions = _frames.descriptions
+    for stack, n in counts.items():
+        root["count"] += n
+        state = root
+        for i in stack:
+            ident = identifiers[i]
+            children = state["children"]
+            try:
+                state = children[ident]
+            except KeyError:
+                state = children[ident] = {
+                    "count": 0,
+                    "description": descriptions[i],
+                    "children": {},
+                    "identifier": ident,
+                }
+            state["count"] += n
+    return root
+
+
+class CompactProfile(Mapping[str, Any]):
+    """A profile state stored as counts of interned call stacks
+
+    This can stand in for the dictionaries from ``create`` wherever a profile
+    is only read.  ``count`` is kept up to date as samples are added; the
+    other keys build the tree on first access.
+
+    Examples
+    --------
+    >>> prof = CompactProfile()
+    >>> prof.add(sys._current_frames()[threading.get_ident()])
+    True
+    >>> prof["count"]
+    1
+    >>> merge(prof, prof)["count"]
+    2
+
+    See also
+    --------
+    create
+    merge
+    """
+
+    __slots__ = ("counts", "count", "_tree")
+
+    counts: dict[tuple[int, ...], int]
+    count: int
+    _tree: dict[str, Any] | None
+
+    def __init__(self, counts: dict[tuple[int, ...], int] | None = None):
+        self.counts = {} if counts is None else counts
+        self.count = sum(self.counts.values())
+        self._tree = None
+
+    def add(
+        self,
+        frame: FrameType,
+        *,
+        stop: str | None = None,
+        omit: Collection[str] = (),
+        depth: int | None = None,
+        task: str | None = None,
+    ) -> bool:
+        """Add a sample of a frame stack, see ``process``
+
+        If ``task`` is given the stack is put below a node of that name.
+        Returns False if the frame was omitted.
+        """
+        stack = _stack(frame, stop=stop, omit=omit, depth=depth)
+        if stack is None:
+            return False
+        if task is not None:
+            stack = (_frames.intern_task(task),) + stack
+        counts = self.counts
+        counts[stack] = counts.get(stack, 0) + 1
+        self.count += 1
+        self._tree = None
+        return True
+
+    @classmethod
+    def merge(cls, *args: CompactProfile) -> CompactProfile:
+        """Merge multiple compact profiles by adding up their counts"""
+        counts: dict[tuple[int, ...], int] = {}
+        for arg in args:
+            # dict.copy is atomic, the sampling thread may be adding to it
+            for stack, n in arg.counts.copy().items():
+                counts[stack] = counts.get(stack, 0) + n
+        return cls(counts)
+
+    def to_dict(self) -> dict[str, Any]:
+        """The profile as a nested dictionary, see ``create``"""
+        tree = self._tree
+        if tree is None:
+            tree = self._tree = _build_tree(self.counts.copy())
+        return tree
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "count":
+            return self.count
+        return self.to_dict()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(create())
+
+    def __len__(self) -> int:
+        return len(create())
+
+    def __repr__(self) -> str:
+        return f"<CompactProfile: {self.count} samples, {len(self.counts)} stacks>"
+
+
 def process(
     frame: FrameType,
     child: object | None,
@@ -138,15 +365,16 @@ def process(
 ) -> dict[str, Any] | None:
     """Add counts from a frame stack onto existing state
 
-    This recursively adds counts to the existing state dictionary and creates
-    new entries for new functions.
+    This adds counts to the existing state dictionary along the call stack and
+    creates new entries for new functions.
 
     Parameters
     ----------
     frame:
         The frame to process onto the state
     child:
-        For internal use only
+        If not None, return the entry of ``frame`` without counting it, so
+        that callers can add further frames below it
     state:
         The profile state to accumulate this frame onto, see ``create``
     stop:
@@ -154,7 +382,7 @@ def process(
     omit:
         Filenames that we should omit from processing
     depth:
-        For internal use only, how deep we are in the call stack
+        How many callers of ``frame`` to include at most
         Used to prevent stack overflow
 
     Examples
@@ -175,53 +403,49 @@ def process(
     create
     merge
     """
-    if depth is None:
-        # Cut off rather conservatively since the output of the profiling
-        # sometimes need to be recursed into as well, e.g. for serialization
-        # which can cause recursion errors later on since this can generate
-        # deeply nested dictionaries
-        depth = min(100, sys.getrecursionlimit() // 4)
-
-    if any(frame.f_code.co_filename.endswith(o) for o in omit):
+    stack = _stack(frame, stop=stop, omit=omit, depth=depth)
+    if stack is None:
         return None
 
-    prev = frame.f_back
-    if (
-        depth > 0
-        and prev is not None
-        and (stop is None or not prev.f_code.co_filename.endswith(stop))
-    ):
-        new_state = process(prev, frame, state, stop=stop, depth=depth - 1)
-        if new_state is None:
-            return None
-        state = new_state
-
-    ident = identifier(frame)
-
-    try:
-        d = state["children"][ident]
-    except KeyError:
-        d = {
-            "count": 0,
-            "description": info_frame(frame),
-            "children": {},
-            "identifier": ident,
-        }
-        state["children"][ident] = d
-
-    state["count"] += 1
+    identifiers = _frames.identifiers
+    descriptions = _frames.descriptions
+    for i in stack:
+        ident = identifiers[i]
+        try:
+            d = state["children"][ident]
+        except KeyError:
+            d = {
+                "count": 0,
+                "description": descriptions[i],
+                "children": {},
+                "identifier": ident,
+            }
+            state["children"][ident] = d
+
+        state["count"] += 1
+        state = d
 
     if child is not None:
-        return d
+        return state
     else:
-        d["count"] += 1
+        state["count"] += 1
         return None
 
 
-def merge(*args: dict[str, Any]) -> dict[str, Any]:
-    """Merge multiple frame states together"""
+def merge(*args: Mapping[str, Any]) -> dict[str, Any]:
+    """Merge multiple frame states together
+
+    If all states are ``CompactProfile`` objects their counts are added up
+    and the tree is built only once.
+    """
     if not args:
         return create()
+    if all(isinstance(arg, CompactProfile) for arg in args):
+        return CompactProfile.merge(*args).to_dict()  # type: ignore[arg-type]
+    if any(isinstance(arg, CompactProfile) for arg in args):
+        args = tuple(
+            arg.to_dict() if isinstance(arg, CompactProfile) else arg for arg in args
+        )
     s = {arg["identifier"] for arg in args}
     if len(s) != 1:  # pragma: no cover
         raise ValueError(f"Expected identifiers, got {s}")
@@ -343,31 +567,343 @@ def plot_data(state, profile_interval=0.010):
     }
 
 
-def _watch(
-    thread_id: int,
-    log: deque[tuple[float, dict[str, Any]]],  # [(timestamp, output of create()), ...]
-    interval: float,
-    cycle: float,
-    omit: Collection[str],
-    stop: Callable[[], bool],
-) -> None:
-    recent = create()
-    last = time()
-
-    while not stop():
-        if time() > last + cycle:
-            recent = create()
-            with lock:
-                log.append((time(), recent))
-                last = time()
-                try:
-                    frame = sys._current_frames()[thread_id]
-                except KeyError:
-                    return
-
-                process(frame, None, recent, omit=omit)
-                del frame
-        sleep(interval)
+def _combine(a: Mapping[str, Any], b: Mapping[str, Any]) -> Mapping[str, Any]:
+    if isinstance(a, CompactProfile) and isinstance(b, CompactProfile):
+        return CompactProfile.merge(a, b)
+    return merge(a, b)
+
+
+class ProfileHistory:
+    """A history of profile cycles with pre-aggregated rollups
+
+    This behaves like the ``deque`` of ``(timestamp, state)`` pairs that it
+    replaces: ``append``, iteration, indexing and ``len`` act on the most
+    recent ``maxlen`` cycles.
+
+    In addition, every aligned block of ``2 ** j`` consecutive cycles, for
+    ``1 <= j <= max_level``, is merged into a rollup node as soon as it is
+    complete.  ``get_profile`` answers a time window by merging the largest
+    nodes that fit into it, i.e. a couple of nodes per level rather than every
+    cycle of the window.
+
+    Each level keeps the nodes that cover the raw cycles plus ``downsampled``
+    older ones.  Data that has dropped out of the raw history therefore
+    survives at a resolution that halves with every level, while memory stays
+    bounded.
+
+    Examples
+    --------
+    >>> history = ProfileHistory(maxlen=1000)
+    >>> history.append((time(), state))  # doctest: +SKIP
+    >>> history.get_profile(start=time() - 60)  # doctest: +SKIP
+    """
+
+    maxlen: int | None
+    downsampled: int
+    max_level: int
+
+    def __init__(
+        self, maxlen: int | None = None, downsampled: int = 8, max_level: int = 16
+    ):
+        if downsampled < 3:
+            raise ValueError(f"downsampled must be at least 3, got {downsampled}")
+        self.maxlen = maxlen
+        self.downsampled = downsampled
+        self.max_level = max_level
+        self._raw: deque[tuple[float, Mapping[str, Any]]] = deque()
+        # Number of cycles ever appended
+        self._count = 0
+        # Level j maps m to (first timestamp, last timestamp, merged state) of
+        # cycles m * 2 ** j up to (m + 1) * 2 ** j.  Level 0 is self._raw.
+        self._levels: list[dict[int, tuple[float, float, Mapping[str, Any]]]] = [
+            {} for _ in range(max_level + 1)
+        ]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+    def __iter__(self) -> Iterator[tuple[float, Mapping[str, Any]]]:
+        return iter(self._raw)
+
+    def __getitem__(self, i: int) -> tuple[float, Mapping[str, Any]]:
+        return self._raw[i]
+
+    def __repr__(self) -> str:
+        rollups = sum(map(len, self._levels))
+        return f"<ProfileHistory: {len(self._raw)} cycles, {rollups} rollups>"
+
+    def _capacity(self, level: int) -> int | None:
+        if self.maxlen is None:
+            return None
+        return -(-self.maxlen // 2**level) + self.downsampled
+
+    def _node(
+        self, level: int, m: int
+    ) -> tuple[float, float, Mapping[str, Any]] | None:
+        if level:
+            return self._levels[level].get(m)
+        i = m - (self._count - len(self._raw))
+        if 0 <= i < len(self._raw):
+            t, state = self._raw[i]
+            return t, t, state
+        return None
+
+    def append(self, item: tuple[float, Mapping[str, Any]]) -> None:
+        with self._lock:
+            # The previous cycle is complete now; roll up every block it ends
+            n = self._count
+            level = 1
+            while n and level <= self.max_level and n % 2**level == 0:
+                m = (n >> level) - 1
+                left = self._node(level - 1, 2 * m)
+                right = self._node(level - 1, 2 * m + 1)
+                if left is None or right is None:
+                    break
+                nodes = self._levels[level]
+                nodes[m] = (left[0], right[1], _combine(left[2], right[2]))
+                capacity = self._capacity(level)
+                if capacity is not None and len(nodes) > capacity:
+                    del nodes[next(iter(nodes))]
+                level += 1
+
+            self._raw.append(item)
+            self._count += 1
+            if self.maxlen is not None and len(self._raw) > self.maxlen:
+                self._raw.popleft()
+
+    def _roots(self) -> Iterator[tuple[int, int]]:
+        """The largest nodes that together cover all retained cycles"""
+        i = self._count - len(self._raw)
+        for level, nodes in enumerate(self._levels):
+            if level and nodes:
+                i = min(i, next(iter(nodes)) << level)
+        while i < self._count:
+            for level in range(self.max_level, -1, -1):
+                size = 2**level
+                if (
+                    i % size == 0
+                    and i + size <= self._count
+                    and self._node(level, i >> level) is not None
+                ):
+                    yield level, i >> level
+                    i += size
+                    break
+            else:  # pragma: no cover
+                i += 1
+
+    def _select(
+        self, start: float | None, stop: float | None
+    ) -> list[Mapping[str, Any]]:
+        lo = -math.inf if start is None else start
+        hi = math.inf if stop is None else stop
+        states = []
+
+        def visit(level: int, m: int) -> None:
+            node = self._node(level, m)
+            assert node is not None
+            first, last, state = node
+            if last < lo or first > hi:
+                return
+            if level == 0 or (lo <= first and last <= hi):
+                states.append(state)
+                return
+            if (
+                self._node(level - 1, 2 * m) is None
+                or self._node(level - 1, 2 * m + 1) is None
+            ):
+                # Downsampled; this is as fine as it gets
+                states.append(state)
+                return
+            visit(level - 1, 2 * m)
+            visit(level - 1, 2 * m + 1)
+
+        for level, m in self._roots():
+            visit(level, m)
+        return states
+
+    def get_profile(
+        self,
+        start: float | None = None,
+        stop: float | None = None,
+        recent: Mapping[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        """Merge all cycles with a timestamp between start and stop
+
+        Rollups that straddle the window but no longer have finer data are
+        included whole.
+        """
+        with self._lock:
+            states = self._select(start, stop)
+        if not states:
+            return create()
+        if recent:
+            states.append(recent)
+        return merge(*states)
+
+
+class _Watch:
+    """The threads registered by one call to ``watch_threads``"""
+
+    __slots__ = ("logs", "recent", "loops", "cycle", "omit", "stop", "last")
+
+    logs: dict[int, ProfileHistory]
+    recent: dict[int, CompactProfile]
+    loops: Mapping[int, asyncio.AbstractEventLoop]
+    cycle: float
+    omit: Collection[str]
+    stop: Callable[[], bool]
+    last: float
+
+    def __init__(self, logs, loops, cycle, omit, stop):
+        self.logs = logs
+        self.recent = {thread_id: CompactProfile() for thread_id in logs}
+        self.loops = loops
+        self.cycle = cycle
+        self.omit = omit
+        self.stop = stop
+        self.last = time()
+
+    def sample(self, frames: dict[int, FrameType]) -> bool:
+        """Add a sample for every thread; False once all threads have gone"""
+        if time() > self.last + self.cycle:
+            for thread_id in self.recent:
+                self.recent[thread_id] = CompactProfile()
+                self.logs[thread_id].append((time(), self.recent[thread_id]))
+            self.last = time()
+        for thread_id, recent in list(self.recent.items()):
+            try:
+                frame = frames[thread_id]
+            except KeyError:
+                # Thread has finished, stop watching it
+                del self.recent[thread_id]
+                continue
+            task = None
+            loop = self.loops.get(thread_id)
+            if loop is not None:
+                task = _task_label(loop)
+            recent.add(frame, omit=self.omit, task=task)
+        return bool(self.recent)
+
+
+def _task_label(loop: asyncio.AbstractEventLoop) -> str:
+    """Name of the kind of task running on an event loop in another thread"""
+    task = asyncio.current_task(loop)
+    if task is None:
+        return "<event loop>"
+    coro = task.get_coro()
+    # Task names are unique per task; group by coroutine function instead
+    return getattr(coro, "__qualname__", None) or type(coro).__name__
+
+
+class _Sampler:
+    """A thread sampling all watched threads with the same interval at once"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.watches: list[_Watch] = []
+        self.thread = threading.Thread(target=self._run, name="Profile")
+        self.thread.daemon = True
+
+    def _run(self) -> None:
+        try:
+            while True:
+                with _samplers_lock:
+                    self.watches = [w for w in self.watches if not _stopped(w)]
+                    if not self.watches:
+                        del _samplers[self.interval]
+                        return
+                    watches = self.watches
+
+                with lock:
+                    frames = sys._current_frames()
+                    done = [w for w in watches if not _sample(w, frames)]
+                    del frames
+
+                if done:
+                    with _samplers_lock:
+                        self.watches = [w for w in self.watches if w not in done]
+                sleep(self.interval)
+        finally:
+            # Let the next call to ``watch`` start a new thread if this one died
+            with _samplers_lock:
+                if _samplers.get(self.interval) is self:
+                    del _samplers[self.interval]
+
+
+def _stopped(w: _Watch) -> bool:
+    try:
+        return w.stop()
+    except Exception:
+        logger.exception("Error in stop function of profile watch, stop sampling")
+        return True
+
+
+def _sample(w: _Watch, frames: dict[int, FrameType]) -> bool:
+    try:
+        return w.sample(frames)
+    except Exception:
+        logger.exception("Error while sampling profile watch, stop sampling")
+        return False
+
+
+#: Sampler threads by interval, shared by all calls to ``watch``
+_samplers: dict[float, _Sampler] = {}
+_samplers_lock = threading.Lock()
+
+
+def watch_threads(
+    thread_ids: Collection[int],
+    interval: str = "20ms",
+    cycle: str = "2s",
+    maxlen: int | None | NoDefault = no_default,
+    omit: Collection[str] = (),
+    stop: Callable[[], bool] = lambda: False,
+    loops: Mapping[int, asyncio.AbstractEventLoop] | None = None,
+) -> dict[int, ProfileHistory]:
+    """Gather profile information on several threads
+
+    Like ``watch``, but for many threads at once.  All threads watched with
+    the same ``interval``, also across calls, are sampled by a single thread
+    which takes one snapshot of all frames per tick.
+
+    Parameters
+    ----------
+    thread_ids : collection of int
+        Threads to watch
+    loops : mapping of int to event loop, optional
+        Event loops running in some of the watched threads.  Samples of those
+        threads are grouped by the asyncio task that was running at the time,
+        see ``watch``.
+
+    See ``watch`` for the other parameters.
+
+    Returns
+    -------
+    Dict of thread id to ``ProfileHistory``
+    """
+    if maxlen is no_default:
+        maxlen = dask.config.get("distributed.admin.low-level-log-length")
+        assert isinstance(maxlen, int) or maxlen is None
+    logs = {thread_id: ProfileHistory(maxlen=maxlen) for thread_id in thread_ids}
+    w = _Watch(
+        logs,
+        loops=loops or {},
+        cycle=parse_timedelta(cycle),
+        omit=omit,
+        stop=stop,
+    )
+    seconds = parse_timedelta(interval)
+
+    with _samplers_lock:
+        try:
+            sampler = _samplers[seconds]
+        except KeyError:
+            sampler = _samplers[seconds] = _Sampler(seconds)
+            sampler.thread.start()
+        sampler.watches = sampler.watches + [w]
+
+    return logs
 
 
 def watch(
@@ -377,11 +913,13 @@ def watch(
     maxlen: int | None | NoDefault = no_default,
     omit: Collection[str] = (),
     stop: Callable[[], bool] = lambda: False,
-) -> deque[tuple[float, dict[str, Any]]]:
+    loop: asyncio.AbstractEventLoop | None = None,
+) -> ProfileHistory:
     """Gather profile information on a particular thread
 
-    This starts a new thread to watch a particular thread and returns a deque
-    that holds periodic profile information.
+    This registers the thread with a sampling thread and returns a
+    ``ProfileHistory`` that holds periodic profile information.  One sampling
+    thread serves all watched threads with the same interval.
 
     Parameters
     ----------
@@ -392,42 +930,36 @@ def watch(
     cycle : str
         Time per refreshing to a new profile state
     maxlen : int
-        Passed onto deque, maximum number of periods
+        Maximum number of periods kept at full resolution
     omit : collection of str
         Don't include entries whose filename includes any of these substrings
     stop : callable
         Function to call to see if we should stop. It must
         accept no arguments and return a bool (True to stop,
         False to continue).
+    loop : asyncio event loop, optional
+        The event loop running in the watched thread.  If given, every sample
+        is put below a node naming the coroutine function of the task that
+        was running, or ``<event loop>`` if none was, so that time spent in
+        the event loop is attributed per task.
 
     Returns
     -------
-    deque of tuples:
+    ProfileHistory of tuples:
 
     - timestamp
-    - dict[str, Any] (output of ``create()``)
+    - ``CompactProfile``
     """
-    if maxlen is no_default:
-        maxlen = dask.config.get("distributed.admin.low-level-log-length")
-        assert isinstance(maxlen, int) or maxlen is None
-    log: deque[tuple[float, dict[str, Any]]] = deque(maxlen=maxlen)
-
-    thread = threading.Thread(
-        target=_watch,
-        name="Profile",
-        kwargs={
-            "thread_id": thread_id or threading.get_ident(),
-            "interval": parse_timedelta(interval),
-            "cycle": parse_timedelta(cycle),
-            "log": log,
-            "omit": omit,
-            "stop": stop,
-        },
-    )
-    thread.daemon = True
-    thread.start()
-
-    return log
+    thread_id = thread_id or threading.get_ident()
+    return watch_threads(
+        [thread_id],
+        interval=interval,
+        cycle=cycle,
+        maxlen=maxlen,
+        omit=omit,
+        stop=stop,
+        loops={thread_id: loop} if loop is not None else None,
+    )[thread_id]
 
 
 def get_profile(history, recent=None, start=None, stop=None, key=None):
@@ -435,13 +967,17 @@ def get_profile(history, recent=None, start=None, stop=None, key=None):
 
     Parameters
     ----------
-    history : Sequence[Tuple[time, Dict]]
-        A list or deque of profile states
-    recent : dict
+    history : Sequence[Tuple[time, Mapping]]
+        A list or deque of profile states, dictionaries or ``CompactProfile``,
+        or a ``ProfileHistory``
+    recent : Mapping
         The most recent accumulating state
     start : time
     stop : time
     """
+    if isinstance(history, ProfileHistory):
+        return history.get_profile(start=start, stop=stop, recent=recent)
+
     if start is None:
         istart = 0
     else:
@@ -460,15 +996,14 @@ def get_profile(history, recent=None, start=None, stop=None, key=None):
         iistop = len(history) if istop is None else istop
         history = [history[i] for i in range(istart, iistop)]
 
-    prof = merge(*toolz.pluck(1, history))
-
     if not history:
         return create()
 
+    states = list(toolz.pluck(1, history))
     if recent:
-        prof = merge(prof, recent)
+        states.append(recent)
 
-    return prof
+    return merge(*states)
 
 
 def plot_figure(data, **kwargs):
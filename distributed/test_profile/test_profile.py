@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import dataclasses
 import sys
 import threading
@@ -12,8 +13,11 @@ from tlz import first
 from distributed.compatibility import WINDOWS
 from distributed.metrics import time
 from distributed.profile import (
+    CompactProfile,
+    ProfileHistory,
     call_stack,
     create,
+    get_profile,
     identifier,
     info_frame,
     ll_get_stack,
@@ -23,7 +27,9 @@ from distributed.profile import (
     plot_data,
     process,
     watch,
+    watch_threads,
 )
+from distributed.utils_test import captured_logger
 
 
 def test_basic():
@@ -164,6 +170,142 @@ def test_merge():
     assert merge(a1, a2) == expected
 
 
+def test_compact_profile():
+    def test_g():
+        sleep(0.01)
+
+    def test_f():
+        for _ in range(50):
+            test_g()
+            sleep(0.01)
+
+    thread = threading.Thread(target=test_f)
+    thread.daemon = True
+    thread.start()
+
+    state = create()
+    compact = CompactProfile()
+    for _ in range(50):
+        sleep(0.01)
+        frame = sys._current_frames()[thread.ident]
+        process(frame, None, state)
+        assert compact.add(frame)
+        del frame
+
+    assert compact["count"] == 50
+    assert len(compact.counts) < 50
+    assert all(isinstance(i, int) for stack in compact.counts for i in stack)
+    assert compact.to_dict() == state
+    assert dict(compact) == state
+
+    assert merge(compact, compact) == merge(state, state)
+    assert merge(compact, state) == merge(state, state)
+    assert CompactProfile.merge(compact, compact)["count"] == 100
+
+    frame = sys._current_frames()[threading.get_ident()]
+    assert not compact.add(frame, omit=("test_profile.py",))
+    assert compact["count"] == 50
+
+    pd = plot_data(compact)
+    assert pd == plot_data(state)
+
+
+def test_compact_profile_stop_and_depth():
+    frame = sys._current_frames()[threading.get_ident()]
+    compact = CompactProfile()
+    compact.add(frame, stop="_pytest/python.py")
+    compact.add(frame, depth=0)
+    # Both only keep the frame itself
+    ((stack, count),) = compact.counts.items()
+    assert len(stack) == 1
+    assert count == 2
+
+    state = create()
+    compact = CompactProfile()
+    process(frame, None, state, depth=3)
+    compact.add(frame, depth=3)
+    assert compact.to_dict() == state
+    assert max(map(len, compact.counts)) == 4
+
+
+def test_get_profile_compact():
+    frame = sys._current_frames()[threading.get_ident()]
+    history = []
+    for t in range(10):
+        prof = CompactProfile()
+        for _ in range(t):
+            prof.add(frame)
+        history.append((t, prof))
+    recent = CompactProfile()
+    recent.add(frame)
+
+    assert get_profile(history)["count"] == 45
+    assert get_profile(history, recent=recent)["count"] == 46
+    assert get_profile(history, start=3, stop=5)["count"] == 3 + 4 + 5
+    assert get_profile([]) == create()
+    assert isinstance(get_profile(history), dict)
+
+
+@pytest.mark.parametrize("compact", [True, False])
+def test_profile_history(compact):
+    def state(n):
+        if compact:
+            # Empty stacks only count towards the root
+            return CompactProfile({(): n})
+        return {**create(), "count": n}
+
+    history = ProfileHistory(maxlen=20, downsampled=3, max_level=4)
+    for t in range(200):
+        history.append((t, state(t)))
+
+    # Sequence interface over the raw cycles
+    assert len(history) == 20
+    assert [t for t, _ in history] == list(range(180, 200))
+    assert history[-1][1]["count"] == 199
+    assert get_profile(history, start=190)["count"] == sum(range(190, 200))
+
+    for start, stop in [(180, 199), (181, 195), (185, 185), (199, 300)]:
+        expected = sum(range(start, min(stop, 199) + 1))
+        assert history.get_profile(start, stop)["count"] == expected
+        # At most a couple of nodes per level
+        assert len(history._select(start, stop)) <= 2 * 5
+
+    recent = state(1000)
+    assert history.get_profile(190, recent=recent)["count"] == (
+        sum(range(190, 200)) + 1000
+    )
+    assert history.get_profile(300, 400) == create()
+
+    # Older cycles survive in rollups, at a coarser resolution
+    capacity = sum(-(-20 // 2**j) + 3 for j in range(1, 5))
+    assert sum(map(len, history._levels)) <= capacity
+    level, m = next(history._roots())
+    oldest = m << level
+    assert oldest <= 200 - 20 - 3 * 16
+    assert history.get_profile()["count"] == sum(range(oldest, 200))
+    # A window inside a downsampled node returns the whole node
+    assert history.get_profile(oldest + 1, oldest + 1)["count"] == sum(
+        range(oldest, oldest + 16)
+    )
+
+
+def test_profile_history_rolls_up_finished_cycles():
+    frame = sys._current_frames()[threading.get_ident()]
+    history = ProfileHistory(maxlen=4)
+    profiles = []
+    for t in range(8):
+        profiles.append(CompactProfile())
+        history.append((t, profiles[-1]))
+        # Cycles are appended when they start and filled in afterwards
+        for _ in range(t):
+            profiles[-1].add(frame)
+    assert history.get_profile()["count"] == sum(range(8))
+    assert history.get_profile(0, 3)["count"] == sum(range(4))
+
+    with pytest.raises(ValueError):
+        ProfileHistory(downsampled=2)
+
+
 def test_merge_empty():
     assert merge() == create()
     assert merge(create()) == create()
@@ -204,11 +346,156 @@ def test_watch():
         stop_called.wait(2)
         sleep(0.5)
         assert 1 < len(log) < 10
+        # Sampled every interval, not once per cycle
+        assert max(prof["count"] for _, prof in log) > 1
     finally:
         stop_called.wait()
         watch_thread.join()
 
 
+def profile_threads():
+    return [t for t in threading.enumerate() if t.name == "Profile"]
+
+
+def test_watch_threads_single_sampler():
+    event = threading.Event()
+    threads = [threading.Thread(target=event.wait, daemon=True) for _ in range(4)]
+    for t in threads:
+        t.start()
+    before = len(profile_threads())
+    done = threading.Event()
+
+    try:
+        logs = watch_threads(
+            [t.ident for t in threads],
+            interval="5ms",
+            cycle="20ms",
+            stop=done.is_set,
+        )
+        log = watch(threads[0].ident, interval="5ms", cycle="20ms", stop=done.is_set)
+        # Both calls share one sampling thread
+        assert len(profile_threads()) == before + 1
+
+        start = time()
+        while not all(len(h) > 2 for h in logs.values()):
+            sleep(0.01)
+            assert time() < start + 5
+        for h in [*logs.values(), log]:
+            prof = get_profile(h)
+            assert prof["count"] > 1
+            assert "wait" in str(prof)
+    finally:
+        done.set()
+        event.set()
+
+    start = time()
+    while len(profile_threads()) > before:
+        sleep(0.01)
+        assert time() < start + 5
+
+
+class _FailingLoops(dict):
+    def get(self, *args):
+        raise RuntimeError("sample failed")
+
+
+def test_watch_drops_failing_watches():
+    event = threading.Event()
+    thread = threading.Thread(target=event.wait, daemon=True)
+    thread.start()
+    before = len(profile_threads())
+    done = threading.Event()
+
+    def stop():
+        raise RuntimeError("stop failed")
+
+    try:
+        with captured_logger("distributed.profile") as sio:
+            log = watch(thread.ident, interval="7ms", cycle="10ms", stop=done.is_set)
+            watch(thread.ident, interval="7ms", cycle="10ms", stop=stop)
+            watch_threads(
+                [thread.ident],
+                interval="7ms",
+                cycle="10ms",
+                loops=_FailingLoops({thread.ident: None}),
+            )
+            assert len(profile_threads()) == before + 1
+
+            # The remaining watch is still sampled
+            start = time()
+            while len(log) < 5:
+                sleep(0.01)
+                assert time() < start + 5
+        assert "stop failed" in sio.getvalue()
+        assert "sample failed" in sio.getvalue()
+    finally:
+        done.set()
+        event.set()
+
+    start = time()
+    while len(profile_threads()) > before:
+        sleep(0.01)
+        assert time() < start + 5
+
+
+def test_watch_stops_when_threads_finish():
+    event = threading.Event()
+    thread = threading.Thread(target=event.wait, daemon=True)
+    thread.start()
+    before = len(profile_threads())
+    log = watch(thread.ident, interval="5ms", cycle="10ms")
+    assert len(profile_threads()) == before + 1
+    sleep(0.05)
+    event.set()
+    thread.join()
+
+    start = time()
+    while len(profile_threads()) > before:
+        sleep(0.01)
+        assert time() < start + 5
+    assert get_profile(log)["count"]
+
+
+def test_watch_asyncio_tasks():
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    async def busy():
+        await asyncio.sleep(0.05)
+        # Don't yield to the event loop, which would release the GIL in select
+        end = time() + 0.3
+        while time() < end:
+            pass
+
+    async def idle():
+        await asyncio.sleep(0.3)
+
+    async def main():
+        started.set()
+        await asyncio.gather(busy(), idle())
+
+    thread = threading.Thread(target=loop.run_until_complete, args=(main(),))
+    thread.start()
+    try:
+        started.wait(5)
+        log = watch(thread.ident, interval="2ms", cycle="50ms", loop=loop)
+        thread.join()
+    finally:
+        loop.close()
+
+    prof = get_profile(log)
+    assert prof["count"]
+    tasks = {
+        child["description"]["name"]
+        for child in prof["children"].values()
+        if child["description"]["filename"] == "<task>"
+    }
+    assert len(tasks) == len(prof["children"])
+    assert any(name.endswith("busy") for name in tasks)
+    assert not any(name.endswith("idle") for name in tasks)
+    assert len(plot_data(prof)["left"]) > 1
+
+
 def test_watch_requires_lock_to_run():
     start = time()
 